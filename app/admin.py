@@ -1 +1 @@
-"""Admin-side handlers for «Стародонье»-бота."""from __future__ import annotationsimport calendarimport osimport tempfilefrom datetime import datetime, timedeltafrom typing import Optional, Set, Tuplefrom aiogram import Router, Ffrom aiogram.exceptions import TelegramBadRequestfrom aiogram.filters import Command, StateFilter, BaseFilterfrom aiogram.fsm.context import FSMContextfrom aiogram.fsm.state import StatesGroup, Statefrom aiogram.types import (    CallbackQuery,    InlineKeyboardButton,    InlineKeyboardMarkup,    Message,    FSInputFile,)from openpyxl import Workbookfrom openpyxl.styles import Alignment, Font, Border, Side, PatternFillfrom openpyxl.utils import get_column_letter# Ensure the import path matches your project structuretry:    from app.database import sqlite_dbexcept ImportError as e:    raise ImportError("Could not import sqlite_db. Check if app/database/sqlite_db.py exists.") from e# Database helpersfrom app.database.sqlite_db import (    get_cursor,    add_shift,    get_all_shifts,    get_employees_with_shifts,    get_all_waiters,    set_shift_tasks,    get_all_work_hours_dates,    add_employee,    get_all_employees,    get_work_hours,    get_shifts_for,    set_shift_hours,    set_work_hours)# Global cursor helperdef get_cursor():    """Returns a working SQLite cursor, initializing the database if needed."""    if not sqlite_db.base:        sqlite_db.sql_start()    return sqlite_db.base.cursor()async def _safe_delete_message(bot, chat_id: int, msg_id: Optional[int]):    """Safely deletes a message if it exists."""    if msg_id:        try:            await bot.delete_message(chat_id, msg_id)        except Exception:            passdef _format_payline(*args) -> Tuple[str, float]:    """Formats a payline string and calculates pay based on hours and rate."""    if len(args) == 3:        date, hrs, rate = args        if hrs is None or hrs <= 0:            return f"• {date}: —", 0.0        pay = hrs * rate        return f"• {date}: {hrs:.2f} ч × {rate} = {pay:.2f}", pay    elif len(args) == 4:        name, date, hrs, rate = args        if hrs is None or hrs <= 0:            return f"{name} {date}: —", 0.0        pay = hrs * rate        return f"{name} {date}: {hrs:.2f} ч × {rate} = {pay:.2f}", pay    raise ValueError("_format_payline expects 3 or 4 args")# Router and Guardadmin = Router()ADMIN_IDS = [2015462319, 1773695867]def export_hours_schedule(start_date: datetime, employees: list[dict], get_hours_fn, output_path: str):    wb = Workbook()    ws = wb.active    ws.title = f"Часовка {start_date:%d%m%Y}"    dates = [start_date + timedelta(days=i) for i in range(15)]    headers = ["ФИО"] + [d.strftime("%d.%m") for d in dates] + ["Итого"]    ws.append(headers)    bold = Font(bold=True)    center = Alignment(horizontal="center", vertical="center")    thin = Side(style="thin")    for col in range(1, len(headers) + 1):        c = ws.cell(row=1, column=col)        c.font = bold        c.alignment = center        c.border = Border(left=thin, right=thin, top=thin, bottom=thin)    row = 2    for role in sorted({e["role"] for e in employees}):        # заголовок группы        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=len(headers))        grp = ws.cell(row=row, column=1)        grp.value = role        grp.font = Font(bold=True, size=12)        grp.alignment = center        row += 1        # строки сотрудников        for e in filter(lambda x: x["role"] == role, employees):            name = f"{e['last_name']} {e['first_name']}"            ws.cell(row=row, column=1, value=name).alignment = center            for idx, d in enumerate(dates, start=2):                hrs = get_hours_fn(e["id"], d.strftime("%Y-%m-%d")) or 0                ws.cell(row=row, column=idx, value=hrs).alignment = center            first_col = ws.cell(row=row, column=2).column_letter            last_col = ws.cell(row=row, column=1 + len(dates)).column_letter            ws.cell(row=row, column=2 + len(dates),                    value=f"=SUM({first_col}{row}:{last_col}{row})").alignment = center            row += 1    wb.save(output_path)class AdminProtect(BaseFilter):    async def __call__(self, event) -> bool:        user = getattr(event, "from_user", None)        return bool(user and user.id in ADMIN_IDS)# FSM Statesclass AddEmployeeStates(StatesGroup):    ChooseRole = State()    InputLastName = State()    InputFirstName = State()    InputRate = State()class SetHoursStates(StatesGroup):    ChooseWaiter = State()    ChooseDate = State()    InputStartTime = State()    InputEndTime = State()class EditSchedStates(StatesGroup):    ChooseDate = State()    ChooseWaiter = State()    ChooseTaskAction = State()    InputPersonalTasks = State()class ExportScheduleStates(StatesGroup):    ChooseStartDate = State()# UI HelpersKB_BACK_MENU = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")]])def make_calendar(year: int, month: int, marked: Set[str]) -> InlineKeyboardMarkup:    kb = [        [            InlineKeyboardButton(text="‹", callback_data=f"CAL_PREV|{year}|{month}"),            InlineKeyboardButton(text=f"{calendar.month_name[month]} {year}", callback_data="IGNORE"),            InlineKeyboardButton(text="›", callback_data=f"CAL_NEXT|{year}|{month}"),        ],        [InlineKeyboardButton(text=d, callback_data="IGNORE") for d in ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]],    ]    for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month):        row = []        for day in week:            if day == 0:                row.append(InlineKeyboardButton(text=" ", callback_data="IGNORE"))            else:                ds = f"{year:04d}-{month:02d}-{day:02d}"                mark = "✓" if ds in marked else ""                row.append(InlineKeyboardButton(text=f"{day}{mark}", callback_data=f"CAL_DAY|{ds}"))        kb.append(row)    kb.extend([        [InlineKeyboardButton(text="❌ Отмена", callback_data="CAL_CANCEL")],        [InlineKeyboardButton(text="🧹 Очистить месяц", callback_data="AM_CLEAR_SCHEDULE")],    ])    return InlineKeyboardMarkup(inline_keyboard=kb)# Handlers@admin.message(Command("admin_menu"), AdminProtect())async def admin_menu(message: Message, state: FSMContext):    await state.clear()    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="🗓 Изменить график (смены)", callback_data="AM_EDIT_SCHEDULE")],        [InlineKeyboardButton(text="🕒 Редактировать часовку", callback_data="AM_EDIT_HOURS")],        [InlineKeyboardButton(text="➕ Добавить сотрудника", callback_data="AM_ADD_EMPLOYEE")],        [InlineKeyboardButton(text="💰 Рассчитать зарплату", callback_data="AM_CALC_SALARY")],        [InlineKeyboardButton(text="📥 Экспортировать таблицу", callback_data="AM_EXPORT_ALL")],    ])    await message.answer("<b>Меню администратора</b>", parse_mode="HTML", reply_markup=kb)# --- ADD EMPLOYEE ---@admin.callback_query(AdminProtect(), F.data == "AM_ADD_EMPLOYEE")async def add_employee_start(query: CallbackQuery, state: FSMContext):    await state.clear()    await state.set_state(AddEmployeeStates.ChooseRole)    await query.message.edit_text("Введите роль сотрудника (например, ОФИЦИАНТЫ, ПОМОЩНИКИ):")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.ChooseRole))async def add_employee_role(message: Message, state: FSMContext):    await state.update_data(role=message.text.strip())    await state.set_state(AddEmployeeStates.InputLastName)    await message.answer("Введите фамилию сотрудника:")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputLastName))async def add_employee_last_name(message: Message, state: FSMContext):    await state.update_data(last_name=message.text.strip())    await state.set_state(AddEmployeeStates.InputFirstName)    await message.answer("Введите имя сотрудника:")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputFirstName))async def add_employee_first_name(message: Message, state: FSMContext):    await state.update_data(first_name=message.text.strip())    await state.set_state(AddEmployeeStates.InputRate)    await message.answer("Введите ставку сотрудника (руб/час, например, 140):")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputRate))async def add_employee_rate(message: Message, state: FSMContext):    emp_id = add_employee(...)  # вернём id    cur = get_cursor()    cur.execute("UPDATE waiters SET employee_id=? WHERE id=?", (emp_id, waiter_id))    sqlite_db.base.commit()    data = await state.get_data()    try:        rate = float(message.text.strip())        if rate <= 0:            raise ValueError("Ставка должна быть положительной")    except ValueError:        await message.answer("Введите корректное число (например, 140).")        return    add_employee(data["last_name"], data["first_name"], data["role"], rate)    await message.answer(        f"Сотрудник {data['last_name']} {data['first_name']} ({data['role']}) с ставкой {rate} руб/час добавлен.",        reply_markup=KB_BACK_MENU    )    await state.clear()# --- SET HOURS ---@admin.callback_query(AdminProtect(), F.data == "AM_EDIT_HOURS")async def sh_start(q: CallbackQuery, state: FSMContext):    await state.clear()    await state.set_state(SetHoursStates.ChooseWaiter)    items = get_employees_with_shifts()  # [('W1','Антон'),('E3','Мария'),...]    keyboard = [        [InlineKeyboardButton(text=name, callback_data=f"EH_EMP|{uid}")]        for uid, name in items    ]    keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    kb = InlineKeyboardMarkup(inline_keyboard=keyboard)    await q.message.edit_text("Выберите сотрудника для часовки:", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(SetHoursStates.ChooseWaiter), F.data.startswith("EH_EMP|"))async def sh_choose_waiter(q: CallbackQuery, state: FSMContext):    uid = q.data.split("|",1)[1]   # e.g. 'W4' или 'E9'    await state.update_data(chosen_uid=uid)    today = datetime.today()    marked = set(get_all_work_hours_dates())    kb = make_calendar(today.year, today.month, marked)    await state.set_state(SetHoursStates.ChooseDate)    await q.message.edit_text("Выберите дату смены:", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(SetHoursStates.ChooseDate), F.data.startswith("CAL_DAY|"))async def sh_choose_date(q: CallbackQuery, state: FSMContext):    # Сохраняем дату    ds = q.data.split("|")[1]    await state.update_data(shift_date=ds)    # Спрашиваем время начала    await state.set_state(SetHoursStates.InputStartTime)    m = await q.message.edit_text(f"Дата: {ds}\nВведите время начала смены (HH:MM):")    await state.update_data(prompt_id=m.message_id)@admin.message(AdminProtect(), StateFilter(SetHoursStates.InputStartTime))async def sh_input_start(msg: Message, state: FSMContext):    data = await state.get_data()    # Убираем предыдущее сообщение-«шаблон»    await _safe_delete_message(msg.bot, msg.chat.id, data.get("prompt_id"))    try:        start_t = datetime.strptime(msg.text.strip(), "%H:%M").time()    except ValueError:        return await msg.reply("Неверный формат, используйте ЧЧ:ММ")    # Сохраняем время начала    await state.update_data(start_time=start_t)    # Спрашиваем время окончания    await state.set_state(SetHoursStates.InputEndTime)    m = await msg.answer("Введите время окончания смены (HH:MM):")    await state.update_data(prompt_id=m.message_id)@admin.message(AdminProtect(), StateFilter(SetHoursStates.InputEndTime))async def sh_input_end(msg: Message, state: FSMContext):    data = await state.get_data()    await _safe_delete_message(msg.bot, msg.chat.id, data.get("prompt_id"))    # парсим конец    try:        end_t = datetime.strptime(msg.text.strip(), "%H:%M").time()    except ValueError:        return await msg.reply("Неверный формат, используйте ЧЧ:ММ")    # считаем часы    dt0 = datetime.combine(datetime.today(), data["start_time"])    dt1 = datetime.combine(datetime.today(), end_t)    if dt1 < dt0:        dt1 += timedelta(days=1)    hrs = (dt1 - dt0).total_seconds() / 3600    uid  = data["chosen_uid"]     # 'W23' или 'E7'    date = data["shift_date"]    # ветвим по первому символу префикса    kind, raw = uid[0], uid[1:]    idx = int(raw)    if kind == "W":        # официант → shifts        add_shift(idx, date)        set_shift_hours(idx, date, hrs)    else:  # kind == "E"        # чистый сотрудник → work_hours        set_work_hours(idx, date, hrs)    await msg.answer(f"Смена {date}: {hrs:.2f} ч сохранена.", reply_markup=KB_BACK_MENU)    await state.clear()# --- EDIT SCHEDULE ---@admin.callback_query(AdminProtect(), F.data == "AM_EDIT_SCHEDULE")async def es_start(query: CallbackQuery, state: FSMContext):    today = datetime.today()    marked = {row[2] for row in get_all_shifts()}  # Using date from get_all_shifts()    kb = make_calendar(today.year, today.month, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.set_state(EditSchedStates.ChooseDate)    await state.update_data(edit_year=today.year, edit_month=today.month)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_PREV|"))async def es_prev_month(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    m -= 1    if m == 0:        y, m = y - 1, 12    marked = {row[2] for row in get_all_shifts()}    kb = make_calendar(y, m, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.update_data(edit_year=y, edit_month=m)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_NEXT|"))async def es_next_month(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    m += 1    if m == 13:        y, m = y + 1, 1    marked = {row[2] for row in get_all_shifts()}    kb = make_calendar(y, m, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.update_data(edit_year=y, edit_month=m)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data == "AM_CLEAR_SCHEDULE")async def es_clear_month(query: CallbackQuery, state: FSMContext):    data = await state.get_data()    cur = get_cursor()    cur.execute("DELETE FROM shifts WHERE date LIKE ?", (f"{data['edit_year']}-{data['edit_month']:02d}-%",))    sqlite_db.base.commit()    await query.answer(f"График за {data['edit_year']}-{data['edit_month']:02d} очищен", show_alert=True)    kb = make_calendar(data['edit_year'], data['edit_month'], set())    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    try:        await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)    except TelegramBadRequest:        # если сообщение и так уже именно такое — просто игнорируем ошибку        pass@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_DAY|"))async def es_choose_date(query: CallbackQuery, state: FSMContext):    date_str = query.data.split("|")[1]    await state.update_data(edit_date=date_str)    current = [name for _, name, d, _, _ in get_all_shifts() if d == date_str]    assigned_block = "Уже назначены:\n• " + "\n• ".join(current) if current else "<i>смена пуста</i>"    waiters = get_employees_with_shifts()    buttons = [        [InlineKeyboardButton(text=name or "Без имени", callback_data=f"ES_WAITER|{waiter_id}")]        for waiter_id, name in waiters    ]    if not buttons:        await query.message.edit_text(            "Нет сотрудников для редактирования графика. Проверьте таблицы waiters и employees.",            reply_markup=KB_BACK_MENU        )        return    buttons.append([InlineKeyboardButton(text="⏪ Отмена", callback_data="AM_EDIT_SCHEDULE")])    kb = InlineKeyboardMarkup(inline_keyboard=buttons)    await state.set_state(EditSchedStates.ChooseWaiter)    # оборачиваем в try/except, чтобы избежать “message is not modified”    try:        await query.message.edit_text(            f"<b>Дата:</b> {date_str}\n\n{assigned_block}\n\n<b>Выберите сотрудника:</b>",            parse_mode="HTML",            reply_markup=kb,        )    except TelegramBadRequest:        # если сообщение не изменилось — просто игнорируем        pass@admin.callback_query(AdminProtect(), F.data.startswith("ES_WAITER|"))async def es_select_waiter(query: CallbackQuery, state: FSMContext):    """    Раньше здесь было:        waiter_id = int(query.data.split("|")[1])    Но callback_data формируется как 'ES_WAITER|W8' или 'ES_WAITER|E3'.    Нужно сначала отделить префикс, а потом конвертировать в int.    """    full = query.data.split("|", maxsplit=1)[1]  # получаем 'W8' или 'E3'    kind, raw = full[0], full[1:]              # kind='W'/'E', raw='8'/'3'    idx = int(raw)                             # теперь чистый числовой ID официанта или сотрудника    await state.update_data(waiter_id=idx)    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="📝 Прописать задачи", callback_data="ES_TASKS")],        [InlineKeyboardButton(text="❌ Без задач",   callback_data="ES_NO_TASKS")],    ])    kb.inline_keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="AM_EDIT_SCHEDULE")])    data = await state.get_data()    date = data["edit_date"]    cur = get_cursor()    cur.execute(        "SELECT COALESCE(e.first_name || ' ' || e.last_name, w.name) AS name "        "FROM waiters w LEFT JOIN employees e ON w.employee_id = e.id "        "WHERE w.id = ?",        (idx,)    )    row = cur.fetchone()    name = row["name"] if row else "Без имени"    await state.set_state(EditSchedStates.ChooseTaskAction)    await query.message.edit_text(f"{date} — {name}", reply_markup=kb)@admin.callback_query(AdminProtect(), F.data == "ES_NO_TASKS")async def es_no_tasks(query: CallbackQuery, state: FSMContext):    data = await state.get_data()    add_shift(data["waiter_id"], data["edit_date"])    await query.message.edit_text("Задач нет. График обновлён.", reply_markup=KB_BACK_MENU)    await state.clear()@admin.message(AdminProtect(), StateFilter(EditSchedStates.InputPersonalTasks))async def es_save_tasks(message: Message, state: FSMContext):    data = await state.get_data()    add_shift(data["waiter_id"], data["edit_date"])    set_shift_tasks(data["waiter_id"], data["edit_date"], message.text.strip())    await message.answer("Задачи сохранены.", reply_markup=KB_BACK_MENU)    await state.clear()@admin.callback_query(AdminProtect(), F.data == "ES_TASKS")async def es_enter_tasks(query: CallbackQuery, state: FSMContext):    await state.set_state(EditSchedStates.InputPersonalTasks)    await query.message.edit_text("Введите список задач (каждый пункт с новой строки):")# --- SALARY ---@admin.callback_query(AdminProtect(), F.data == "AM_CALC_SALARY")async def calc_salary(q: CallbackQuery):    # 1) Период — весь текущий месяц    today = datetime.today()    start = today.replace(day=1)    next_month = (start + timedelta(days=31)).replace(day=1)    end = next_month - timedelta(days=1)    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]    total_all = 0.0    text = f"<b>Часовка за период {start:%Y-%m-%d} — {end:%Y-%m-%d}</b>\n\n"    # 2) Сотрудники из employees    for emp_id, ln, fn, role in get_all_employees():        fio = f"{fn} {ln}".strip()        # ставка из employees.rate или дефолт 140        cur = get_cursor()        cur.execute("SELECT rate FROM employees WHERE id = ?", (emp_id,))        rate = (cur.fetchone()["rate"] or 140.0)        text += f"<u>{fio}</u> ({role}):\n"        subtotal = 0.0        for d in dates:            ds = d.strftime("%Y-%m-%d")            hrs = get_work_hours(emp_id, ds) or 0.0            if hrs > 0:                pay = hrs * rate                subtotal += pay                text += f"• {d:%d.%m}: {hrs:.2f} ч × {rate:.0f} ₽ = {pay:.2f} ₽\n"        text += f"  ➔ <b>Итого за {fio}: {subtotal:.2f} ₽</b>\n\n"        total_all += subtotal    # 3) Официанты без привязки к employees    cur = get_cursor()    cur.execute("SELECT id, tg_id, name FROM waiters WHERE employee_id IS NULL")    for waiter_id, tg_id, name in cur.fetchall():        fio = name or "Без имени"        rate = 180.0 if tg_id == 2015462319 else 140.0        text += f"<u>{fio}</u> (Официант):\n"        subtotal = 0.0        shifts = get_shifts_for(waiter_id)  # {date:{'hours', 'tasks'}}        for d in dates:            ds = d.strftime("%Y-%m-%d")            hrs = shifts.get(ds, {}).get("hours", 0.0) or 0.0            if hrs > 0:                pay = hrs * rate                subtotal += pay                text += f"• {d:%d.%m}: {hrs:.2f} ч × {rate:.0f} ₽ = {pay:.2f} ₽\n"        text += f"  ➔ <b>Итого за {fio}: {subtotal:.2f} ₽</b>\n\n"        total_all += subtotal    text += f"➡️ <b>Общая сумма по всем: {total_all:.2f} ₽</b>"    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="🧹 Обнулить часы за месяц", callback_data=f"AM_CLEAR_PAY|{start.year}|{start.month:02d}")],        [InlineKeyboardButton(text="⏪ В меню админа",    callback_data="AM_BACK_MENU")],    ])    await q.message.edit_text(text, parse_mode="HTML", reply_markup=kb)@admin.callback_query(AdminProtect(), F.data.startswith("AM_CLEAR_PAY|"))async def clear_pay(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    pattern = f"{y}-{m:02d}-%"    cur = get_cursor()    # обнуляем смены    cur.execute("UPDATE shifts SET hours = NULL WHERE date LIKE ?", (pattern,))    # удаляем записи work_hours    cur.execute("DELETE FROM work_hours WHERE date LIKE ?", (pattern,))    sqlite_db.base.commit()    await query.answer("Часы за месяц обнулены!", show_alert=True)    await admin_menu(query.message, state)# --- NOTIFY ---@admin.callback_query(AdminProtect(), F.data == "AM_NOTIFY")async def notify(query: CallbackQuery, state: FSMContext):    await state.clear()    await query.answer("Начинаю рассылку уведомлений…")    for tg_id in get_all_waiters():        try:            await query.bot.send_message(tg_id, "ℹ️ График был изменён! Посмотрите новую смену командой /menu.")        except Exception:            continue    await query.message.edit_text("Уведомления отправлены ✅", reply_markup=KB_BACK_MENU)# --- EXPORT ALL ---def export_colored_schedule(start_date: datetime, staff: list[dict], get_hours_fn, path: str):    """    staff = [        {"fio": "Иванов П.", "role": "Повара",       "rate": 180, "id": 3},        {"fio": "Петров А.", "role": "Официанты",   "rate": 140, "id": 7},        …    ]    """    wb = Workbook()    ws = wb.active    ws.title = f"Часовка {start_date:%d%m%Y}"    # 1) Заголовки    dates   = [start_date + timedelta(days=i) for i in range(15)]    headers = ["ФИО"] + [d.strftime("%d.%m") for d in dates] + ["Ставка", "З/П"]    ws.append(headers)    # Стили    bold       = Font(bold=True)    center     = Alignment(horizontal="center", vertical="center")    thin_border= Border(left=Side("thin"), right=Side("thin"), top=Side("thin"), bottom=Side("thin"))    hdr_fill   = PatternFill("solid", fgColor="BDD7EE")    role_fill  = PatternFill("solid", fgColor="FDE9D9")    total_fill = PatternFill("solid", fgColor="C6EFCE")    # Оформляем шапку    for col in range(1, len(headers)+1):        c = ws.cell(row=1, column=col)        c.font      = bold        c.alignment = center        c.border    = thin_border        c.fill      = hdr_fill    # вычисляем индекс столбца «З/П»    pay_col        = len(headers)    pay_col_letter = get_column_letter(pay_col)    row = 2    # группируем по ролям    for role in sorted({s["role"] for s in staff}):        # заголовок роли        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=pay_col)        rc = ws.cell(row=row, column=1)        rc.value     = role        rc.font      = Font(bold=True, size=12)        rc.alignment = center        rc.fill      = role_fill        row += 1        start_of_group = row        # строки сотрудников        for s in filter(lambda x: x["role"] == role, staff):            # ФИО            c0 = ws.cell(row=row, column=1, value=s["fio"])            c0.alignment = center            c0.border    = thin_border            # часы по дням            for idx, d in enumerate(dates, start=2):                hrs = get_hours_fn(s["id"], d.strftime("%Y-%m-%d")) or 0                c = ws.cell(row=row, column=idx, value=hrs)                c.alignment = center                c.border    = thin_border            # ставка            rate = s["rate"]            cr = ws.cell(row=row, column=2+len(dates), value=rate)            cr.alignment = center            cr.border    = thin_border            # З/П за строку: =SUM(часов)*ставка            first_col = get_column_letter(2)            last_col  = get_column_letter(1 + len(dates))            formula   = f"=SUM({first_col}{row}:{last_col}{row})*{rate}"            cp = ws.cell(row=row, column=pay_col, value=formula)            cp.alignment = center            cp.border    = thin_border            row += 1        # итог по роли        ws.cell(row=row, column=1, value="Итого:").font = bold        for col_idx in range(2, 2 + len(dates)):            col_letter = get_column_letter(col_idx)            c = ws.cell(                row=row,                column=col_idx,                value=f"=SUM({col_letter}{start_of_group}:{col_letter}{row-1})"            )            c.alignment = center            c.fill      = total_fill        # пустая ставка        ws.cell(row=row, column=2+len(dates), value="").fill = total_fill        # итог З/П по роли        total_pay = ws.cell(            row=row,            column=pay_col,            value=f"=SUM({pay_col_letter}{start_of_group}:{pay_col_letter}{row-1})"        )        total_pay.alignment = center        total_pay.fill     = total_fill        total_pay.font     = bold        row += 1    # общий итог по предприятию    grand_row = row + 1    gl = ws.cell(row=grand_row, column=1, value="Итого по предприятию:")    gl.font      = Font(bold=True, size=12)    gl.alignment = center    gp = ws.cell(        row=grand_row,        column=pay_col,        value=f"=SUM({pay_col_letter}2:{pay_col_letter}{row-1})"    )    gp.font      = Font(bold=True, size=12)    gp.alignment = center    wb.save(path)@admin.callback_query(AdminProtect(), F.data=="AM_EXPORT_ALL")async def export_all_start(q: CallbackQuery, state: FSMContext):    await state.clear()    today = datetime.today()    await state.set_state(ExportScheduleStates.ChooseStartDate)    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(today.year, today.month, set())    )@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_DAY|"))async def export_all(q: CallbackQuery, state: FSMContext):    start = datetime.strptime(q.data.split("|")[1], "%Y-%m-%d")    cur   = get_cursor()    # 1) чистые сотрудники из employees    staff: list[dict] = []    for eid, ln, fn, role in get_all_employees():        # достаём ставку        cur.execute("SELECT rate FROM employees WHERE id=?", (eid,))        rate = cur.fetchone()["rate"] or float(os.getenv("HOURLY_RATE", "140"))        staff.append({"id": eid,                      "fio": f"{fn} {ln}".strip(),                      "role": role,                      "rate": rate})    # 2) официанты без привязки к employees    cur.execute("SELECT id, tg_id, name FROM waiters WHERE employee_id IS NULL")    for wid, tg, name in cur.fetchall():        rate = 180.0 if tg == 2015462319 else 140.0        staff.append({            "id":   wid,            "fio":  name or "Без имени",            "role": "Официанты",            "rate": rate        })    # сохраняем файл    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:        export_colored_schedule(start, staff, get_work_hours, tmp.name)        await q.message.answer_document(            FSInputFile(tmp.name, filename=f"schedule_{start:%d%m%Y}.xlsx"),            reply_markup=KB_BACK_MENU        )    os.remove(tmp.name)    await state.clear()@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_PREV|"))async def export_prev(q: CallbackQuery, state: FSMContext):    y,m = map(int, q.data.split("|")[1:])    m -=1    if m==0: y,m = y-1,12    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(y,m,set())    )@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_NEXT|"))async def export_next(q: CallbackQuery, state: FSMContext):    y,m = map(int, q.data.split("|")[1:])    m +=1    if m==13: y,m = y+1,1    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(y,m,set())    )@admin.callback_query(AdminProtect(), F.data=="AM_BACK_MENU")async def back_to_menu(query: CallbackQuery, state: FSMContext):    await state.clear()    await admin_menu(query.message, state)    await _safe_delete_message(query.bot, query.message.chat.id, query.message.message_id)
\ No newline at end of file
+"""Admin-side handlers for «Стародонье»-бота."""from __future__ import annotationsimport asyncioimport loggingimport osimport tempfilefrom datetime import datetime, timedeltafrom typing import Optional, Set, Tuplefrom aiogram import Router, Ffrom aiogram.exceptions import TelegramBadRequest, TelegramNetworkErrorfrom aiogram.filters import Command, CommandObject, StateFilter, BaseFilterfrom aiogram.fsm.context import FSMContextfrom aiogram.fsm.state import StatesGroup, Statefrom aiogram.types import (    CallbackQuery,    InlineKeyboardButton,    InlineKeyboardMarkup,    Message,    FSInputFile,)from openpyxl import Workbookfrom openpyxl.styles import Alignment, Font, Border, Side, PatternFillfrom openpyxl.utils import get_column_letter# Ensure the import path matches your project structuretry:    from app.database import sqlite_dbexcept ImportError as e:    raise ImportError("Could not import sqlite_db. Check if app/database/sqlite_db.py exists.") from efrom app.broadcast import broadcast_messagefrom app.database.profiler import QUERY_PROFILE, profilerfrom app.export import EXPORT_MAX_BYTES, EXPORTS, USAGE as EXPORT_USAGE, ExportFilter, export_table, parse_commandfrom app.keyboards import calendar_keyboardfrom app.media import StreamInputFile, download_chunksfrom app import schedule_importfrom app.video_converter import STREAM_MIN_BYTES, TranscodeError, get_transcode_cache, transcoder# Database helpersfrom app.database.sqlite_db import (    add_shift,    get_all_shifts,    get_employees_with_shifts,    get_all_waiters,    set_shift_tasks,    get_all_work_hours_dates,    add_employee,    get_all_employees,    get_employee_by_id,    get_work_hours,    get_work_hours_range,    get_shifts_for,    get_unlinked_waiters,    get_waiter_display_name,    clear_month_shifts,    clear_month_hours,    set_shift_hours,    set_work_hours)async def _safe_delete_message(bot, chat_id: int, msg_id: Optional[int]):    """Safely deletes a message if it exists."""    if msg_id:        try:            await bot.delete_message(chat_id, msg_id)        except Exception:            passdef _format_payline(*args) -> Tuple[str, float]:    """Formats a payline string and calculates pay based on hours and rate."""    if len(args) == 3:        date, hrs, rate = args        if hrs is None or hrs <= 0:            return f"• {date}: —", 0.0        pay = hrs * rate        return f"• {date}: {hrs:.2f} ч × {rate} = {pay:.2f}", pay    elif len(args) == 4:        name, date, hrs, rate = args        if hrs is None or hrs <= 0:            return f"{name} {date}: —", 0.0        pay = hrs * rate        return f"{name} {date}: {hrs:.2f} ч × {rate} = {pay:.2f}", pay    raise ValueError("_format_payline expects 3 or 4 args")# Router and Guardlogger = logging.getLogger(__name__)admin = Router()ADMIN_IDS = [2015462319, 1773695867]def export_hours_schedule(start_date: datetime, employees: list[dict], get_hours_fn, output_path: str):    wb = Workbook()    ws = wb.active    ws.title = f"Часовка {start_date:%d%m%Y}"    dates = [start_date + timedelta(days=i) for i in range(15)]    headers = ["ФИО"] + [d.strftime("%d.%m") for d in dates] + ["Итого"]    ws.append(headers)    bold = Font(bold=True)    center = Alignment(horizontal="center", vertical="center")    thin = Side(style="thin")    for col in range(1, len(headers) + 1):        c = ws.cell(row=1, column=col)        c.font = bold        c.alignment = center        c.border = Border(left=thin, right=thin, top=thin, bottom=thin)    row = 2    for role in sorted({e["role"] for e in employees}):        # заголовок группы        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=len(headers))        grp = ws.cell(row=row, column=1)        grp.value = role        grp.font = Font(bold=True, size=12)        grp.alignment = center        row += 1        # строки сотрудников        for e in filter(lambda x: x["role"] == role, employees):            name = f"{e['last_name']} {e['first_name']}"            ws.cell(row=row, column=1, value=name).alignment = center            for idx, d in enumerate(dates, start=2):                hrs = get_hours_fn(e["id"], d.strftime("%Y-%m-%d")) or 0                ws.cell(row=row, column=idx, value=hrs).alignment = center            first_col = ws.cell(row=row, column=2).column_letter            last_col = ws.cell(row=row, column=1 + len(dates)).column_letter            ws.cell(row=row, column=2 + len(dates),                    value=f"=SUM({first_col}{row}:{last_col}{row})").alignment = center            row += 1    wb.save(output_path)class AdminProtect(BaseFilter):    async def __call__(self, event) -> bool:        user = getattr(event, "from_user", None)        return bool(user and user.id in ADMIN_IDS)# FSM Statesclass AddEmployeeStates(StatesGroup):    ChooseRole = State()    InputLastName = State()    InputFirstName = State()    InputRate = State()class SetHoursStates(StatesGroup):    ChooseWaiter = State()    ChooseDate = State()    InputStartTime = State()    InputEndTime = State()class EditSchedStates(StatesGroup):    ChooseDate = State()    ChooseWaiter = State()    ChooseTaskAction = State()    InputPersonalTasks = State()class ExportScheduleStates(StatesGroup):    ChooseStartDate = State()class ImportScheduleStates(StatesGroup):    WaitFile = State()    Confirm = State()# UI HelpersKB_BACK_MENU = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")]])CALENDAR_FOOTER = (    [InlineKeyboardButton(text="❌ Отмена", callback_data="CAL_CANCEL")],    [InlineKeyboardButton(text="🧹 Очистить месяц", callback_data="AM_CLEAR_SCHEDULE")],)def make_calendar(year: int, month: int, marked: Set[str]) -> InlineKeyboardMarkup:    return calendar_keyboard(year, month, marked, CALENDAR_FOOTER)# Handlers@admin.message(Command("admin_menu"), AdminProtect())async def admin_menu(message: Message, state: FSMContext):    await state.clear()    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="🗓 Изменить график (смены)", callback_data="AM_EDIT_SCHEDULE")],        [InlineKeyboardButton(text="🕒 Редактировать часовку", callback_data="AM_EDIT_HOURS")],        [InlineKeyboardButton(text="➕ Добавить сотрудника", callback_data="AM_ADD_EMPLOYEE")],        [InlineKeyboardButton(text="💰 Рассчитать зарплату", callback_data="AM_CALC_SALARY")],        [InlineKeyboardButton(text="🏆 Чаевые", callback_data="AM_TIPS")],        [InlineKeyboardButton(text="📥 Экспортировать таблицу", callback_data="AM_EXPORT_ALL")],        [InlineKeyboardButton(text="📤 Загрузить график из таблицы", callback_data="AM_IMPORT_SCHEDULE")],        [InlineKeyboardButton(text="📦 Выгрузка данных", callback_data="AM_EXPORT_DATA")],    ])    await message.answer("<b>Меню администратора</b>", parse_mode="HTML", reply_markup=kb)# --- ADD EMPLOYEE ---@admin.callback_query(AdminProtect(), F.data == "AM_ADD_EMPLOYEE")async def add_employee_start(query: CallbackQuery, state: FSMContext):    await state.clear()    await state.set_state(AddEmployeeStates.ChooseRole)    await query.message.edit_text("Введите роль сотрудника (например, ОФИЦИАНТЫ, ПОМОЩНИКИ):")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.ChooseRole))async def add_employee_role(message: Message, state: FSMContext):    await state.update_data(role=message.text.strip())    await state.set_state(AddEmployeeStates.InputLastName)    await message.answer("Введите фамилию сотрудника:")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputLastName))async def add_employee_last_name(message: Message, state: FSMContext):    await state.update_data(last_name=message.text.strip())    await state.set_state(AddEmployeeStates.InputFirstName)    await message.answer("Введите имя сотрудника:")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputFirstName))async def add_employee_first_name(message: Message, state: FSMContext):    await state.update_data(first_name=message.text.strip())    await state.set_state(AddEmployeeStates.InputRate)    await message.answer("Введите ставку сотрудника (руб/час, например, 140):")@admin.message(AdminProtect(), StateFilter(AddEmployeeStates.InputRate))async def add_employee_rate(message: Message, state: FSMContext):    data = await state.get_data()    try:        rate = float(message.text.strip())        if rate <= 0:            raise ValueError("Ставка должна быть положительной")    except ValueError:        await message.answer("Введите корректное число (например, 140).")        return    await add_employee(data["last_name"], data["first_name"], data["role"], rate)    await message.answer(        f"Сотрудник {data['last_name']} {data['first_name']} ({data['role']}) с ставкой {rate} руб/час добавлен.",        reply_markup=KB_BACK_MENU    )    await state.clear()# --- SET HOURS ---@admin.callback_query(AdminProtect(), F.data == "AM_EDIT_HOURS")async def sh_start(q: CallbackQuery, state: FSMContext):    await state.clear()    await state.set_state(SetHoursStates.ChooseWaiter)    items = await get_employees_with_shifts()  # [('W1','Антон'),('E3','Мария'),...]    keyboard = [        [InlineKeyboardButton(text=name, callback_data=f"EH_EMP|{uid}")]        for uid, name in items    ]    keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    kb = InlineKeyboardMarkup(inline_keyboard=keyboard)    await q.message.edit_text("Выберите сотрудника для часовки:", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(SetHoursStates.ChooseWaiter), F.data.startswith("EH_EMP|"))async def sh_choose_waiter(q: CallbackQuery, state: FSMContext):    uid = q.data.split("|",1)[1]   # e.g. 'W4' или 'E9'    await state.update_data(chosen_uid=uid)    today = datetime.today()    marked = set(await get_all_work_hours_dates())    kb = make_calendar(today.year, today.month, marked)    await state.set_state(SetHoursStates.ChooseDate)    await q.message.edit_text("Выберите дату смены:", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(SetHoursStates.ChooseDate), F.data.startswith("CAL_DAY|"))async def sh_choose_date(q: CallbackQuery, state: FSMContext):    # Сохраняем дату    ds = q.data.split("|")[1]    await state.update_data(shift_date=ds)    # Спрашиваем время начала    await state.set_state(SetHoursStates.InputStartTime)    m = await q.message.edit_text(f"Дата: {ds}\nВведите время начала смены (HH:MM):")    await state.update_data(prompt_id=m.message_id)@admin.message(AdminProtect(), StateFilter(SetHoursStates.InputStartTime))async def sh_input_start(msg: Message, state: FSMContext):    data = await state.get_data()    # Убираем предыдущее сообщение-«шаблон»    await _safe_delete_message(msg.bot, msg.chat.id, data.get("prompt_id"))    try:        start_t = datetime.strptime(msg.text.strip(), "%H:%M").time()    except ValueError:        return await msg.reply("Неверный формат, используйте ЧЧ:ММ")    # Сохраняем время начала (в FSM — строкой, данные хранятся как JSON)    await state.update_data(start_time=start_t.strftime("%H:%M"))    # Спрашиваем время окончания    await state.set_state(SetHoursStates.InputEndTime)    m = await msg.answer("Введите время окончания смены (HH:MM):")    await state.update_data(prompt_id=m.message_id)@admin.message(AdminProtect(), StateFilter(SetHoursStates.InputEndTime))async def sh_input_end(msg: Message, state: FSMContext):    data = await state.get_data()    await _safe_delete_message(msg.bot, msg.chat.id, data.get("prompt_id"))    # парсим конец    try:        end_t = datetime.strptime(msg.text.strip(), "%H:%M").time()    except ValueError:        return await msg.reply("Неверный формат, используйте ЧЧ:ММ")    # считаем часы    dt0 = datetime.combine(datetime.today(), datetime.strptime(data["start_time"], "%H:%M").time())    dt1 = datetime.combine(datetime.today(), end_t)    if dt1 < dt0:        dt1 += timedelta(days=1)    hrs = (dt1 - dt0).total_seconds() / 3600    uid  = data["chosen_uid"]     # 'W23' или 'E7'    date = data["shift_date"]    # ветвим по первому символу префикса    kind, raw = uid[0], uid[1:]    idx = int(raw)    if kind == "W":        # официант → shifts        await add_shift(idx, date)        await set_shift_hours(idx, date, hrs)    else:  # kind == "E"        # чистый сотрудник → work_hours        await set_work_hours(idx, date, hrs)    await msg.answer(f"Смена {date}: {hrs:.2f} ч сохранена.", reply_markup=KB_BACK_MENU)    await state.clear()# --- EDIT SCHEDULE ---@admin.callback_query(AdminProtect(), F.data == "AM_EDIT_SCHEDULE")async def es_start(query: CallbackQuery, state: FSMContext):    today = datetime.today()    marked = {row[2] for row in await get_all_shifts()}  # Using date from get_all_shifts()    kb = make_calendar(today.year, today.month, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.set_state(EditSchedStates.ChooseDate)    await state.update_data(edit_year=today.year, edit_month=today.month)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_PREV|"))async def es_prev_month(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    m -= 1    if m == 0:        y, m = y - 1, 12    marked = {row[2] for row in await get_all_shifts()}    kb = make_calendar(y, m, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.update_data(edit_year=y, edit_month=m)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_NEXT|"))async def es_next_month(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    m += 1    if m == 13:        y, m = y + 1, 1    marked = {row[2] for row in await get_all_shifts()}    kb = make_calendar(y, m, marked)    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    await state.update_data(edit_year=y, edit_month=m)    await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data == "AM_CLEAR_SCHEDULE")async def es_clear_month(query: CallbackQuery, state: FSMContext):    data = await state.get_data()    await clear_month_shifts(f"{data['edit_year']}-{data['edit_month']:02d}")    await query.answer(f"График за {data['edit_year']}-{data['edit_month']:02d} очищен", show_alert=True)    kb = make_calendar(data['edit_year'], data['edit_month'], set())    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")])    try:        await query.message.edit_text("Изменить график: выберите дату", reply_markup=kb)    except TelegramBadRequest:        # если сообщение и так уже именно такое — просто игнорируем ошибку        pass@admin.callback_query(AdminProtect(), StateFilter(EditSchedStates.ChooseDate), F.data.startswith("CAL_DAY|"))async def es_choose_date(query: CallbackQuery, state: FSMContext):    date_str = query.data.split("|")[1]    await state.update_data(edit_date=date_str)    current = [name for _, name, d, _, _ in await get_all_shifts() if d == date_str]    assigned_block = "Уже назначены:\n• " + "\n• ".join(current) if current else "<i>смена пуста</i>"    waiters = await get_employees_with_shifts()    buttons = [        [InlineKeyboardButton(text=name or "Без имени", callback_data=f"ES_WAITER|{waiter_id}")]        for waiter_id, name in waiters    ]    if not buttons:        await query.message.edit_text(            "Нет сотрудников для редактирования графика. Проверьте таблицы waiters и employees.",            reply_markup=KB_BACK_MENU        )        return    buttons.append([InlineKeyboardButton(text="⏪ Отмена", callback_data="AM_EDIT_SCHEDULE")])    kb = InlineKeyboardMarkup(inline_keyboard=buttons)    await state.set_state(EditSchedStates.ChooseWaiter)    # оборачиваем в try/except, чтобы избежать “message is not modified”    try:        await query.message.edit_text(            f"<b>Дата:</b> {date_str}\n\n{assigned_block}\n\n<b>Выберите сотрудника:</b>",            parse_mode="HTML",            reply_markup=kb,        )    except TelegramBadRequest:        # если сообщение не изменилось — просто игнорируем        pass@admin.callback_query(AdminProtect(), F.data.startswith("ES_WAITER|"))async def es_select_waiter(query: CallbackQuery, state: FSMContext):    """    Раньше здесь было:        waiter_id = int(query.data.split("|")[1])    Но callback_data формируется как 'ES_WAITER|W8' или 'ES_WAITER|E3'.    Нужно сначала отделить префикс, а потом конвертировать в int.    """    full = query.data.split("|", maxsplit=1)[1]  # получаем 'W8' или 'E3'    kind, raw = full[0], full[1:]              # kind='W'/'E', raw='8'/'3'    idx = int(raw)                             # теперь чистый числовой ID официанта или сотрудника    await state.update_data(waiter_id=idx)    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="📝 Прописать задачи", callback_data="ES_TASKS")],        [InlineKeyboardButton(text="❌ Без задач",   callback_data="ES_NO_TASKS")],    ])    kb.inline_keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="AM_EDIT_SCHEDULE")])    data = await state.get_data()    date = data["edit_date"]    name = await get_waiter_display_name(idx) or "Без имени"    await state.set_state(EditSchedStates.ChooseTaskAction)    await query.message.edit_text(f"{date} — {name}", reply_markup=kb)@admin.callback_query(AdminProtect(), F.data == "ES_NO_TASKS")async def es_no_tasks(query: CallbackQuery, state: FSMContext):    data = await state.get_data()    await add_shift(data["waiter_id"], data["edit_date"])    await query.message.edit_text("Задач нет. График обновлён.", reply_markup=KB_BACK_MENU)    await state.clear()@admin.message(AdminProtect(), StateFilter(EditSchedStates.InputPersonalTasks))async def es_save_tasks(message: Message, state: FSMContext):    data = await state.get_data()    await add_shift(data["waiter_id"], data["edit_date"])    await set_shift_tasks(data["waiter_id"], data["edit_date"], message.text.strip())    await message.answer("Задачи сохранены.", reply_markup=KB_BACK_MENU)    await state.clear()@admin.callback_query(AdminProtect(), F.data == "ES_TASKS")async def es_enter_tasks(query: CallbackQuery, state: FSMContext):    await state.set_state(EditSchedStates.InputPersonalTasks)    await query.message.edit_text("Введите список задач (каждый пункт с новой строки):")# --- SALARY ---@admin.callback_query(AdminProtect(), F.data == "AM_CALC_SALARY")async def calc_salary(q: CallbackQuery):    # 1) Период — весь текущий месяц    today = datetime.today()    start = today.replace(day=1)    next_month = (start + timedelta(days=31)).replace(day=1)    end = next_month - timedelta(days=1)    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]    total_all = 0.0    text = f"<b>Часовка за период {start:%Y-%m-%d} — {end:%Y-%m-%d}</b>\n\n"    # 2) Сотрудники из employees    for emp_id, ln, fn, role in await get_all_employees():        fio = f"{fn} {ln}".strip()        # ставка из employees.rate или дефолт 140        rate = ((await get_employee_by_id(emp_id))["rate"] or 140.0)        text += f"<u>{fio}</u> ({role}):\n"        subtotal = 0.0        for d in dates:            ds = d.strftime("%Y-%m-%d")            hrs = await get_work_hours(emp_id, ds) or 0.0            if hrs > 0:                pay = hrs * rate                subtotal += pay                text += f"• {d:%d.%m}: {hrs:.2f} ч × {rate:.0f} ₽ = {pay:.2f} ₽\n"        text += f"  ➔ <b>Итого за {fio}: {subtotal:.2f} ₽</b>\n\n"        total_all += subtotal    # 3) Официанты без привязки к employees    for waiter_id, tg_id, name in await get_unlinked_waiters():        fio = name or "Без имени"        rate = 180.0 if tg_id == 2015462319 else 140.0        text += f"<u>{fio}</u> (Официант):\n"        subtotal = 0.0        shifts = await get_shifts_for(waiter_id)  # {date:{'hours', 'tasks'}}        for d in dates:            ds = d.strftime("%Y-%m-%d")            hrs = shifts.get(ds, {}).get("hours", 0.0) or 0.0            if hrs > 0:                pay = hrs * rate                subtotal += pay                text += f"• {d:%d.%m}: {hrs:.2f} ч × {rate:.0f} ₽ = {pay:.2f} ₽\n"        text += f"  ➔ <b>Итого за {fio}: {subtotal:.2f} ₽</b>\n\n"        total_all += subtotal    text += f"➡️ <b>Общая сумма по всем: {total_all:.2f} ₽</b>"    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="🧹 Обнулить часы за месяц", callback_data=f"AM_CLEAR_PAY|{start.year}|{start.month:02d}")],        [InlineKeyboardButton(text="⏪ В меню админа",    callback_data="AM_BACK_MENU")],    ])    await q.message.edit_text(text, parse_mode="HTML", reply_markup=kb)@admin.callback_query(AdminProtect(), F.data.startswith("AM_CLEAR_PAY|"))async def clear_pay(query: CallbackQuery, state: FSMContext):    y, m = map(int, query.data.split("|")[1:])    # обнуляем смены и удаляем записи work_hours    await clear_month_hours(f"{y}-{m:02d}")    await query.answer("Часы за месяц обнулены!", show_alert=True)    await admin_menu(query.message, state)@admin.message(AdminProtect(), Command("check_hours"))async def check_hours(message: Message, command: CommandObject):    """/check_hours [YYYY-MM] [fix] — сверить сводку monthly_hours с часовкой и сменами."""    args = (command.args or "").split()    fix = "fix" in args    months = [a for a in args if a != "fix"]    ym = months[0] if months else None    if ym is not None:        try:            datetime.strptime(ym, "%Y-%m")        except ValueError:            await message.answer("Формат: /check_hours [YYYY-MM] [fix]")            return    period = ym or "всю историю"    diffs = await sqlite_db.check_monthly_hours(ym)    if not diffs:        await message.answer(f"Сводка часов за {period} сходится ✅")        return    lines = [f"• {m}, сотрудник {emp}: в сводке {stored:.2f} ч, по данным {actual:.2f} ч"             for m, emp, stored, actual in diffs[:20]]    text = f"Расхождений за {period}: {len(diffs)}\n" + "\n".join(lines)    if fix:        rows = await sqlite_db.rebuild_monthly_hours(ym)        text += f"\n\nСводка пересчитана ({rows} строк)."    else:        text += "\n\nПересчитать: /check_hours " + (f"{ym} " if ym else "") + "fix"    await message.answer(text)# --- TIPS ---def _shift_ym(ym: str, months: int) -> str:    y, m = map(int, ym.split("-"))    y, m = divmod(y * 12 + m - 1 + months, 12)    return f"{y:04d}-{m + 1:02d}"@admin.callback_query(AdminProtect(), F.data.startswith("AM_TIPS"))async def tips_leaderboard(q: CallbackQuery):    """Рейтинг официантов по чаевым за месяц (AM_TIPS — текущий, AM_TIPS|YYYY-MM — выбранный)."""    await q.answer()    _, _, ym = q.data.partition("|")    ym = ym or datetime.today().strftime("%Y-%m")    rows = await sqlite_db.get_tips_leaderboard(ym)    medals = ["🥇", "🥈", "🥉"]    lines = [        f"{medals[i] if i < len(medals) else f'{i + 1}.'} {name}: {total:.2f} ₽ за {days} дн."        for i, (name, total, days) in enumerate(rows)    ]    text = f"<b>Чаевые за {ym}</b>\n\n" + ("\n".join(lines) or "<i>чаевых пока нет</i>")    text += "\n\nОтчёт за период: /tips_report YYYY-MM [YYYY-MM]"    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text="◀️", callback_data=f"AM_TIPS|{_shift_ym(ym, -1)}"),         InlineKeyboardButton(text="▶️", callback_data=f"AM_TIPS|{_shift_ym(ym, 1)}")],        [InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")],    ])    await q.message.edit_text(text, parse_mode="HTML", reply_markup=kb)@admin.message(AdminProtect(), Command("tips_report"))async def tips_report(message: Message, command: CommandObject):    """/tips_report YYYY-MM [YYYY-MM] — чаевые по официантам за месяц или период."""    months = (command.args or "").split()    try:        for ym in months:            datetime.strptime(ym, "%Y-%m")    except ValueError:        months = []    if not 1 <= len(months) <= 2:        await message.answer("Формат: /tips_report YYYY-MM [YYYY-MM]")        return    from_ym, to_ym = sorted((months[0], months[-1]))    rows = await sqlite_db.get_tips_report(from_ym, to_ym)    period = from_ym if from_ym == to_ym else f"{from_ym} — {to_ym}"    total = sum(r[1] for r in rows)    lines = [f"• {name}: {amount:.2f} ₽ ({days} дн.)" for name, amount, days in rows]    text = f"<b>Чаевые за {period}</b>\n\n" + ("\n".join(lines) or "<i>чаевых нет</i>")    text += f"\n\n➡️ <b>Всего: {total:.2f} ₽</b>"    await message.answer(text, parse_mode="HTML")# --- NOTIFY ---@admin.callback_query(AdminProtect(), F.data == "AM_NOTIFY")async def notify(query: CallbackQuery, state: FSMContext):    await state.clear()    await query.answer("Начинаю рассылку уведомлений…")    results = await broadcast_message(        query.bot, await get_all_waiters(), "ℹ️ График был изменён! Посмотрите новую смену командой /menu."    )    delivered = sum(r.ok for r in results)    await query.message.edit_text(f"Уведомления отправлены ✅ ({delivered}/{len(results)})", reply_markup=KB_BACK_MENU)# --- VIDEO NOTE ---@admin.message(AdminProtect(), StateFilter(None), F.video)async def video_to_note(message: Message):    """Админ присылает ролик — бот возвращает его кружком (video note)."""    try:        file = await message.bot.get_file(message.video.file_id)    except TelegramBadRequest as e:        # Bot API отдаёт боту файлы не больше 20 МБ        if "too big" not in e.message:            raise        await message.answer("❗️ Не удалось сделать кружок: ролик слишком большой, бот может скачать не больше 20 МБ.")        return    if (message.video.file_size or 0) >= STREAM_MIN_BYTES:        # Большой ролик: из скачивания прямо в ffmpeg и из ffmpeg прямо в загрузку, без файлов.        # Не каждый MP4 читается из пайпа — тогда ниже обычный путь через диск и кэш.        try:            chunks = transcoder.stream(download_chunks(message.bot, file))            await message.answer_video_note(StreamInputFile(chunks, "video_note.mp4"))            return        except (TranscodeError, TelegramNetworkError) as e:            logger.warning("Streaming video note failed, falling back to file: %s", e)    with tempfile.TemporaryDirectory() as tmp:        src = os.path.join(tmp, "input")        await message.bot.download_file(file.file_path, destination=src)        try:            async with get_transcode_cache().converted(src) as note:                await message.answer_video_note(FSInputFile(note))        except TranscodeError as e:            await message.answer(f"❗️ Не удалось сделать кружок: {e}")# --- SLOW QUERIES ---@admin.message(AdminProtect(), Command("slow_queries"))async def slow_queries(message: Message, command: CommandObject):    """Топ SQL по суммарному времени с планами; /slow_queries reset — обнулить."""    if not QUERY_PROFILE:        await message.answer("Профилирование выключено: запустите бота с QUERY_PROFILE=1.")        return    if (command.args or "").strip() == "reset":        profiler.reset()        await message.answer("Статистика запросов обнулена.")        return    report = profiler.report(10)    # лимит сообщения Telegram — 4096 символов    for start in range(0, len(report), 4000):        await message.answer(report[start:start + 4000])# --- SCHEDULE IMPORT ---async def _prepare_import(message: Message, file_id: str, suffix: str, year: int | None):    """Скачивает таблицу во временный каталог и строит план загрузки."""    with tempfile.TemporaryDirectory() as tmp:        path = os.path.join(tmp, f"schedule{suffix}")        await message.bot.download(file_id, destination=path)        return await schedule_import.prepare(path, year)KB_IMPORT_CONFIRM = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="✅ Загрузить", callback_data="IMPORT_APPLY")],    [InlineKeyboardButton(text="❌ Отмена", callback_data="AM_BACK_MENU")],])@admin.callback_query(AdminProtect(), F.data == "AM_IMPORT_SCHEDULE")async def import_schedule_start(q: CallbackQuery, state: FSMContext):    await state.clear()    await state.set_state(ImportScheduleStates.WaitFile)    await q.message.edit_text(        "Пришлите таблицу графика (.xlsx или .csv): в первом столбце — сотрудники, "        "в шапке — даты; в ячейках часы или задачи. Если даты без года — укажите год в подписи.",        reply_markup=KB_BACK_MENU,    )@admin.message(AdminProtect(), StateFilter(ImportScheduleStates.WaitFile), F.document)async def import_schedule_file(message: Message, state: FSMContext):    suffix = os.path.splitext(message.document.file_name or "")[1].lower()    if suffix not in (".xlsx", ".csv"):        await message.answer("Нужен файл .xlsx или .csv.")        return    year = next((int(t) for t in (message.caption or "").split() if t.isdigit() and len(t) == 4), None)    plan = await _prepare_import(message, message.document.file_id, suffix, year)    preview = plan.preview()[:4000]    if plan.errors or not plan.rows:        await message.answer(preview + "\n\nИсправьте файл и пришлите снова.", reply_markup=KB_BACK_MENU)        return    await state.update_data(import_file=message.document.file_id, import_suffix=suffix, import_year=year,                            import_digest=plan.digest())    await state.set_state(ImportScheduleStates.Confirm)    await message.answer(preview, reply_markup=KB_IMPORT_CONFIRM)@admin.callback_query(AdminProtect(), StateFilter(ImportScheduleStates.Confirm), F.data == "IMPORT_APPLY")async def import_schedule_apply(q: CallbackQuery, state: FSMContext):    data = await state.get_data()    await q.answer("Загружаю…")    # План строим заново: если график изменился, пока админ смотрел предпросмотр,    # diff уже другой — показываем новый и снова ждём подтверждения    plan = await _prepare_import(q.message, data["import_file"], data["import_suffix"], data["import_year"])    if plan.errors:        await q.message.edit_text(plan.preview()[:4000], reply_markup=KB_BACK_MENU)    elif plan.digest() != data.get("import_digest"):        await state.update_data(import_digest=plan.digest())        await q.message.edit_text(            ("График изменился после предпросмотра, проверьте заново.\n\n" + plan.preview())[:4000],            reply_markup=KB_IMPORT_CONFIRM,        )        return    else:        rows = await schedule_import.apply(plan)        await q.message.edit_text(            f"График загружен ✅ ({rows} ячеек, {plan.first} — {plan.last})", reply_markup=KB_BACK_MENU        )    await state.clear()# --- DATA EXPORT ---async def _send_export(message: Message, kind: str, flt: ExportFilter, fmt: str):    """Выгружает таблицу во временный файл и отправляет документом."""    spec = EXPORTS[kind]    with tempfile.TemporaryDirectory() as tmp:        try:            path, rows = await export_table(kind, flt, tmp, fmt)        except ValueError as e:            await message.answer(f"❗️ {e}")            return        if not rows:            await message.answer(f"{spec.title}: за выбранный период ничего нет.", reply_markup=KB_BACK_MENU)            return        if os.path.getsize(path) > EXPORT_MAX_BYTES:            await message.answer(                f"{spec.title}: {rows} строк — файл больше 50 МБ. Сузьте период или выгрузите в csv.",                reply_markup=KB_BACK_MENU,            )            return        await message.answer_document(            FSInputFile(path), caption=f"{spec.title}: {rows} строк", reply_markup=KB_BACK_MENU        )@admin.message(AdminProtect(), Command("export"))async def export_data(message: Message, command: CommandObject):    """/export <вид> [с] [по] [сотрудник] [csv] — выгрузка таблицы с фильтрами."""    if not command.args:        await message.answer(EXPORT_USAGE)        return    try:        kind, flt, fmt = parse_command(command.args)    except ValueError as e:        await message.answer(f"❗️ {e}\n\n{EXPORT_USAGE}")        return    await _send_export(message, kind, flt, fmt)@admin.callback_query(AdminProtect(), F.data == "AM_EXPORT_DATA")async def export_data_menu(q: CallbackQuery, state: FSMContext):    await state.clear()    kb = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text=spec.title, callback_data=f"EXPORT_DATA|{kind}")]        for kind, spec in EXPORTS.items()    ] + [[InlineKeyboardButton(text="⏪ В меню админа", callback_data="AM_BACK_MENU")]])    await q.message.edit_text(        "Выгрузка целиком в xlsx. С фильтрами по датам и сотруднику — командой:\n" + EXPORT_USAGE,        reply_markup=kb,    )@admin.callback_query(AdminProtect(), F.data.startswith("EXPORT_DATA|"))async def export_data_full(q: CallbackQuery):    kind = q.data.split("|", 1)[1]    if kind not in EXPORTS:        await q.answer()        return    await q.answer("Готовлю файл…")    await _send_export(q.message, kind, ExportFilter(), "xlsx")# --- EXPORT ALL ---def export_colored_schedule(start_date: datetime, staff: list[dict], get_hours_fn, path: str):    """    staff = [        {"fio": "Иванов П.", "role": "Повара",       "rate": 180, "id": 3},        {"fio": "Петров А.", "role": "Официанты",   "rate": 140, "id": 7},        …    ]    """    wb = Workbook()    ws = wb.active    ws.title = f"Часовка {start_date:%d%m%Y}"    # 1) Заголовки    dates   = [start_date + timedelta(days=i) for i in range(15)]    headers = ["ФИО"] + [d.strftime("%d.%m") for d in dates] + ["Ставка", "З/П"]    ws.append(headers)    # Стили    bold       = Font(bold=True)    center     = Alignment(horizontal="center", vertical="center")    thin_border= Border(left=Side("thin"), right=Side("thin"), top=Side("thin"), bottom=Side("thin"))    hdr_fill   = PatternFill("solid", fgColor="BDD7EE")    role_fill  = PatternFill("solid", fgColor="FDE9D9")    total_fill = PatternFill("solid", fgColor="C6EFCE")    # Оформляем шапку    for col in range(1, len(headers)+1):        c = ws.cell(row=1, column=col)        c.font      = bold        c.alignment = center        c.border    = thin_border        c.fill      = hdr_fill    # вычисляем индекс столбца «З/П»    pay_col        = len(headers)    pay_col_letter = get_column_letter(pay_col)    row = 2    # группируем по ролям    for role in sorted({s["role"] for s in staff}):        # заголовок роли        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=pay_col)        rc = ws.cell(row=row, column=1)        rc.value     = role        rc.font      = Font(bold=True, size=12)        rc.alignment = center        rc.fill      = role_fill        row += 1        start_of_group = row        # строки сотрудников        for s in filter(lambda x: x["role"] == role, staff):            # ФИО            c0 = ws.cell(row=row, column=1, value=s["fio"])            c0.alignment = center            c0.border    = thin_border            # часы по дням            for idx, d in enumerate(dates, start=2):                hrs = get_hours_fn(s["id"], d.strftime("%Y-%m-%d")) or 0                c = ws.cell(row=row, column=idx, value=hrs)                c.alignment = center                c.border    = thin_border            # ставка            rate = s["rate"]            cr = ws.cell(row=row, column=2+len(dates), value=rate)            cr.alignment = center            cr.border    = thin_border            # З/П за строку: =SUM(часов)*ставка            first_col = get_column_letter(2)            last_col  = get_column_letter(1 + len(dates))            formula   = f"=SUM({first_col}{row}:{last_col}{row})*{rate}"            cp = ws.cell(row=row, column=pay_col, value=formula)            cp.alignment = center            cp.border    = thin_border            row += 1        # итог по роли        ws.cell(row=row, column=1, value="Итого:").font = bold        for col_idx in range(2, 2 + len(dates)):            col_letter = get_column_letter(col_idx)            c = ws.cell(                row=row,                column=col_idx,                value=f"=SUM({col_letter}{start_of_group}:{col_letter}{row-1})"            )            c.alignment = center            c.fill      = total_fill        # пустая ставка        ws.cell(row=row, column=2+len(dates), value="").fill = total_fill        # итог З/П по роли        total_pay = ws.cell(            row=row,            column=pay_col,            value=f"=SUM({pay_col_letter}{start_of_group}:{pay_col_letter}{row-1})"        )        total_pay.alignment = center        total_pay.fill     = total_fill        total_pay.font     = bold        row += 1    # общий итог по предприятию    grand_row = row + 1    gl = ws.cell(row=grand_row, column=1, value="Итого по предприятию:")    gl.font      = Font(bold=True, size=12)    gl.alignment = center    gp = ws.cell(        row=grand_row,        column=pay_col,        value=f"=SUM({pay_col_letter}2:{pay_col_letter}{row-1})"    )    gp.font      = Font(bold=True, size=12)    gp.alignment = center    wb.save(path)@admin.callback_query(AdminProtect(), F.data=="AM_EXPORT_ALL")async def export_all_start(q: CallbackQuery, state: FSMContext):    await state.clear()    today = datetime.today()    await state.set_state(ExportScheduleStates.ChooseStartDate)    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(today.year, today.month, set())    )@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_DAY|"))async def export_all(q: CallbackQuery, state: FSMContext):    start = datetime.strptime(q.data.split("|")[1], "%Y-%m-%d")    # 1) чистые сотрудники из employees    staff: list[dict] = []    for eid, ln, fn, role in await get_all_employees():        # достаём ставку        rate = (await get_employee_by_id(eid))["rate"] or float(os.getenv("HOURLY_RATE", "140"))        staff.append({"id": eid,                      "fio": f"{fn} {ln}".strip(),                      "role": role,                      "rate": rate})    # 2) официанты без привязки к employees    for wid, tg, name in await get_unlinked_waiters():        rate = 180.0 if tg == 2015462319 else 140.0        staff.append({            "id":   wid,            "fio":  name or "Без имени",            "role": "Официанты",            "rate": rate        })    # часы за 15 дней одним запросом, чтобы не ходить в базу из openpyxl    end = start + timedelta(days=14)    hours = await get_work_hours_range(f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}")    # сохраняем файл (openpyxl — в отдельном потоке)    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:        await asyncio.to_thread(            export_colored_schedule, start, staff, lambda eid, ds: hours.get((eid, ds), 0), tmp.name        )        await q.message.answer_document(            FSInputFile(tmp.name, filename=f"schedule_{start:%d%m%Y}.xlsx"),            reply_markup=KB_BACK_MENU        )    os.remove(tmp.name)    await state.clear()@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_PREV|"))async def export_prev(q: CallbackQuery, state: FSMContext):    y,m = map(int, q.data.split("|")[1:])    m -=1    if m==0: y,m = y-1,12    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(y,m,set())    )@admin.callback_query(AdminProtect(), StateFilter(ExportScheduleStates.ChooseStartDate), F.data.startswith("CAL_NEXT|"))async def export_next(q: CallbackQuery, state: FSMContext):    y,m = map(int, q.data.split("|")[1:])    m +=1    if m==13: y,m = y+1,1    await q.message.edit_text(        "Выберите начальную дату для экспорта (15 дней):",        reply_markup=make_calendar(y,m,set())    )@admin.callback_query(AdminProtect(), F.data=="AM_BACK_MENU")async def back_to_menu(query: CallbackQuery, state: FSMContext):    await state.clear()    await admin_menu(query.message, state)    await _safe_delete_message(query.bot, query.message.chat.id, query.message.message_id)
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Рассылка сообщений в несколько чатов с учётом лимитов Telegram.
+
+Отправки идут параллельно (не больше concurrency одновременно) через два
+token bucket: общий на бота (~30 сообщений/с) и отдельный на каждый чат
+(1 сообщение/с в личку, 20 в минуту в группу). RetryAfter и сетевые/серверные
+ошибки повторяются с паузой, результат возвращается по каждому получателю.
+
+    results = await broadcast_message(bot, ADMIN_CHAT_IDS, text, parse_mode="HTML")
+    delivered = sum(r.ok for r in results)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "30"))
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity про запас; acquire() ждёт токен по очереди."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    @property
+    def idle(self) -> bool:
+        """Бакет полон — его можно выбросить, ничего не потеряв."""
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: int
+    ok: bool
+    attempts: int
+    result: object = None
+    error: str | None = None
+
+
+class Broadcaster:
+    """
+    Лимиты общие для всех вызовов одного экземпляра, поэтому на процесс бота
+    используется один broadcaster (см. ниже), из какого бы роутера ни шла рассылка.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        global_rate: float = BROADCAST_GLOBAL_RATE,
+        private_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_retry_after: float = 30.0,
+        max_chat_buckets: int = 1000,
+    ):
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.max_chat_buckets = max_chat_buckets
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chat_buckets:
+                self._chats = {cid: b for cid, b in self._chats.items() if not b.idle}
+            # у групп и каналов id отрицательные
+            bucket = TokenBucket(self.group_rate if chat_id < 0 else self.private_rate)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _deliver_one(self, chat_id: int, send: Callable[[int], Awaitable]) -> DeliveryResult:
+        error: Exception | None = None
+        for attempt in range(1, self.max_attempts + 1):
+            await self._chat_bucket(chat_id).acquire()
+            async with self._semaphore:
+                await self._global.acquire()
+                try:
+                    return DeliveryResult(chat_id, True, attempt, result=await send(chat_id))
+                except TelegramRetryAfter as e:
+                    error, delay = e, e.retry_after
+                    if delay > self.max_retry_after:
+                        break
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    error, delay = e, self.backoff * 2 ** (attempt - 1)
+                except TelegramAPIError as e:
+                    # заблокировал бота, чат не найден и т.п. — повтор не поможет
+                    error = e
+                    break
+                except Exception as e:
+                    logger.exception("Broadcast to %s failed", chat_id)
+                    error = e
+                    break
+            if attempt < self.max_attempts:
+                await asyncio.sleep(delay)
+        logger.warning("Broadcast to %s not delivered: %s", chat_id, error)
+        return DeliveryResult(chat_id, False, attempt, error=str(error))
+
+    async def deliver(self, chat_ids: Iterable[int], send: Callable[[int], Awaitable]) -> list[DeliveryResult]:
+        """Вызывает send(chat_id) для каждого чата (без повторов одного id); результаты — в порядке chat_ids."""
+        return list(await asyncio.gather(*(self._deliver_one(cid, send) for cid in dict.fromkeys(chat_ids))))
+
+
+broadcaster = Broadcaster()
+
+
+async def broadcast_message(bot: Bot, chat_ids: Iterable[int], text: str, **kwargs) -> list[DeliveryResult]:
+    """bot.send_message(chat_id, text, **kwargs) во все чаты через общий broadcaster."""
+    return await broadcaster.deliver(chat_ids, lambda chat_id: bot.send_message(chat_id, text, **kwargs))
@@ -5,7 +5,6 @@ Waiter‑side calendar, forecast & tips for «Стародонье».
 
 from __future__ import annotations
 
-import calendar
 import os
 from datetime import datetime
 from decimal import Decimal
@@ -23,13 +22,14 @@ from aiogram.types import (
     Message,
 )
 
+from app.broadcast import broadcast_message
+from app.keyboards import calendar_keyboard
 from app.database.sqlite_db import (
     add_waiter,
     get_waiter_by_tg,
     get_waiter_id_by_tg,
-    get_shifts_for,
+    get_shifts_for_month,
     add_tip,
-    get_month_tips,
     clear_month_tips,
     set_waiter_name,
 )
@@ -65,39 +65,13 @@ class TipsState(StatesGroup):
 #   UI builders
 # ────────────────────────────────
 
-def make_calendar(year: int, month: int, marked: Set[str]) -> InlineKeyboardMarkup:
-    """Return an inline‑calendar with marked dates (buttons use named args)."""
+CAL_CANCEL_ROW = [InlineKeyboardButton(text="❌ Отмена", callback_data="CAL_CANCEL")]
+MENU_ROW = [InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")]
 
-    kb: list[list[InlineKeyboardButton]] = []
 
-    # Header navigation
-    kb.append([
-        InlineKeyboardButton(text="‹", callback_data=f"CAL_PREV|{year}|{month}"),
-        InlineKeyboardButton(text=f"{calendar.month_name[month]} {year}", callback_data="IGNORE"),
-        InlineKeyboardButton(text="›", callback_data=f"CAL_NEXT|{year}|{month}"),
-    ])
-
-    # Weekdays row
-    kb.append([
-        InlineKeyboardButton(text=d, callback_data="IGNORE")
-        for d in ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
-    ])
-
-    # Days grid
-    for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month):
-        row: list[InlineKeyboardButton] = []
-        for day in week:
-            if day == 0:
-                row.append(InlineKeyboardButton(text=" ", callback_data="IGNORE"))
-            else:
-                ds = f"{year:04d}-{month:02d}-{day:02d}"
-                mark = "✓" if ds in marked else ""
-                row.append(InlineKeyboardButton(text=f"{day}{mark}", callback_data=f"CAL_DAY|{ds}"))
-        kb.append(row)
-
-    # Footer
-    kb.append([InlineKeyboardButton(text="❌ Отмена", callback_data="CAL_CANCEL")])
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+def make_calendar(year: int, month: int, marked: Set[str], footer=()) -> InlineKeyboardMarkup:
+    """Return an inline‑calendar with marked dates and extra footer rows after «Отмена»."""
+    return calendar_keyboard(year, month, marked, (CAL_CANCEL_ROW, *footer))
 
 
 WAITER_MENU = InlineKeyboardMarkup(
@@ -130,10 +104,10 @@ async def waiter_menu_del(q: CallbackQuery):
 
 async def _send_calendar(m: Message, uid: int, edit: bool = False):
     """Send or edit waiter calendar."""
-    wid = get_waiter_id_by_tg(uid)
-    shifts = get_shifts_for(wid) if wid else {}
-    kb = make_calendar(datetime.today().year, datetime.today().month, set(shifts.keys()))
-    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+    today = datetime.today()
+    wid = await get_waiter_id_by_tg(uid)
+    shifts = await get_shifts_for_month(wid, today.year, today.month) if wid else {}
+    kb = make_calendar(today.year, today.month, shifts.keys(), footer=[MENU_ROW])
 
     try:
         if edit:
@@ -147,10 +121,10 @@ async def _send_calendar(m: Message, uid: int, edit: bool = False):
 @router.message(Command("calendar"))
 async def cmd_calendar(msg: Message, state: FSMContext):
     # Check if the user exists in the waiters table
-    waiter = get_waiter_by_tg(msg.from_user.id)
+    waiter = await get_waiter_by_tg(msg.from_user.id)
     if not waiter:
         # User doesn't exist, add them to the waiters table with name as NULL
-        add_waiter(msg.from_user.id)
+        await add_waiter(msg.from_user.id)
         await msg.answer("Введите своё имя для календаря:")
         await state.set_state(FillName.waiting)
         return
@@ -164,7 +138,7 @@ async def cmd_calendar(msg: Message, state: FSMContext):
 @router.message(StateFilter(FillName.waiting))
 async def save_name(msg: Message, state: FSMContext):
     name = msg.text.strip()
-    set_waiter_name(msg.from_user.id, name)
+    await set_waiter_name(msg.from_user.id, name)
     await msg.answer(f"Спасибо, {name}!")
     await _send_calendar(msg, msg.from_user.id)
     await state.clear()
@@ -175,10 +149,10 @@ async def save_name(msg: Message, state: FSMContext):
 async def waiter_calendar_cb(q: CallbackQuery, state: FSMContext):
     """Показывает календарь при нажатии кнопки в главном меню."""
     # Check if the user exists in the waiters table
-    waiter = get_waiter_by_tg(q.from_user.id)
+    waiter = await get_waiter_by_tg(q.from_user.id)
     if not waiter:
         # User doesn't exist, add them to the waiters table with name as NULL
-        add_waiter(q.from_user.id)
+        await add_waiter(q.from_user.id)
         await q.message.edit_text("Введите своё имя для календаря:")
         await state.set_state(FillName.waiting)
         return
@@ -202,9 +176,9 @@ async def prev_month(q: CallbackQuery):
     y, m = int(y), int(m) - 1
     if m == 0:
         y, m = y - 1, 12
-    wid = get_waiter_id_by_tg(q.from_user.id)
-    kb = make_calendar(y, m, set(get_shifts_for(wid).keys()))
-    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+    wid = await get_waiter_id_by_tg(q.from_user.id)
+    shifts = await get_shifts_for_month(wid, y, m) if wid else {}
+    kb = make_calendar(y, m, shifts.keys(), footer=[MENU_ROW])
     await q.message.edit_text("Ваш календарь:", reply_markup=kb)
 
 
@@ -214,9 +188,9 @@ async def next_month(q: CallbackQuery):
     y, m = int(y), int(m) + 1
     if m == 13:
         y, m = y + 1, 1
-    wid = get_waiter_id_by_tg(q.from_user.id)
-    kb = make_calendar(y, m, set(get_shifts_for(wid).keys()))
-    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+    wid = await get_waiter_id_by_tg(q.from_user.id)
+    shifts = await get_shifts_for_month(wid, y, m) if wid else {}
+    kb = make_calendar(y, m, shifts.keys(), footer=[MENU_ROW])
     await q.message.edit_text("Ваш календарь:", reply_markup=kb)
 
 
@@ -228,7 +202,8 @@ async def cancel_cal(q: CallbackQuery):
 @router.callback_query(StateFilter(None), F.data.startswith("CAL_DAY|"))
 async def show_shift(q: CallbackQuery):
     _, ds = q.data.split("|", 1)
-    info = get_shifts_for(get_waiter_id_by_tg(q.from_user.id)).get(ds)
+    wid = await get_waiter_id_by_tg(q.from_user.id)
+    info = (await get_shifts_for_month(wid, int(ds[:4]), int(ds[5:7]))).get(ds) if wid else None
     text = f"📅 {ds}\n⏱️ {info['hours']} ч\n📋 {info['tasks'] or '—'}" if info else "Нет смен."
     kb = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")]])
     await q.message.delete()
@@ -237,8 +212,7 @@ async def show_shift(q: CallbackQuery):
 # ─────────── FORECAST ───────────
 @router.callback_query(F.data == "FORECAST_START")
 async def forecast_start(q: CallbackQuery, state: FSMContext):
-    kb = make_calendar(datetime.today().year, datetime.today().month, set())
-    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+    kb = make_calendar(datetime.today().year, datetime.today().month, set(), footer=[MENU_ROW])
     await state.set_state(Forecast.choose_date)
     await q.message.edit_text("Выберите дату для прогноза:", reply_markup=kb)
 
@@ -270,8 +244,7 @@ for _t in ("CAL_PREV|", "CAL_NEXT|"):
             y, m = y - 1, 12
         if m == 13:
             y, m = y + 1, 1
-        kb = make_calendar(y, m, set())
-        kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+        kb = make_calendar(y, m, set(), footer=[MENU_ROW])
         await q.message.edit_text("Выберите дату для прогноза:", reply_markup=kb)
 
 
@@ -287,28 +260,24 @@ async def forecast_send(q: CallbackQuery, state: FSMContext):
         f"{'✅ Сможет выйти' if ok else '❌ Не сможет выйти'}"
     )
 
-    delivered = False
-    for chat_id in ADMIN_CHAT_IDS:
-        try:
-            await q.bot.send_message(chat_id, txt, parse_mode="HTML")
-            delivered = True
-        except Exception:
-            continue
-
-    await q.answer(
-        "Прогноз отправлен администраторам ✅" if delivered else "❗️ Не удалось уведомить администраторов",
-        show_alert=True,
-    )
+    # Отвечаем на callback сразу: рассылка с ретраями и 429 может не уложиться в его окно
+    await q.answer("Отправляю прогноз администраторам…")
+    await state.clear()
+    results = await broadcast_message(q.bot, ADMIN_CHAT_IDS, txt, parse_mode="HTML")
+    delivered = any(r.ok for r in results)
 
     kb = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU_DEL")]])
-    await q.message.edit_text("Спасибо! Ваш прогноз учтён.", reply_markup=kb)
-    await state.clear()
+    await q.message.edit_text(
+        "Спасибо! Ваш прогноз учтён." if delivered
+        else "❗️ Не удалось уведомить администраторов, попробуйте позже.",
+        reply_markup=kb,
+    )
 
 # ─────────── TIPS ───────────
 @router.callback_query(F.data == "TIPS_START")
 async def tips_start(q: CallbackQuery, state: FSMContext):
     today = datetime.today().strftime("%Y-%m-%d")
-    wid = get_waiter_id_by_tg(q.from_user.id)
+    wid = await get_waiter_id_by_tg(q.from_user.id)
     await state.update_data(wid=wid, date=today)
     await state.set_state(TipsState.input)
     await q.message.edit_text(f"Введите сумму чаевых за {today} (руб):")
@@ -324,9 +293,9 @@ async def tips_save(msg: Message, state: FSMContext):
         await msg.reply("Введите корректное число, например 1234.50")
         return
 
-    add_tip(data["wid"], data["date"], float(amount))
+    # итог за месяц приходит из той же транзакции, что и запись дня
+    total = await add_tip(data["wid"], data["date"], float(amount))
     ym = data["date"][:7]
-    total = get_month_tips(data["wid"], ym) or 0.0
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🧹 Обнулить чаевые за месяц", callback_data=f"TIPS_CLEAR|{ym}")],
@@ -339,6 +308,6 @@ async def tips_save(msg: Message, state: FSMContext):
 @router.callback_query(F.data.startswith("TIPS_CLEAR|"))
 async def tips_clear(q: CallbackQuery):
     _, ym = q.data.split("|", 1)
-    clear_month_tips(get_waiter_id_by_tg(q.from_user.id), ym)
+    await clear_month_tips(await get_waiter_id_by_tg(q.from_user.id), ym)
     await q.answer("Чаевые за месяц обнулены!", show_alert=True)
     await q.message.edit_text("Чаевые сброшены.", reply_markup=WAITER_MENU)
\ No newline at end of file
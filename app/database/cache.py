@@ -0,0 +1,74 @@
+"""
+Кэши в памяти процесса для редко меняющихся данных sqlite_db.
+"""
+
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру кэш с вытеснением LRU и временем жизни записей.
+    Считает попадания и промахи, чтобы было видно, сколько запросов он снимает с базы.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        # Растёт при каждой инвалидации: значение, загруженное до неё, в кэш не попадёт
+        self._generation = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING or item[0] < time.monotonic():
+            if item is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def peek(self, key, default=None):
+        """Значение без учёта срока жизни и без счётчиков — для поиска связанных ключей."""
+        item = self._data.get(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_load(self, key, loader):
+        """Значение из кэша или результат await loader() (он же кладётся в кэш)."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """Удаляет указанные ключи; без аргументов — очищает кэш целиком."""
+        self._generation += 1
+        if not keys:
+            self._data.clear()
+        for key in keys:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
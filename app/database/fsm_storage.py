@@ -0,0 +1,302 @@
+"""
+Хранилище FSM aiogram, которое переживает перезапуск бота.
+
+SQLiteStorage держит состояния в отдельном файле SQLite (WAL) через тот же
+ConnectionPool, что и основная база. Запись отложенная: set_state/set_data
+меняют локальный кэш, а фоновая задача раз в flush_interval пишет все
+изменившиеся ключи одной транзакцией — set_state + update_data в одном
+обработчике дают одну запись строки. Сессии, которые не менялись дольше ttl,
+не читаются и периодически удаляются.
+
+Данные хранятся как JSON, поэтому в update_data кладём только то, что
+сериализуется (строки, числа, списки, словари); иначе TypeError сразу в вызове.
+
+Хранилище SQLite — только для одного процесса бота: кэш чтения и отложенная
+запись живут в памяти процесса, а блокировки чата между процессами нет.
+Второй процесс на том же файле не стартует (блокировка <path>.lock).
+Для нескольких процессов или машин — FSM_STORAGE=redis: там и состояние,
+и блокировка чата (RedisEventIsolation) общие; подойдёт любой Redis-совместимый сервер.
+
+    storage = make_storage()
+    dp = Dispatcher(storage=storage, events_isolation=make_isolation(storage))
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки файла
+    fcntl = None
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseEventIsolation,
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+
+from app.database.sqlite_db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")  # sqlite | redis | memory
+FSM_DB_PATH = os.getenv("FSM_DB_PATH", "fsm.db")
+FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+FSM_TTL = float(os.getenv("FSM_TTL", str(7 * 24 * 3600)))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL_MS", "100")) / 1000
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "60"))
+
+_EMPTY = "{}"
+_UPSERT = """
+    INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+        state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class _Entry:
+    state: str | None
+    data: str  # JSON
+    loaded_at: float  # monotonic: когда прочитано из базы или изменено
+    version: int = 0
+    dirty: bool = False
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(
+        self,
+        path: str = FSM_DB_PATH,
+        ttl: float = FSM_TTL,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        cache_size: int = FSM_CACHE_SIZE,
+        cache_ttl: float = FSM_CACHE_TTL,
+        key_builder: KeyBuilder | None = None,
+        **pool_options,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._pool_options = pool_options
+        self._pool: ConnectionPool | None = None
+        self._open_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._purged_at = 0.0
+        self._lock_file = None
+
+    def _lock_path(self):
+        """Не даёт второму процессу открыть тот же файл: его кэш отдавал бы устаревшие состояния."""
+        if fcntl is None or self.path == ":memory:":
+            return
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"FSM file {self.path} is used by another bot process; "
+                "the sqlite FSM storage is single-process, use FSM_STORAGE=redis"
+            ) from None
+        self._lock_file = lock_file
+
+    def _unlock_path(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # закрытие снимает flock
+            self._lock_file = None
+
+    async def _ensure_open(self) -> ConnectionPool:
+        if self._pool is not None:
+            return self._pool
+        async with self._open_lock:
+            if self._pool is None:
+                self._lock_path()
+                pool = ConnectionPool(self.path, **self._pool_options)
+                try:
+                    await pool.open()
+                    await pool.transaction(_create_schema)
+                except Exception:
+                    self._unlock_path()
+                    raise
+                self._flusher = asyncio.create_task(self._flush_loop())
+                self._pool = pool
+        return self._pool
+
+    async def _entry(self, key: StorageKey) -> tuple[str, _Entry]:
+        pool = await self._ensure_open()
+        k = self.key_builder.build(key)
+        entry = self._cache.get(k)
+        if entry is not None and (entry.dirty or time.monotonic() - entry.loaded_at < min(self.cache_ttl, self.ttl)):
+            self._cache.move_to_end(k)
+            return k, entry
+
+        async with pool.read() as db:
+            rows = await db.execute_fetchall(
+                "SELECT state, data FROM fsm WHERE key = ? AND updated_at >= ?",
+                (k, time.time() - self.ttl),
+            )
+        # Пока читали, этот ключ могли изменить — несохранённая запись новее базы
+        current = self._cache.get(k)
+        if current is not None and current.dirty:
+            return k, current
+        entry = _Entry(rows[0]["state"], rows[0]["data"], time.monotonic()) if rows else _Entry(None, _EMPTY, time.monotonic())
+        self._evict(reserve=1)
+        self._cache[k] = entry
+        return k, entry
+
+    def _evict(self, reserve: int = 0):
+        excess = len(self._cache) + reserve - self.cache_size
+        if excess <= 0:
+            return
+        # Несохранённые записи не выбрасываем, иначе следующее чтение вернёт старое из базы
+        for k in [k for k, e in self._cache.items() if not e.dirty][:excess]:
+            del self._cache[k]
+
+    def _touch(self, k: str, entry: _Entry):
+        entry.version += 1
+        entry.dirty = True
+        entry.loaded_at = time.monotonic()
+        self._dirty.add(k)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k, entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._touch(k, entry)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        _, entry = await self._entry(key)
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        payload = json.dumps(data, ensure_ascii=False)
+        k, entry = await self._entry(key)
+        entry.data = payload
+        self._touch(k, entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, entry = await self._entry(key)
+        return json.loads(entry.data)
+
+    async def flush(self):
+        """Пишет в базу все изменения, накопленные в кэше."""
+        if not self._dirty or self._pool is None:
+            return
+        keys, self._dirty = self._dirty, set()
+        now = time.time()
+        snapshot = [(k, self._cache[k]) for k in keys]
+        versions = [(entry, entry.version) for _, entry in snapshot]
+        upserts = [(k, e.state, e.data, now) for k, e in snapshot if e.state is not None or e.data != _EMPTY]
+        deletes = [(k,) for k, e in snapshot if e.state is None and e.data == _EMPTY]
+
+        async def op(db):
+            if upserts:
+                await db.executemany(_UPSERT, upserts)
+            if deletes:
+                await db.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+
+        try:
+            await self._pool.transaction(op)
+        except Exception:
+            logger.exception("FSM flush of %d keys failed, will retry", len(keys))
+            self._dirty |= keys
+            return
+        for entry, version in versions:
+            if entry.version == version:
+                entry.dirty = False
+
+    async def purge(self) -> int:
+        """Удаляет сессии, не менявшиеся дольше ttl; возвращает число удалённых."""
+        pool = await self._ensure_open()
+
+        async def op(db):
+            cur = await db.execute("DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,))
+            return cur.rowcount
+
+        removed = await pool.transaction(op)
+        self._purged_at = time.monotonic()
+        if removed:
+            logger.info("Purged %d abandoned FSM sessions", removed)
+        return removed
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - self._purged_at > min(self.ttl, 3600):
+                try:
+                    await self.purge()
+                except Exception:
+                    logger.exception("FSM purge failed")
+
+    async def close(self) -> None:
+        if self._pool is None:
+            return
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self._pool.close()
+        self._pool = None
+        self._unlock_path()
+        self._cache.clear()
+
+
+async def _create_schema(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS fsm (
+            key        TEXT PRIMARY KEY,
+            state      TEXT,
+            data       TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_fsm_updated_at ON fsm(updated_at)")
+
+
+def make_storage(kind: str = FSM_STORAGE) -> BaseStorage:
+    """Хранилище FSM по FSM_STORAGE: sqlite (по умолчанию), redis или memory."""
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis requires the redis package (pip install redis)") from e
+        return RedisStorage.from_url(
+            FSM_REDIS_URL,
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=int(FSM_TTL),
+            data_ttl=int(FSM_TTL),
+        )
+    if kind == "sqlite":
+        return SQLiteStorage()
+    raise ValueError(f"Unknown FSM_STORAGE: {kind!r}")
+
+
+def make_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """Для Redis — блокировка ключа на сервере, чтобы апдейты одного чата не шли параллельно в разных процессах."""
+    create = getattr(storage, "create_isolation", None)
+    return create() if create is not None else DisabledEventIsolation()
@@ -0,0 +1,421 @@
+"""
+Версионированные миграции схемы starodonie.db.
+
+Номер последней применённой миграции хранится в PRAGMA user_version.
+При старте выполняются только миграции с номером больше текущего — все в одной
+транзакции, так что на «тёплом» старте никакого DDL не происходит.
+Новые миграции добавляем в конец MIGRATIONS; уже выпущенные не меняем.
+"""
+
+import logging
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS: list = []
+
+
+def migration(fn):
+    """Регистрирует миграцию; её номер — позиция в MIGRATIONS, начиная с 1."""
+    MIGRATIONS.append(fn)
+    return fn
+
+
+async def get_version(db: aiosqlite.Connection) -> int:
+    async with db.execute("PRAGMA user_version") as cur:
+        return (await cur.fetchone())[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> list[str]:
+    """
+    Применяет недостающие миграции на открытой транзакции db.
+    Возвращает имена применённых миграций (пустой список, если схема актуальна).
+    """
+    version = await get_version(db)
+    applied = []
+    for number, fn in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info("Applying migration %d: %s", number, fn.__name__)
+        await fn(db)
+        # user_version транзакционный: откатится вместе с миграцией при ошибке
+        await db.execute(f"PRAGMA user_version = {number}")
+        applied.append(fn.__name__)
+    return applied
+
+
+async def _has_column(db: aiosqlite.Connection, table: str, column: str) -> bool:
+    async with db.execute(f"PRAGMA table_info({table})") as cur:
+        return any(row[1] == column for row in await cur.fetchall())
+
+
+# ================== 1: базовая схема ==================
+@migration
+async def m001_base_schema(db: aiosqlite.Connection):
+    """Таблицы бота. IF NOT EXISTS — чтобы принять базы, созданные до миграций."""
+    # Таблица пользователей (users_start)
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS users_start (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tg_id INTEGER,
+            username TEXT,
+            start_date TEXT
+        )
+    ''')
+
+    # Таблица карточек гостей (guest_cards)
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS guest_cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tg_id INTEGER,
+            name TEXT,
+            phone TEXT,
+            photo TEXT,
+            food TEXT,
+            alerg TEXT
+        )
+    ''')
+
+    # Таблица сотрудников (для часовки) - создаём раньше, чтобы FOREIGN KEY в waiters работал
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            last_name TEXT NOT NULL,
+            first_name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            rate FLOAT
+        )
+    ''')
+    if not await _has_column(db, "employees", "rate"):
+        await db.execute("ALTER TABLE employees ADD COLUMN rate FLOAT")
+
+    # Таблица официантов (waiters)
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS waiters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tg_id INTEGER UNIQUE,
+            name TEXT DEFAULT "",
+            employee_id INTEGER,
+            FOREIGN KEY (employee_id) REFERENCES employees(id)
+        )
+    ''')
+    if not await _has_column(db, "waiters", "employee_id"):
+        await db.execute("ALTER TABLE waiters ADD COLUMN employee_id INTEGER")
+
+    # Таблица результатов тестов (test_results)
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS test_results (
+            tg_id INTEGER PRIMARY KEY,
+            score INTEGER,
+            total INTEGER,
+            timestamp TEXT
+        )
+    ''')
+
+    # Таблица смен/графика (shifts)
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS shifts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            waiter_id INTEGER,
+            date TEXT,
+            hours REAL DEFAULT 0,
+            tasks TEXT DEFAULT "",
+            FOREIGN KEY (waiter_id) REFERENCES waiters(id)
+        )
+    ''')
+
+    # Таблица учёта отработанных часов
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS work_hours (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            hours REAL NOT NULL,
+            UNIQUE(employee_id, date),
+            FOREIGN KEY(employee_id) REFERENCES employees(id)
+        )
+    ''')
+
+    # tips
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS tips (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            waiter_id INTEGER,
+            date TEXT,
+            amount REAL,
+            UNIQUE(waiter_id, date),
+            FOREIGN KEY(waiter_id) REFERENCES waiters(id)
+        )
+    """)
+
+
+# ================== 2: индексы по датам ==================
+@migration
+async def m002_date_indexes(db: aiosqlite.Connection):
+    """
+    Индексы под горячие запросы. Даты хранятся как TEXT 'YYYY-MM-DD':
+    лексикографический порядок совпадает с хронологическим, поэтому
+    BETWEEN по такому индексу — это range scan, а не полный проход.
+    """
+    # Приводим даты к ISO-виду и убираем дубли смен, которые копились,
+    # пока INSERT OR IGNORE в add_shift ничего не ловил.
+    await db.execute(
+        "UPDATE shifts SET date = date(date) WHERE date(date) IS NOT NULL AND date <> date(date)"
+    )
+    await db.execute("""
+        DELETE FROM shifts
+        WHERE id NOT IN (SELECT MAX(id) FROM shifts GROUP BY waiter_id, date)
+    """)
+    # То же для tips и work_hours, иначе BETWEEN по месяцу не видит старые строки.
+    # Здесь UNIQUE в самой таблице: сначала оставляем последнюю строку на день.
+    for table, owner in (("tips", "waiter_id"), ("work_hours", "employee_id")):
+        await db.execute(f"""
+            DELETE FROM {table}
+            WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {owner}, COALESCE(date(date), date))
+        """)
+        await db.execute(
+            f"UPDATE {table} SET date = date(date) WHERE date(date) IS NOT NULL AND date <> date(date)"
+        )
+    await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_shifts_waiter_date ON shifts(waiter_id, date)")
+    await db.execute("CREATE INDEX IF NOT EXISTS ix_shifts_date ON shifts(date)")
+    await db.execute("CREATE INDEX IF NOT EXISTS ix_work_hours_date ON work_hours(date)")
+    await db.execute("CREATE INDEX IF NOT EXISTS ix_waiters_employee ON waiters(employee_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS ix_users_start_tg ON users_start(tg_id)")
+
+
+# ================== 3: часы из shifts в work_hours ==================
+@migration
+async def m003_shifts_to_work_hours(db: aiosqlite.Connection):
+    """Разовый перенос часов официантов, привязанных к employees, в work_hours."""
+    await db.execute("""
+        INSERT INTO work_hours (employee_id, date, hours)
+        SELECT w.employee_id, s.date, s.hours
+        FROM shifts s
+        JOIN waiters w ON w.id = s.waiter_id
+        WHERE s.hours IS NOT NULL AND w.employee_id IS NOT NULL
+        ORDER BY s.id
+        ON CONFLICT(employee_id, date) DO UPDATE SET hours=excluded.hours
+    """)
+
+
+# ================== 4: отметки изменений смен для инкрементальной синхронизации ==================
+@migration
+async def m004_shifts_change_tracking(db: aiosqlite.Connection):
+    """
+    shifts.updated_at ставится триггерами при вставке и изменении смены,
+    а также при привязке официанта к сотруднику — по нему
+    migrate_shifts_to_work_hours(incremental=True) берёт только новые изменения.
+    """
+    if not await _has_column(db, "shifts", "updated_at"):
+        await db.execute("ALTER TABLE shifts ADD COLUMN updated_at TEXT")
+    await db.execute("CREATE INDEX IF NOT EXISTS ix_shifts_updated ON shifts(updated_at)")
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_touch_insert AFTER INSERT ON shifts
+        BEGIN
+            UPDATE shifts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_shifts_touch_update AFTER UPDATE OF waiter_id, date, hours ON shifts
+        BEGIN
+            UPDATE shifts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_waiters_touch_shifts AFTER UPDATE OF employee_id ON waiters
+        BEGIN
+            UPDATE shifts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE waiter_id = NEW.id;
+        END
+    """)
+    # Отметка, до какого updated_at данные уже перенесены
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            synced_until TEXT
+        )
+    """)
+
+
+# ================== 5: file_id загруженных в Telegram файлов ==================
+@migration
+async def m005_media_files(db: aiosqlite.Connection):
+    """file_id по хэшу содержимого: один и тот же файл грузим в Telegram один раз."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS media_files (
+            sha256 TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT,
+            file_id TEXT NOT NULL,
+            uploaded_at TEXT,
+            PRIMARY KEY (sha256, kind)
+        )
+    """)
+
+
+# ================== 6: сводка часов по месяцам ==================
+# Часы сотрудника за день: строка work_hours, а если её нет — сумма часов смен
+# привязанных к нему официантов. monthly_hours хранит сумму этих значений по месяцу
+# и число учтённых строк (entries > 0 — сотрудник есть в ведомости, даже с 0 часов),
+# триггеры прибавляют разницу на каждой изменённой строке.
+
+# Часы смен сотрудника emp за день d, не перекрытые строкой work_hours
+_SHIFT_HOURS = """
+    COALESCE((SELECT SUM(s.hours) FROM shifts s JOIN waiters w ON w.id = s.waiter_id
+              WHERE w.employee_id = {emp} AND s.date = {d}), 0)
+"""
+_SHIFT_ENTRIES = """
+    (SELECT COUNT(*) FROM shifts s JOIN waiters w ON w.id = s.waiter_id
+     WHERE w.employee_id = {emp} AND s.date = {d})
+"""
+
+
+def _add_hours(emp: str, d: str, delta: str, entries: str) -> str:
+    return f"""
+        INSERT INTO monthly_hours (ym, employee_id, hours, entries)
+        SELECT substr({d}, 1, 7), {emp}, {delta}, {entries} WHERE {emp} IS NOT NULL AND {d} IS NOT NULL
+        ON CONFLICT(ym, employee_id) DO UPDATE SET
+            hours = hours + excluded.hours,
+            entries = entries + excluded.entries;
+    """
+
+
+def _shift_hours(row: str) -> tuple[str, str, str]:
+    """(сотрудник, вклад часов, вклад строк) смены row (NEW/OLD): ноль, если день перекрыт work_hours."""
+    emp = f"(SELECT employee_id FROM waiters WHERE id = {row}.waiter_id)"
+    covered = f"EXISTS (SELECT 1 FROM work_hours wh WHERE wh.employee_id = {emp} AND wh.date = {row}.date)"
+    delta = f"CASE WHEN {covered} THEN 0 ELSE COALESCE({row}.hours, 0) END"
+    entries = f"CASE WHEN {covered} THEN 0 ELSE 1 END"
+    return emp, delta, entries
+
+
+@migration
+async def m006_monthly_hours(db: aiosqlite.Connection):
+    """
+    monthly_hours(ym, employee_id, hours, entries) — то, что считал get_month_hours_with_rate,
+    поддерживается триггерами на work_hours, shifts и waiters.employee_id.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_hours (
+            ym TEXT NOT NULL,
+            employee_id INTEGER NOT NULL,
+            hours REAL NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ym, employee_id)
+        ) WITHOUT ROWID
+    """)
+
+    # work_hours: строка заменяет часы смен за этот день
+    new_day = {"emp": "NEW.employee_id", "d": "NEW.date"}
+    old_day = {"emp": "OLD.employee_id", "d": "OLD.date"}
+    wh_in = _add_hours("NEW.employee_id", "NEW.date",
+                       "COALESCE(NEW.hours, 0) - " + _SHIFT_HOURS.format(**new_day),
+                       "1 - " + _SHIFT_ENTRIES.format(**new_day))
+    wh_out = _add_hours("OLD.employee_id", "OLD.date",
+                        _SHIFT_HOURS.format(**old_day) + " - COALESCE(OLD.hours, 0)",
+                        _SHIFT_ENTRIES.format(**old_day) + " - 1")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_wh_insert AFTER INSERT ON work_hours BEGIN {wh_in} END")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_wh_delete AFTER DELETE ON work_hours BEGIN {wh_out} END")
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_monthly_wh_update AFTER UPDATE OF employee_id, date, hours ON work_hours
+        BEGIN {wh_out} {wh_in} END
+    """)
+
+    # shifts: учитываются, только если официант привязан и день не перекрыт work_hours
+    new_emp, new_hours, new_entries = _shift_hours("NEW")
+    old_emp, old_hours, old_entries = _shift_hours("OLD")
+    sh_in = _add_hours(new_emp, "NEW.date", new_hours, new_entries)
+    sh_out = _add_hours(old_emp, "OLD.date", f"-({old_hours})", f"-({old_entries})")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_shifts_insert AFTER INSERT ON shifts BEGIN {sh_in} END")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_shifts_delete AFTER DELETE ON shifts BEGIN {sh_out} END")
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_monthly_shifts_update AFTER UPDATE OF waiter_id, date, hours ON shifts
+        BEGIN {sh_out} {sh_in} END
+    """)
+
+    # Перепривязка официанта: его смены уходят от старого сотрудника к новому
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_monthly_waiters_link AFTER UPDATE OF employee_id ON waiters
+        WHEN OLD.employee_id IS NOT NEW.employee_id
+        BEGIN
+            INSERT INTO monthly_hours (ym, employee_id, hours, entries)
+            SELECT substr(s.date, 1, 7), OLD.employee_id, -SUM(COALESCE(s.hours, 0)), -COUNT(*)
+            FROM shifts s
+            WHERE s.waiter_id = NEW.id AND OLD.employee_id IS NOT NULL AND s.date IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM work_hours wh WHERE wh.employee_id = OLD.employee_id AND wh.date = s.date)
+            GROUP BY 1
+            ON CONFLICT(ym, employee_id) DO UPDATE SET
+                hours = hours + excluded.hours, entries = entries + excluded.entries;
+            INSERT INTO monthly_hours (ym, employee_id, hours, entries)
+            SELECT substr(s.date, 1, 7), NEW.employee_id, SUM(COALESCE(s.hours, 0)), COUNT(*)
+            FROM shifts s
+            WHERE s.waiter_id = NEW.id AND NEW.employee_id IS NOT NULL AND s.date IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM work_hours wh WHERE wh.employee_id = NEW.employee_id AND wh.date = s.date)
+            GROUP BY 1
+            ON CONFLICT(ym, employee_id) DO UPDATE SET
+                hours = hours + excluded.hours, entries = entries + excluded.entries;
+        END
+    """)
+
+    # Начальное заполнение из уже накопленной истории
+    await db.execute("""
+        INSERT INTO monthly_hours (ym, employee_id, hours, entries)
+        SELECT substr(date, 1, 7), employee_id, SUM(COALESCE(hours, 0)), COUNT(*)
+        FROM (
+            SELECT employee_id, date, hours FROM work_hours
+            UNION ALL
+            SELECT w.employee_id, s.date, s.hours
+            FROM shifts s
+            JOIN waiters w ON w.id = s.waiter_id
+            WHERE w.employee_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM work_hours wh WHERE wh.employee_id = w.employee_id AND wh.date = s.date)
+        )
+        WHERE date IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT(ym, employee_id) DO UPDATE SET hours = excluded.hours, entries = excluded.entries
+    """)
+
+
+# ================== 7: итоги чаевых по месяцам ==================
+def _add_tips(row: str, sign: str) -> str:
+    return f"""
+        INSERT INTO monthly_tips (ym, waiter_id, amount_kop, days)
+        SELECT substr({row}.date, 1, 7), {row}.waiter_id,
+               {sign}CAST(ROUND(COALESCE({row}.amount, 0) * 100) AS INTEGER), {sign}1
+        WHERE {row}.waiter_id IS NOT NULL AND {row}.date IS NOT NULL
+        ON CONFLICT(ym, waiter_id) DO UPDATE SET
+            amount_kop = amount_kop + excluded.amount_kop,
+            days = days + excluded.days;
+    """
+
+
+@migration
+async def m007_monthly_tips(db: aiosqlite.Connection):
+    """
+    monthly_tips(ym, waiter_id, amount_kop, days) — сумма чаевых официанта за месяц
+    в копейках (целые — без накопления ошибки float) и число дней с чаевыми.
+    Триггеры на tips меняют итог в той же транзакции, что и запись дня;
+    замена суммы за день (upsert в add_tip) — это UPDATE: вычитаем старую, прибавляем новую.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_tips (
+            ym TEXT NOT NULL,
+            waiter_id INTEGER NOT NULL,
+            amount_kop INTEGER NOT NULL DEFAULT 0,
+            days INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ym, waiter_id)
+        ) WITHOUT ROWID
+    """)
+    tips_in, tips_out = _add_tips("NEW", ""), _add_tips("OLD", "-")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_tips_insert AFTER INSERT ON tips BEGIN {tips_in} END")
+    await db.execute(f"CREATE TRIGGER IF NOT EXISTS trg_monthly_tips_delete AFTER DELETE ON tips BEGIN {tips_out} END")
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_monthly_tips_update AFTER UPDATE OF waiter_id, date, amount ON tips
+        BEGIN {tips_out} {tips_in} END
+    """)
+    await db.execute("""
+        INSERT INTO monthly_tips (ym, waiter_id, amount_kop, days)
+        SELECT substr(date, 1, 7), waiter_id, SUM(CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)), COUNT(*)
+        FROM tips
+        WHERE waiter_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT(ym, waiter_id) DO UPDATE SET amount_kop = excluded.amount_kop, days = excluded.days
+    """)
@@ -0,0 +1,199 @@
+"""
+Профилирование запросов sqlite_db: время каждого SQL-выражения, журнал
+медленных с EXPLAIN QUERY PLAN и сводка по нормализованному SQL.
+
+Включается QUERY_PROFILE=1: пул открывает соединения с factory=ProfilingConnection,
+и каждое execute/executemany вместе с последующими fetch* засекается в потоке
+соединения. Выражение дольше SLOW_QUERY_MS пишется в лог с планом запроса
+(план снимается один раз на нормализованный SQL). Сводку отдаёт /slow_queries
+в админке.
+
+Нормализация заменяет литералы и параметры на ?, так что
+"... WHERE waiter_id = 7" и "... WHERE waiter_id = 8" — одна строка сводки.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILE = os.getenv("QUERY_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+
+# Управление транзакциями и PRAGMA — не запросы, в сводку не идут
+_SKIP = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA|EXPLAIN)\b", re.I)
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_NAMED = re.compile(r"[:@$]\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(sql: str) -> str:
+    sql = _STRING.sub("?", sql)
+    sql = _NAMED.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?, ...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+@dataclass
+class QueryStats:
+    sql: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    rows: int = 0
+    slow: int = 0
+    plan: list[str] = field(default_factory=list)
+
+    @property
+    def scans(self) -> list[str]:
+        """Полные проходы по таблицам (без индекса) в плане."""
+        return [line for line in self.plan if line.startswith("SCAN") and "USING" not in line]
+
+
+class Profiler:
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS):
+        self.slow = slow_ms / 1000
+        self.stats: dict[str, QueryStats] = {}
+        self._lock = threading.Lock()  # у каждого соединения aiosqlite свой поток
+
+    def _entry(self, sql: str) -> QueryStats:
+        key = normalize(sql)
+        stats = self.stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.stats.setdefault(key, QueryStats(key))
+        return stats
+
+    def record(self, sql: str, elapsed: float, rows: int = 0, new: bool = True) -> QueryStats | None:
+        if _SKIP.match(sql):
+            return None
+        stats = self._entry(sql)
+        with self._lock:
+            stats.count += new
+            stats.total += elapsed
+            stats.rows += rows
+            stats.max = max(stats.max, elapsed)
+        return stats
+
+    def slow_statement(self, conn: sqlite3.Connection, stats: QueryStats, sql: str, params, elapsed: float):
+        with self._lock:
+            stats.slow += 1
+            need_plan = not stats.plan
+        if need_plan and params is not None and _EXPLAINABLE.match(sql):
+            stats.plan = explain(conn, sql, params)
+        logger.warning("Slow query %.1f ms: %s\n  plan: %s", elapsed * 1000, stats.sql,
+                       "; ".join(stats.plan) or "—")
+
+    def top(self, n: int = 10, key: str = "total") -> list[QueryStats]:
+        with self._lock:
+            items = list(self.stats.values())
+        return sorted(items, key=lambda s: getattr(s, key), reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def report(self, n: int = 10) -> str:
+        """Топ выражений по суммарному времени — для лога и админ-команды."""
+        lines = []
+        for i, s in enumerate(self.top(n), 1):
+            lines.append(
+                f"{i}. {s.total * 1000:.0f} ms total, {s.count}×, avg {s.total / max(s.count, 1) * 1000:.2f} ms, "
+                f"max {s.max * 1000:.1f} ms, slow {s.slow}, rows {s.rows}\n   {s.sql[:300]}"
+            )
+            if s.plan:
+                lines.append("   plan: " + "; ".join(s.plan))
+        return "\n".join(lines) or "Запросов пока не было."
+
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> list[str]:
+    """EXPLAIN QUERY PLAN тем же соединением и с теми же параметрами."""
+    try:
+        cur = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params or ())
+        return [row[-1] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+profiler = Profiler()
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Засекает execute* и fetch*; время выборки добавляется к выражению, которое её начало."""
+
+    _stats: QueryStats | None = None
+    _sql = ""
+    _params = ()
+    _elapsed = 0.0
+    _logged = False
+
+    def _start(self, sql: str, params, elapsed: float):
+        self._sql, self._params, self._elapsed, self._logged = sql, params, elapsed, False
+        self._stats = profiler.record(sql, elapsed)
+        self._check()
+
+    def _check(self):
+        if self._stats is not None and not self._logged and self._elapsed >= profiler.slow:
+            self._logged = True
+            profiler.slow_statement(self.connection, self._stats, self._sql, self._params, self._elapsed)
+
+    def _fetched(self, started: float, rows: int):
+        if self._stats is None:
+            return
+        elapsed = time.perf_counter() - started
+        self._elapsed += elapsed
+        profiler.record(self._sql, elapsed, rows, new=False)
+        self._check()
+
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # план executemany не снимаем — параметров несколько наборов
+            self._start(sql, None, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+class ProfilingConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -1,168 +1,314 @@
+import asyncio
+import calendar
 import logging
 import os
 import sqlite3
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from pathlib import Path
 
+import aiosqlite
 from aiogram import Router
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+from app import metrics
+from app.database import migrations
+from app.database.profiler import QUERY_PROFILE, ProfilingConnection, profiler
+from app.database.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 # Router для отладочных SQL-команд
 SQL = Router()
 
-# Глобальные переменные для базы и курсора
-base: sqlite3.Connection | None = None
-cur: sqlite3.Cursor | None = None
-
-def sql_start():
-    """
-    Инициализируем базу и создаём необходимые таблицы.
-    """
-    global base, cur
-    try:
-        base = sqlite3.connect('starodonie.db')
-        base.row_factory = sqlite3.Row  # Ensure rows are returned as dictionaries
-        cur = base.cursor()
-        print("Database connected OK!")
-    except sqlite3.DatabaseError as e:
-        print(f"Failed to connect to database: {e}")
-        raise
-
-    # Таблица пользователей (users_start)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users_start (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tg_id INTEGER,
-            username TEXT,
-            start_date TEXT
-        )
-    ''')
-
-    # Таблица карточек гостей (guest_cards)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS guest_cards (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tg_id INTEGER,
-            name TEXT,
-            phone TEXT,
-            photo TEXT,
-            food TEXT,
-            alerg TEXT
-        )
-    ''')
-
-    # Таблица сотрудников (для часовки) - создаём раньше, чтобы FOREIGN KEY в waiters работал
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            last_name TEXT NOT NULL,
-            first_name TEXT NOT NULL,
-            role TEXT NOT NULL,
-            rate FLOAT
-        )
-    ''')
-
-    # Migration: Add rate column if it doesn't exist
-    try:
-        cur.execute("ALTER TABLE employees ADD COLUMN rate FLOAT")
-        base.commit()
-    except sqlite3.OperationalError as e:
-        if "duplicate column name" not in str(e):
+DB_PATH = os.getenv("DB_PATH", "starodonie.db")
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+# Group commit: сколько операций максимум в одной транзакции и сколько ждать попутчиков
+COMMIT_BATCH_SIZE = int(os.getenv("DB_COMMIT_BATCH_SIZE", "64"))
+COMMIT_WINDOW = float(os.getenv("DB_COMMIT_WINDOW_MS", "2")) / 1000
+# Кэш идентичностей (свой в каждом процессе): tg_id → официант, официант → сотрудник, список для выбора в админке
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "1024"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+# Кэш смен по месяцам для навигации по календарю официанта
+SHIFT_CACHE_SIZE = int(os.getenv("SHIFT_CACHE_SIZE", "2048"))
+SHIFT_CACHE_TTL = float(os.getenv("SHIFT_CACHE_TTL", "600"))
+
+
+class ConnectionPool:
+    """
+    Пул соединений aiosqlite: одно соединение на запись и ограниченный набор
+    соединений на чтение. Каждое соединение aiosqlite работает в своём потоке,
+    поэтому обращения к диску не блокируют event loop.
+
+    Запись идёт через очередь: фоновая задача собирает операции в пачки
+    (до batch_size штук или batch_window секунд) и фиксирует их одним COMMIT.
+    Каждая операция выполняется в своём SAVEPOINT, так что ошибка одной
+    не откатывает остальные операции пачки.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = READ_POOL_SIZE,
+        batch_size: int = COMMIT_BATCH_SIZE,
+        batch_window: float = COMMIT_WINDOW,
+        journal_mode: str = "WAL",
+    ):
+        self.path = path
+        self.size = max(1, readers)
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.journal_mode = journal_mode
+        self.writer: aiosqlite.Connection | None = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue(maxsize=self.size)
+        self._opened: list[aiosqlite.Connection] = []
+        self._writes: asyncio.Queue = asyncio.Queue()
+        self._committer: asyncio.Task | None = None
+
+    async def _connect(self, **kwargs) -> aiosqlite.Connection:
+        if QUERY_PROFILE:
+            kwargs.setdefault("factory", ProfilingConnection)
+        conn = await aiosqlite.connect(self.path, **kwargs)
+        conn.row_factory = sqlite3.Row  # Ensure rows are returned as dictionaries
+        # PRAGMA возвращают строку — дочитываем, чтобы незакрытый курсор не держал блокировку
+        await conn.execute_fetchall("PRAGMA foreign_keys=ON")
+        await conn.execute_fetchall("PRAGMA busy_timeout=5000")
+        self._opened.append(conn)
+        return conn
+
+    async def open(self):
+        # Транзакциями пишущего соединения управляем сами (BEGIN/COMMIT)
+        self.writer = await self._connect(isolation_level=None)
+        await self.writer.execute_fetchall(f"PRAGMA journal_mode={self.journal_mode}")
+        for _ in range(self.size):
+            conn = await self._connect()
+            await conn.execute_fetchall("PRAGMA query_only=ON")
+            self._readers.put_nowait(conn)
+        self._committer = asyncio.create_task(self._commit_loop())
+
+    async def close(self):
+        """Дожидается записи всех операций из очереди и закрывает соединения."""
+        if self._committer is not None:
+            self._writes.put_nowait(None)
+            await self._committer
+            self._committer = None
+        for conn in self._opened:
+            await conn.close()
+        self._opened.clear()
+        self.writer = None
+
+    @asynccontextmanager
+    async def read(self):
+        """Берёт свободное соединение на чтение (ждёт, если все заняты)."""
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    def submit(self, op) -> asyncio.Future:
+        """
+        Ставит операцию op(db) в очередь на запись и сразу возвращает future,
+        который завершится после COMMIT пачки, содержащей эту операцию.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((op, fut))
+        return fut
+
+    async def transaction(self, op):
+        """Выполняет op(db) в очереди записи и ждёт, пока результат будет зафиксирован на диске."""
+        return await self.submit(op)
+
+    async def flush(self):
+        """Ждёт, пока все ранее поставленные в очередь операции будут зафиксированы."""
+        await self.transaction(_noop)
+
+    async def _commit_loop(self):
+        stop = False
+        while not stop:
+            item = await self._writes.get()
+            if item is None:
+                break
+            batch = [item]
+            if self.batch_window > 0 and self.batch_size > 1:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_size and not self._writes.empty():
+                item = self._writes.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch: list):
+        db = self.writer
+        done = []
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            for op, fut in batch:
+                await db.execute("SAVEPOINT op")
+                try:
+                    result = await op(db)
+                except Exception as e:
+                    await db.execute("ROLLBACK TO op")
+                    await db.execute("RELEASE op")
+                    _resolve(fut, error=e)
+                    continue
+                await db.execute("RELEASE op")
+                done.append((fut, result))
+            await db.execute("COMMIT")
+        except Exception as e:
+            logger.exception("Group commit of %d operations failed", len(batch))
+            if db.in_transaction:
+                await db.execute("ROLLBACK")
+            for _, fut in done:
+                _resolve(fut, error=e)
+            return
+        for fut, result in done:
+            _resolve(fut, result)
+
+
+async def _noop(db):
+    return None
+
+
+def _resolve(fut: asyncio.Future, result=None, error: Exception | None = None):
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
+
+
+def _log_failed_write(fut: asyncio.Future):
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.error("Background write failed", exc_info=fut.exception())
+
+
+# Глобальный пул соединений
+pool: ConnectionPool | None = None
+_start_lock = asyncio.Lock()
+identity_cache = TTLCache(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL)
+shift_month_cache = TTLCache(SHIFT_CACHE_SIZE, SHIFT_CACHE_TTL)
+metrics.registry.watch_cache("identity", identity_cache)
+metrics.registry.watch_cache("shift_month", shift_month_cache)
+
+
+async def sql_start(path: str | None = None, **pool_options):
+    """
+    Инициализируем базу и применяем недостающие миграции схемы.
+    pool_options пробрасываются в ConnectionPool (размер пачки, окно, journal_mode).
+    """
+    global pool
+    async with _start_lock:
+        if pool is not None:
+            return
+        try:
+            new_pool = ConnectionPool(path or DB_PATH, **pool_options)
+            await new_pool.open()
+            print("Database connected OK!")
+        except sqlite3.DatabaseError as e:
+            print(f"Failed to connect to database: {e}")
             raise
 
-    # Таблица официантов (waiters)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS waiters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tg_id INTEGER UNIQUE,
-            name TEXT DEFAULT "",
-            employee_id INTEGER,
-            FOREIGN KEY (employee_id) REFERENCES employees(id)
-        )
-    ''')
-
-    # Migration: Add employee_id column if it doesn't exist
-    try:
-        cur.execute("ALTER TABLE waiters ADD COLUMN employee_id INTEGER")
-        base.commit()
-    except sqlite3.OperationalError:
-        pass
-
-    # Migration: Add foreign key constraint if not present
-    try:
-        cur.execute("PRAGMA foreign_keys=ON")
-        cur.execute("PRAGMA foreign_key_check")
-        base.commit()
-    except sqlite3.OperationalError:
-        pass
-
-    # Таблица результатов тестов (test_results)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS test_results (
-            tg_id INTEGER PRIMARY KEY,
-            score INTEGER,
-            total INTEGER,
-            timestamp TEXT
-        )
-    ''')
-
-    # Таблица смен/графика (shifts)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS shifts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            waiter_id INTEGER,
-            date TEXT,
-            hours REAL DEFAULT 0,
-            tasks TEXT DEFAULT "",
-            FOREIGN KEY (waiter_id) REFERENCES waiters(id)
-        )
-    ''')
-
-    # Таблица учёта отработанных часов
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS work_hours (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            hours REAL NOT NULL,
-            UNIQUE(employee_id, date),
-            FOREIGN KEY(employee_id) REFERENCES employees(id)
-        )
-    ''')
-
-    # tips
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS tips (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            waiter_id INTEGER,
-            date TEXT,
-            amount REAL,
-            UNIQUE(waiter_id, date),
-            FOREIGN KEY(waiter_id) REFERENCES waiters(id)
-        )
-    """)
+        # Тёплый старт: версия схемы актуальна — ни одного DDL и ни одной транзакции записи
+        async with new_pool.read() as db:
+            version = await migrations.get_version(db)
+        if version < len(migrations.MIGRATIONS):
+            applied = await new_pool.transaction(migrations.migrate)
+            logger.info("Schema migrated to version %d: %s", len(migrations.MIGRATIONS), applied)
+        identity_cache.invalidate()
+        shift_month_cache.invalidate()
+        pool = new_pool
+
+
+async def sql_stop():
+    """Сбрасывает очередь записи и закрывает все соединения пула."""
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+        if QUERY_PROFILE:
+            logger.info("Query profile:\n%s", profiler.report())
+
+
+async def flush_writes():
+    """Гарантирует, что все записи, поставленные без ожидания (durable=False), уже на диске."""
+    if pool is not None:
+        await pool.flush()
+
+
+def _month_bounds(ym: str) -> tuple[str, str]:
+    """'YYYY-MM' → ('YYYY-MM-01', 'YYYY-MM-<последний день>') для индексного BETWEEN."""
+    y, m = map(int, ym.split("-"))
+    return f"{ym}-01", f"{ym}-{calendar.monthrange(y, m)[1]:02d}"
+
+
+async def _get_pool() -> ConnectionPool:
+    """Возвращает пул, при необходимости инициализируя базу."""
+    if pool is None:
+        await sql_start()
+    return pool
+
+
+async def _fetchone(sql: str, params: tuple | dict = ()):
+    async with (await _get_pool()).read() as db:
+        async with db.execute(sql, params) as cur:
+            return await cur.fetchone()
+
+
+async def _fetchall(sql: str, params: tuple | dict = ()) -> list:
+    async with (await _get_pool()).read() as db:
+        async with db.execute(sql, params) as cur:
+            return await cur.fetchall()
 
-    base.commit()
+
+async def _execute(sql: str, params: tuple | dict = (), durable: bool = True) -> aiosqlite.Cursor | None:
+    """
+    Ставит запрос на запись в очередь group commit.
+    durable=True — ждём COMMIT и возвращаем курсор (rowcount, lastrowid);
+    durable=False — не ждём, ошибка только попадёт в лог.
+    """
+    async def op(db):
+        return await db.execute(sql, params)
+
+    fut = (await _get_pool()).submit(op)
+    if durable:
+        return await fut
+    fut.add_done_callback(_log_failed_write)
+    return None
+
+
+def connect_readonly(path: str | None = None, **kwargs) -> sqlite3.Connection:
+    """
+    Отдельное синхронное read-only соединение с базой пула (или path) — для долгих
+    потоковых выборок в своём потоке (выгрузки) и для WSGI-бэкенда мини-приложения,
+    чтобы не занимать читателей пула. kwargs уходят в sqlite3.connect
+    (check_same_thread=False — для пула, общего на несколько потоков).
+    """
+    path = path or (pool.path if pool is not None else DB_PATH)
+    kwargs.setdefault("factory", ProfilingConnection if QUERY_PROFILE else sqlite3.Connection)
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, **kwargs)
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
 
 # ================== users_start ==================
-def add_user_start(tg_id: int, username: str | None):
-    cur.execute(
+async def add_user_start(tg_id: int, username: str | None):
+    await _execute(
         "INSERT INTO users_start (tg_id, username, start_date) VALUES (?,?,?)",
         (tg_id, username, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        durable=False,  # журнал стартов — не ждём fsync в обработчике /start
     )
-    base.commit()
 
-def get_all_starts():
+async def get_all_starts():
     """Возвращает все записи из users_start"""
-    cur.execute('SELECT * FROM users_start')
-    return cur.fetchall()
+    return await _fetchall('SELECT * FROM users_start')
 
 # ================== guest_cards ==================
 async def sql_add_guest_card(state):
     """Сохраняем карточку гостя из FSM Context"""
     data = await state.get_data()
-    cur.execute(
+    await _execute(
         'INSERT INTO guest_cards (name, phone, photo, food, alerg) VALUES (?, ?, ?, ?, ?)',
         (
             data.get('name'),
@@ -172,58 +318,90 @@ async def sql_add_guest_card(state):
             data.get('alerg'),
         )
     )
-    base.commit()
 
-def get_all_guest_cards():
+async def get_all_guest_cards():
     """Возвращает все карточки гостей"""
-    cur.execute('SELECT * FROM guest_cards')
-    return cur.fetchall()
+    return await _fetchall('SELECT * FROM guest_cards')
 
-def update_guest_tg_id(user_id: int):
+async def update_guest_tg_id(user_id: int):
     """Обновляем tg_id для последней карточки гостя"""
-    cur.execute(
+    await _execute(
         'UPDATE guest_cards SET tg_id = ? WHERE id = (SELECT MAX(id) FROM guest_cards)',
         (user_id,)
     )
-    base.commit()
 
 # ================== waiters ==================
-def add_waiter(tg_id: int):
+def invalidate_identity(tg_id: int | None = None, waiter_id: int | None = None):
+    """
+    Сбрасывает кэш идентичностей после изменения waiters/employees.
+    С tg_id/waiter_id — записи этого официанта (в том числе привязку к сотруднику)
+    и общий список; без них — всё.
+    Кэш свой в каждом процессе: другие воркеры (webhook, общий FSM) увидят
+    изменение не позже чем через IDENTITY_CACHE_TTL.
+    """
+    if tg_id is None and waiter_id is None:
+        identity_cache.invalidate()
+        return
+    keys = [("employees_with_shifts",)]
+    if tg_id is not None:
+        keys.append(("waiter_by_tg", tg_id))
+        row = identity_cache.peek(("waiter_by_tg", tg_id))
+        if waiter_id is None and row:
+            waiter_id = row[0]
+    if waiter_id is not None:
+        keys.append(("employee_for_waiter", waiter_id))
+    identity_cache.invalidate(*keys)
+
+async def add_waiter(tg_id: int):
     """Добавляем официанта по tg_id, если ещё нет"""
-    cur.execute(
+    await _execute(
         'INSERT OR IGNORE INTO waiters (tg_id) VALUES (?)',
         (tg_id,)
     )
-    base.commit()
+    invalidate_identity(tg_id)
 
-def get_all_waiters():
+async def get_all_waiters():
     """Возвращает список tg_id всех официантов"""
-    cur.execute('SELECT tg_id FROM waiters')
-    return [row[0] for row in cur.fetchall()]
+    return [row[0] for row in await _fetchall('SELECT tg_id FROM waiters')]
 
-def get_waiter_by_tg(tg_id: int):
-    """Возвращает (id, name) официанта по tg_id"""
-    cur.execute('SELECT id, name FROM waiters WHERE tg_id = ?', (tg_id,))
-    return cur.fetchone()
+async def get_waiter_by_tg(tg_id: int):
+    """Возвращает (id, name) официанта по tg_id (через кэш; None тоже кэшируется до add_waiter)"""
+    return await identity_cache.get_or_load(
+        ("waiter_by_tg", tg_id),
+        lambda: _fetchone('SELECT id, name FROM waiters WHERE tg_id = ?', (tg_id,)),
+    )
 
-def get_waiter_id_by_tg(tg_id: int) -> int | None:
+async def get_waiter_id_by_tg(tg_id: int) -> int | None:
     """Возвращает id официанта по tg_id или None"""
-    row = get_waiter_by_tg(tg_id)
+    row = await get_waiter_by_tg(tg_id)
     return row[0] if row else None
 
+async def get_waiter_display_name(waiter_id: int) -> str | None:
+    """Имя официанта: ФИО из employees, если привязан, иначе waiters.name"""
+    row = await _fetchone(
+        "SELECT COALESCE(e.first_name || ' ' || e.last_name, w.name) AS name "
+        "FROM waiters w LEFT JOIN employees e ON w.employee_id = e.id "
+        "WHERE w.id = ?",
+        (waiter_id,)
+    )
+    return row["name"] if row else None
+
+async def get_unlinked_waiters():
+    """Официанты без привязки к employees: [(id, tg_id, name), ...]"""
+    return await _fetchall("SELECT id, tg_id, name FROM waiters WHERE employee_id IS NULL")
+
 # ================== test_results ==================
-def add_test_result(tg_id: int, score: int, total: int):
+async def add_test_result(tg_id: int, score: int, total: int):
     """Сохраняем или обновляем результат теста"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cur.execute(
+    await _execute(
         'INSERT OR REPLACE INTO test_results (tg_id, score, total, timestamp) VALUES (?, ?, ?, ?)',
         (tg_id, score, total, timestamp)
     )
-    base.commit()
 
-def get_all_test_results_with_username():
+async def get_all_test_results_with_username():
     """Объединяет test_results с users_start, возвращает [(tg_id, username, score, total, timestamp), ...]"""
-    cur.execute(
+    return await _fetchall(
         '''
         SELECT tr.tg_id, us.username, tr.score, tr.total, tr.timestamp
         FROM test_results tr
@@ -231,258 +409,557 @@ def get_all_test_results_with_username():
         ORDER BY tr.timestamp DESC
         '''
     )
-    return cur.fetchall()
 
-def clear_test_results():
+async def clear_test_results():
     """Очищает таблицу test_results"""
-    cur.execute('DELETE FROM test_results')
-    base.commit()
+    cur = await _execute('DELETE FROM test_results')
     return cur.rowcount
 
 # ================== shifts ==================
-def add_shift(waiter_id: int, date: str):
+def _shift_month_key(waiter_id: int, date: str) -> tuple:
+    """Ключ shift_month_cache для смены официанта на дату 'YYYY-MM-DD'."""
+    return (waiter_id, int(date[:4]), int(date[5:7]))
+
+async def add_shift(waiter_id: int, date: str):
     """Создаёт запись смены, если её нет"""
-    cur.execute(
+    await _execute(
         'INSERT OR IGNORE INTO shifts (waiter_id, date) VALUES (?, ?)',
         (waiter_id, date)
     )
-    base.commit()
+    shift_month_cache.invalidate(_shift_month_key(waiter_id, date))
 
-def set_shift_hours(waiter_id: int, date: str, hours: float):
+async def set_shift_hours(waiter_id: int, date: str, hours: float):
     """Устанавливает количество часов для смены"""
-    cur.execute(
+    await _execute(
         'UPDATE shifts SET hours = ? WHERE waiter_id = ? AND date = ?',
         (hours, waiter_id, date)
     )
-    base.commit()
+    shift_month_cache.invalidate(_shift_month_key(waiter_id, date))
 
-def set_shift_tasks(waiter_id: int, date: str, tasks: str):
+async def set_shift_tasks(waiter_id: int, date: str, tasks: str):
     """Устанавливает задачи для смены"""
-    cur.execute(
+    await _execute(
         'UPDATE shifts SET tasks = ? WHERE waiter_id = ? AND date = ?',
         (tasks, waiter_id, date)
     )
-    base.commit()
+    shift_month_cache.invalidate(_shift_month_key(waiter_id, date))
 
-def get_shifts_for(waiter_id: int) -> dict:
+async def get_shifts_for_month(waiter_id: int, year: int, month: int) -> dict:
+    """
+    Смены официанта за один месяц: {date: {'hours': hours, 'tasks': tasks}}.
+    Читается по индексу (waiter_id, date) и кэшируется на (официант, месяц).
+    """
+    async def load():
+        rows = await _fetchall(
+            'SELECT date, hours, tasks FROM shifts WHERE waiter_id = ? AND date BETWEEN ? AND ?',
+            (waiter_id, *_month_bounds(f"{year:04d}-{month:02d}")),
+        )
+        return {row[0]: {'hours': row[1], 'tasks': row[2]} for row in rows}
+
+    return dict(await shift_month_cache.get_or_load((waiter_id, year, month), load))
+
+async def get_shifts_for(waiter_id: int) -> dict:
     """Возвращает словарь {date: {'hours': hours, 'tasks': tasks}}"""
-    cur.execute(
+    rows = await _fetchall(
         'SELECT date, hours, tasks FROM shifts WHERE waiter_id = ?',
         (waiter_id,)
     )
-    return {row[0]: {'hours': row[1], 'tasks': row[2]} for row in cur.fetchall()}
-
-def get_all_shifts():
-    cur = base.cursor()
-    cur.execute("""
-        SELECT w.id AS waiter_id, 
-               COALESCE(e.first_name || ' ' || e.last_name, w.name) AS name, 
-               s.date, 
-               s.hours, 
+    return {row[0]: {'hours': row[1], 'tasks': row[2]} for row in rows}
+
+async def get_all_shifts():
+    return await _fetchall("""
+        SELECT w.id AS waiter_id,
+               COALESCE(e.first_name || ' ' || e.last_name, w.name) AS name,
+               s.date,
+               s.hours,
                s.tasks
         FROM shifts s
         JOIN waiters w ON s.waiter_id = w.id
         LEFT JOIN employees e ON w.employee_id = e.id
         ORDER BY s.date
     """)
-    return cur.fetchall()
+
+async def clear_month_shifts(ym: str):
+    """Удаляет все смены за месяц (ym = 'YYYY-MM')."""
+    await _execute("DELETE FROM shifts WHERE date BETWEEN ? AND ?", _month_bounds(ym))
+    shift_month_cache.invalidate()
 
 # ─────────────────────────────────────────────
 # TIPS  ← нужные функции!
 # ─────────────────────────────────────────────
-def add_tip(waiter_id: int, date: str, amount: float):
-    """Добавить или обновить сумму чаевых за дату."""
-    cur.execute(
-        """
-        INSERT INTO tips (waiter_id, date, amount)
-        VALUES (?,?,?)
-        ON CONFLICT(waiter_id, date)
-        DO UPDATE SET amount=excluded.amount
-        """,
-        (waiter_id, date, amount),
-    )
-    base.commit()
-
-def get_month_tips(waiter_id: int, ym: str) -> float:
-    """Вернуть сумму чаевых за месяц (ym = 'YYYY-MM')."""
-    cur.execute(
-        "SELECT COALESCE(SUM(amount),0) FROM tips WHERE waiter_id=? AND date LIKE ?",
-        (waiter_id, f"{ym}-%"),
+async def add_tip(waiter_id: int, date: str, amount: float) -> float:
+    """
+    Добавить или обновить сумму чаевых за дату.
+    Возвращает итог официанта за месяц — его пересчитывают триггеры monthly_tips
+    в той же транзакции, так что отдельного SUM по tips не нужно.
+    """
+    async def op(db):
+        await db.execute(
+            """
+            INSERT INTO tips (waiter_id, date, amount)
+            VALUES (?,?,?)
+            ON CONFLICT(waiter_id, date)
+            DO UPDATE SET amount=excluded.amount
+            """,
+            (waiter_id, date, amount),
+        )
+        async with db.execute(
+            "SELECT amount_kop FROM monthly_tips WHERE ym = ? AND waiter_id = ?", (date[:7], waiter_id)
+        ) as cur:
+            row = await cur.fetchone()
+        return row[0] / 100 if row else 0.0
+
+    return await (await _get_pool()).transaction(op)
+
+async def get_month_tips(waiter_id: int, ym: str) -> float:
+    """Вернуть сумму чаевых за месяц (ym = 'YYYY-MM') из итогов monthly_tips."""
+    row = await _fetchone(
+        "SELECT amount_kop FROM monthly_tips WHERE ym = ? AND waiter_id = ?", (ym, waiter_id)
     )
-    return cur.fetchone()[0]
+    return row[0] / 100 if row else 0.0
 
-def clear_month_tips(waiter_id: int, ym: str):
+async def clear_month_tips(waiter_id: int, ym: str):
     """Обнулить чаевые за указанный месяц."""
-    cur.execute(
-        "DELETE FROM tips WHERE waiter_id=? AND date LIKE ?",
-        (waiter_id, f"{ym}-%"),
+    await _execute(
+        "DELETE FROM tips WHERE waiter_id=? AND date BETWEEN ? AND ?",
+        (waiter_id, *_month_bounds(ym)),
     )
-    base.commit()
+
+_WAITER_NAME = "COALESCE(e.first_name || ' ' || e.last_name, NULLIF(w.name, ''), 'Без имени')"
+
+async def get_tips_leaderboard(ym: str, limit: int = 10) -> list[tuple[str, float, int]]:
+    """Лучшие по чаевым за месяц: [(имя, сумма, дней с чаевыми)] — по итогам monthly_tips."""
+    rows = await _fetchall(f"""
+        SELECT {_WAITER_NAME} AS name, mt.amount_kop, mt.days
+        FROM monthly_tips mt
+        JOIN waiters w ON w.id = mt.waiter_id
+        LEFT JOIN employees e ON e.id = w.employee_id
+        WHERE mt.ym = ? AND mt.days > 0
+        ORDER BY mt.amount_kop DESC
+        LIMIT ?
+    """, (ym, limit))
+    return [(name, kop / 100, days) for name, kop, days in rows]
+
+async def get_tips_report(from_ym: str, to_ym: str) -> list[tuple[str, float, int]]:
+    """Чаевые по официантам за месяцы from_ym..to_ym включительно: [(имя, сумма, дней)]."""
+    rows = await _fetchall(f"""
+        SELECT {_WAITER_NAME} AS name, SUM(mt.amount_kop) AS kop, SUM(mt.days) AS days
+        FROM monthly_tips mt
+        JOIN waiters w ON w.id = mt.waiter_id
+        LEFT JOIN employees e ON e.id = w.employee_id
+        WHERE mt.ym BETWEEN ? AND ?
+        GROUP BY mt.waiter_id
+        HAVING SUM(mt.days) > 0
+        ORDER BY kop DESC
+    """, (from_ym, to_ym))
+    return [(name, kop / 100, days) for name, kop, days in rows]
+
+def read_waiter_month(conn: sqlite3.Connection, tg_id: int, ym: str) -> dict | None:
+    """
+    Смены, часы и чаевые официанта tg_id за месяц одним набором запросов на
+    синхронном соединении (connect_readonly) — для мини-приложения.
+    None — tg_id не официант.
+    """
+    default_rate = float(os.getenv("HOURLY_RATE", "140"))
+    waiter = conn.execute(f"""
+        SELECT w.id, w.employee_id, {_WAITER_NAME}, COALESCE(e.rate, ?)
+        FROM waiters w
+        LEFT JOIN employees e ON e.id = w.employee_id
+        WHERE w.tg_id = ?
+    """, (default_rate, tg_id)).fetchone()
+    if waiter is None:
+        return None
+    waiter_id, employee_id, name, rate = waiter
+    first, last = _month_bounds(ym)
+
+    days = {
+        day: {"date": day, "hours": hours or 0.0, "tasks": tasks or "", "tips": 0.0}
+        for day, hours, tasks in conn.execute(
+            "SELECT date, hours, tasks FROM shifts WHERE waiter_id = ? AND date BETWEEN ? AND ?",
+            (waiter_id, first, last))
+    }
+    for day, amount in conn.execute(
+            "SELECT date, amount FROM tips WHERE waiter_id = ? AND date BETWEEN ? AND ?",
+            (waiter_id, first, last)):
+        days.setdefault(day, {"date": day, "hours": 0.0, "tasks": "", "tips": 0.0})["tips"] = amount or 0.0
+
+    # Часы для зарплаты — как в ведомости: сводка по сотруднику (work_hours заменяет смену)
+    if employee_id is not None:
+        row = conn.execute("SELECT hours FROM monthly_hours WHERE ym = ? AND employee_id = ?",
+                           (ym, employee_id)).fetchone()
+        hours = row[0] if row else 0.0
+    else:
+        hours = sum(d["hours"] for d in days.values())
+    tips = conn.execute("SELECT amount_kop, days FROM monthly_tips WHERE ym = ? AND waiter_id = ?",
+                        (ym, waiter_id)).fetchone() or (0, 0)
+
+    return {
+        "month": ym,
+        "waiter": {"id": waiter_id, "name": name},
+        "days": [days[d] for d in sorted(days)],
+        "totals": {
+            "hours": round(hours, 2),
+            "rate": rate,
+            "pay": round(hours * rate, 2),
+            "tips": tips[0] / 100,
+            "tip_days": tips[1],
+        },
+    }
 
 # ================== employees ==================
-def add_employee(last_name: str, first_name: str, role: str, rate: float = None):
-    cur = base.cursor()
-    cur.execute(
+async def add_employee(last_name: str, first_name: str, role: str, rate: float = None) -> int:
+    cur = await _execute(
         "INSERT INTO employees (last_name, first_name, role, rate) VALUES (?, ?, ?, ?)",
         (last_name, first_name, role, rate)
     )
-    base.commit()
+    identity_cache.invalidate(("employees_with_shifts",))
+    return cur.lastrowid
 
-def get_all_employees() -> list[tuple[int, str, str, str]]:
+async def get_all_employees() -> list[tuple[int, str, str, str]]:
     """Возвращает список (id, last_name, first_name, role)."""
-    cur.execute('SELECT id, last_name, first_name, role FROM employees')
-    return cur.fetchall()
+    return await _fetchall('SELECT id, last_name, first_name, role FROM employees')
 
 # ================== work_hours ==================
-def set_work_hours(employee_id: int, date: str, hours: float):
+async def set_work_hours(employee_id: int, date: str, hours: float):
     """Записать или обновить часы для сотрудника на дату."""
-    cur.execute(
+    await _execute(
         'INSERT INTO work_hours (employee_id, date, hours) VALUES (?,?,?) '
         'ON CONFLICT(employee_id, date) DO UPDATE SET hours=excluded.hours',
         (employee_id, date, hours)
     )
-    base.commit()
 
-def get_all_work_hours_dates() -> list[str]:
+async def get_all_work_hours_dates() -> list[str]:
     """Список всех дат, где есть часы (для отметок в календаре)."""
-    cur.execute('SELECT DISTINCT date FROM work_hours')
-    return [r[0] for r in cur.fetchall()]
+    return [r[0] for r in await _fetchall('SELECT DISTINCT date FROM work_hours')]
 
-def get_employee_by_id(emp_id: int):
-    cur = base.cursor()
-    cur.execute("SELECT id, last_name, first_name, role, rate FROM employees WHERE id = ?", (emp_id,))
-    return cur.fetchone()
+async def get_employee_by_id(emp_id: int):
+    return await _fetchone(
+        "SELECT id, last_name, first_name, role, rate FROM employees WHERE id = ?", (emp_id,)
+    )
 
-def set_waiter_name(tg_id: int, name: str):
-    cur = base.cursor()
-    cur.execute("UPDATE waiters SET name = ? WHERE tg_id = ?", (name, tg_id))
-    base.commit()
+async def set_waiter_name(tg_id: int, name: str):
+    await _execute("UPDATE waiters SET name = ? WHERE tg_id = ?", (name, tg_id))
+    invalidate_identity(tg_id)
 
+async def link_waiter_employee(waiter_id: int, employee_id: int | None):
+    """Привязывает официанта к карточке сотрудника (None — отвязывает); итоги monthly_hours переносят триггеры."""
+    await _execute("UPDATE waiters SET employee_id = ? WHERE id = ?", (employee_id, waiter_id))
+    invalidate_identity(waiter_id=waiter_id)
 
 
-def get_employee_id_for_waiter(waiter_id: int) -> int | None:
-    cur.execute("SELECT employee_id FROM waiters WHERE id=?", (waiter_id,))
-    row = cur.fetchone()
-    return row[0] if row and row[0] else None
 
-def migrate_shifts_to_work_hours():
-    cur.execute("""
-        SELECT s.waiter_id, s.date, s.hours, w.employee_id
-        FROM shifts s
-        JOIN waiters w ON w.id = s.waiter_id
-        WHERE s.hours IS NOT NULL AND w.employee_id IS NOT NULL
-    """)
-    rows = cur.fetchall()
-    for waiter_id, date, hours, emp_id in rows:
-        set_work_hours(emp_id, date, hours)
+async def get_employee_id_for_waiter(waiter_id: int) -> int | None:
+    async def load():
+        row = await _fetchone("SELECT employee_id FROM waiters WHERE id=?", (waiter_id,))
+        return row[0] if row and row[0] else None
 
+    return await identity_cache.get_or_load(("employee_for_waiter", waiter_id), load)
 
-def get_month_hours_with_rate(ym: str) -> list[tuple[str, float, float]]:
+_SHIFTS_TO_WORK_HOURS = """
+    INSERT INTO work_hours (employee_id, date, hours)
+    SELECT w.employee_id, s.date, s.hours
+    FROM shifts s
+    JOIN waiters w ON w.id = s.waiter_id
+    WHERE s.hours IS NOT NULL AND w.employee_id IS NOT NULL {since}
+    ORDER BY s.id
+    ON CONFLICT(employee_id, date) DO UPDATE SET hours=excluded.hours
+"""
+
+async def migrate_shifts_to_work_hours(incremental: bool = False) -> dict:
     """
-    [(ФИО, часы_за_месяц, ставка)]  — берём work_hours + дополнение из shifts.
+    Переносит часы из shifts в work_hours одним INSERT ... SELECT ... ON CONFLICT
+    в одной транзакции.
+    incremental=True — только смены, изменённые (shifts.updated_at) с прошлого запуска.
+    Возвращает {'rows': перенесено строк, 'elapsed': секунд, 'incremental': bool}.
     """
-    default_rate = float(os.getenv("HOURLY_RATE", "140"))
-
-    cur.execute(f"""
-        WITH wh AS (
-            SELECT employee_id, date, hours
-            FROM work_hours
-            WHERE date LIKE '{ym}-%'
-        ),
-        sh AS (
-            SELECT w.employee_id, s.date, s.hours
-            FROM shifts s
-            JOIN waiters w ON w.id = s.waiter_id
-            WHERE s.date LIKE '{ym}-%'
-              AND w.employee_id IS NOT NULL
-              AND NOT EXISTS (
-                  SELECT 1 FROM wh
-                  WHERE wh.employee_id = w.employee_id
-                    AND wh.date        = s.date
-              )
-        ),
-        unioned AS (
-            SELECT * FROM wh
-            UNION ALL
-            SELECT * FROM sh
+    async def op(db):
+        since = None
+        if incremental:
+            async with db.execute(
+                "SELECT synced_until FROM sync_state WHERE name = 'shifts_to_work_hours'"
+            ) as cur:
+                row = await cur.fetchone()
+            since = row[0] if row else None
+        async with db.execute("SELECT MAX(updated_at) FROM shifts") as cur:
+            watermark = (await cur.fetchone())[0]
+
+        if since is None:
+            cur = await db.execute(_SHIFTS_TO_WORK_HOURS.format(since=""))
+        else:
+            # >= а не >: смены, изменённые в ту же миллисекунду, перенесутся повторно — это безопасно
+            cur = await db.execute(
+                _SHIFTS_TO_WORK_HOURS.format(since="AND s.updated_at >= ?"), (since,)
+            )
+        await db.execute(
+            "INSERT OR REPLACE INTO sync_state (name, synced_until) VALUES ('shifts_to_work_hours', ?)",
+            (watermark,)
         )
-        SELECT e.first_name || ' ' || e.last_name AS fio,
-               SUM(u.hours)                       AS hours,
-               COALESCE(e.rate, ?)                AS rate
-        FROM unioned u
-        JOIN employees e ON e.id = u.employee_id
-        GROUP BY e.id
-        ORDER BY fio
-    """, (default_rate,))
-    return cur.fetchall()
+        return cur.rowcount
 
+    started = time.perf_counter()
+    rows = await (await _get_pool()).transaction(op)
+    elapsed = time.perf_counter() - started
+    logger.info("shifts -> work_hours: %d rows in %.3f s (incremental=%s)", rows, elapsed, incremental)
+    return {"rows": rows, "elapsed": elapsed, "incremental": incremental}
 
 
-def get_work_hours(employee_id: int, date: str) -> float:
-    """Часы сотрудника за дату — сначала work_hours, потом shifts."""
-    # work_hours
-    cur.execute(
-        "SELECT hours FROM work_hours WHERE employee_id=? AND date=?",
-        (employee_id, date)
-    )
-    row = cur.fetchone()
-    if row:
-        return row[0] or 0.0
+async def clear_month_hours(ym: str):
+    """Обнуляет часы за месяц: hours в shifts и записи work_hours."""
+    bounds = _month_bounds(ym)
 
-    # shifts (если строка в work_hours не найдена)
-    cur.execute("""
-        SELECT s.hours
+    async def op(db):
+        await db.execute("UPDATE shifts SET hours = NULL WHERE date BETWEEN ? AND ?", bounds)
+        await db.execute("DELETE FROM work_hours WHERE date BETWEEN ? AND ?", bounds)
+
+    await (await _get_pool()).transaction(op)
+    shift_month_cache.invalidate()
+
+
+async def get_month_hours_with_rate(ym: str) -> list[tuple[str, float, float]]:
+    """
+    [(ФИО, часы_за_месяц, ставка)] — из сводки monthly_hours (work_hours + дополнение
+    из shifts), которую поддерживают триггеры; чтение — диапазон по первичному ключу.
+    """
+    default_rate = float(os.getenv("HOURLY_RATE", "140"))
+    return await _fetchall("""
+        SELECT e.first_name || ' ' || e.last_name AS fio,
+               mh.hours                           AS hours,
+               COALESCE(e.rate, :rate)            AS rate
+        FROM monthly_hours mh
+        JOIN employees e ON e.id = mh.employee_id
+        WHERE mh.ym = :ym AND mh.entries > 0
+        ORDER BY fio
+    """, {"ym": ym, "rate": default_rate})
+
+
+# Часы по (месяц, сотрудник), посчитанные заново по сырым строкам work_hours и shifts
+_MONTHLY_HOURS_FROM_RAW = """
+    SELECT substr(date, 1, 7) AS ym, employee_id, SUM(COALESCE(hours, 0)) AS hours, COUNT(*) AS entries
+    FROM (
+        SELECT employee_id, date, hours
+        FROM work_hours
+        WHERE date BETWEEN :first AND :last
+        UNION ALL
+        SELECT w.employee_id, s.date, s.hours
         FROM shifts s
         JOIN waiters w ON w.id = s.waiter_id
-        WHERE w.employee_id = ? AND s.date = ?
-    """, (employee_id, date))
-    row = cur.fetchone()
-    return row[0] if row else 0.0
+        WHERE s.date BETWEEN :first AND :last
+          AND w.employee_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM work_hours wh WHERE wh.employee_id = w.employee_id AND wh.date = s.date)
+    )
+    GROUP BY 1, 2
+"""
+
+
+def _months_bounds(ym: str | None) -> dict:
+    """Границы дат для месяца ym или для всей истории (ym=None)."""
+    if ym is None:
+        return {"first": "0000-01-01", "last": "9999-12-31", "from_ym": "0000-01", "to_ym": "9999-12"}
+    first, last = _month_bounds(ym)
+    return {"first": first, "last": last, "from_ym": ym, "to_ym": ym}
+
 
-def get_cursor() -> sqlite3.Cursor:
+async def check_monthly_hours(ym: str | None = None, tolerance: float = 1e-6) -> list[tuple[str, int, float, float]]:
     """
-    Возвращает рабочий курсор.
-    Если база ещё не инициализирована, кидает на sql_start().
+    Сверяет monthly_hours с сырыми строками за месяц ym (None — вся история).
+    Возвращает расхождения [(ym, employee_id, в сводке, по сырым данным)] — по часам
+    или по числу учтённых строк (тогда часы могут совпадать).
     """
-    global base, cur
-    if base is None:
-        sql_start()
-    return base.cursor()
+    bounds = _months_bounds(ym)
+    rows = await _fetchall(f"""
+        WITH raw AS ({_MONTHLY_HOURS_FROM_RAW}),
+        stored AS (
+            SELECT ym, employee_id, hours, entries FROM monthly_hours WHERE ym BETWEEN :from_ym AND :to_ym
+        )
+        SELECT r.ym, r.employee_id, COALESCE(st.hours, 0), r.hours, COALESCE(st.entries, 0), r.entries
+        FROM raw r LEFT JOIN stored st ON st.ym = r.ym AND st.employee_id = r.employee_id
+        UNION ALL
+        SELECT st.ym, st.employee_id, st.hours, 0, st.entries, 0
+        FROM stored st
+        WHERE NOT EXISTS (SELECT 1 FROM raw r WHERE r.ym = st.ym AND r.employee_id = st.employee_id)
+    """, bounds)
+    return [tuple(row[:4]) for row in rows if abs(row[2] - row[3]) > tolerance or row[4] != row[5]]
+
+
+async def rebuild_monthly_hours(ym: str | None = None) -> int:
+    """Пересчитывает monthly_hours за месяц ym (None — всю историю) одной транзакцией; возвращает число строк."""
+    bounds = _months_bounds(ym)
+
+    async def op(db):
+        await db.execute("DELETE FROM monthly_hours WHERE ym BETWEEN :from_ym AND :to_ym", bounds)
+        cur = await db.execute(
+            f"INSERT INTO monthly_hours (ym, employee_id, hours, entries) {_MONTHLY_HOURS_FROM_RAW}", bounds
+        )
+        return cur.rowcount
+
+    rows = await (await _get_pool()).transaction(op)
+    logger.info("monthly_hours rebuilt for %s: %d rows", ym or "all months", rows)
+    return rows
 
-def get_employees_with_shifts() -> list[tuple[str,str]]:
+
+async def get_work_hours(employee_id: int, date: str) -> float:
+    """Часы сотрудника за дату — сначала work_hours, потом shifts."""
+    async with (await _get_pool()).read() as db:
+        # work_hours
+        async with db.execute(
+            "SELECT hours FROM work_hours WHERE employee_id=? AND date=?",
+            (employee_id, date)
+        ) as cur:
+            row = await cur.fetchone()
+        if row:
+            return row[0] or 0.0
+
+        # shifts (если строка в work_hours не найдена)
+        async with db.execute("""
+            SELECT s.hours
+            FROM shifts s
+            JOIN waiters w ON w.id = s.waiter_id
+            WHERE w.employee_id = ? AND s.date = ?
+        """, (employee_id, date)) as cur:
+            row = await cur.fetchone()
+        return row[0] if row else 0.0
+
+async def get_work_hours_range(start: str, end: str) -> dict[tuple[int, str], float]:
+    """
+    Часы всех сотрудников за период [start, end] одним проходом:
+    {(employee_id, date): hours} — work_hours в приоритете над shifts,
+    как в get_work_hours().
+    """
+    result: dict[tuple[int, str], float] = {}
+    async with (await _get_pool()).read() as db:
+        async with db.execute("""
+            SELECT w.employee_id, s.date, s.hours
+            FROM shifts s
+            JOIN waiters w ON w.id = s.waiter_id
+            WHERE w.employee_id IS NOT NULL AND s.date BETWEEN ? AND ?
+        """, (start, end)) as cur:
+            for emp_id, date, hours in await cur.fetchall():
+                result[(emp_id, date)] = hours or 0.0
+        async with db.execute(
+            "SELECT employee_id, date, hours FROM work_hours WHERE date BETWEEN ? AND ?",
+            (start, end)
+        ) as cur:
+            for emp_id, date, hours in await cur.fetchall():
+                result[(emp_id, date)] = hours or 0.0
+    return result
+
+async def get_employees_with_shifts() -> list[tuple[str,str]]:
     """
     Возвращает список (uid, name), где
      - uid == 'W{id}' для всех waiters
      - uid == 'E{id}' для всех unlinked employees
     """
-    global base
-    if not base:
-        sql_start()
-    cur = base.cursor()
-
-    # 1) Все официанты
-    cur.execute("""
-        SELECT 
-          w.id   AS id,
-          COALESCE(e.first_name || ' ' || e.last_name, w.name, 'Без имени') AS name
+    return list(await identity_cache.get_or_load(("employees_with_shifts",), _load_employees_with_shifts))
+
+async def _load_employees_with_shifts() -> list[tuple[str, str]]:
+    async with (await _get_pool()).read() as db:
+        # 1) Все официанты
+        async with db.execute("""
+            SELECT
+              w.id   AS id,
+              COALESCE(e.first_name || ' ' || e.last_name, w.name, 'Без имени') AS name
+            FROM waiters w
+            LEFT JOIN employees e ON w.employee_id = e.id
+        """) as cur:
+            waiters = [(f"W{row['id']}", row['name']) for row in await cur.fetchall()]
+
+        # 2) Все сотрудники без привязки в waiters
+        async with db.execute("""
+            SELECT
+              e.id AS id,
+              e.first_name || ' ' || e.last_name AS name
+            FROM employees e
+            LEFT JOIN waiters w ON w.employee_id = e.id
+            WHERE w.id IS NULL
+        """) as cur:
+            employees = [(f"E{row['id']}", row['name']) for row in await cur.fetchall()]
+
+    # 3) Объединяем (uid уникальны, дубликатов быть не может)
+    return waiters + employees
+
+# ================== bulk schedule import ==================
+async def get_people_for_import() -> list[tuple[int | None, int | None, str | None, str | None, str | None]]:
+    """
+    Все, кого можно назвать в таблице графика, одним запросом:
+    [(waiter_id, employee_id, first_name, last_name, waiter_name)] — официанты
+    (с сотрудником, если привязан) и сотрудники без официанта (waiter_id = None).
+    """
+    return [tuple(row) for row in await _fetchall("""
+        SELECT w.id, e.id, e.first_name, e.last_name, w.name
         FROM waiters w
-        LEFT JOIN employees e ON w.employee_id = e.id
-    """)
-    waiters = [(f"W{row['id']}", row['name']) for row in cur.fetchall()]
-
-    # 2) Все сотрудники без привязки в waiters
-    cur.execute("""
-        SELECT 
-          e.id AS id,
-          e.first_name || ' ' || e.last_name AS name
+        LEFT JOIN employees e ON e.id = w.employee_id
+        UNION ALL
+        SELECT NULL, e.id, e.first_name, e.last_name, NULL
         FROM employees e
-        LEFT JOIN waiters w ON w.employee_id = e.id
-        WHERE w.id IS NULL
-    """)
-    employees = [(f"E{row['id']}", row['name']) for row in cur.fetchall()]
+        WHERE NOT EXISTS (SELECT 1 FROM waiters w WHERE w.employee_id = e.id)
+    """)]
+
+async def get_schedule_snapshot(first: str, last: str) -> tuple[dict, dict]:
+    """
+    Текущий график за период по индексам дат:
+    ({(waiter_id, date): (hours, tasks)}, {(employee_id, date): hours}).
+    """
+    async with (await _get_pool()).read() as db:
+        async with db.execute(
+            "SELECT waiter_id, date, hours, tasks FROM shifts WHERE date BETWEEN ? AND ?", (first, last)
+        ) as cur:
+            shifts = {(row[0], row[1]): (row[2], row[3]) for row in await cur.fetchall()}
+        async with db.execute(
+            "SELECT employee_id, date, hours FROM work_hours WHERE date BETWEEN ? AND ?", (first, last)
+        ) as cur:
+            hours = {(row[0], row[1]): row[2] for row in await cur.fetchall()}
+    return shifts, hours
+
+async def bulk_upsert_schedule(
+    shift_hours: list[tuple[int, str, float]],
+    shift_tasks: list[tuple[int, str, str]],
+    work_hours: list[tuple[int, str, float]],
+) -> int:
+    """
+    Записывает график одной транзакцией через executemany:
+    часы и задачи смен официантов (waiter_id, date, …) и часы сотрудников без
+    официанта (employee_id, date, hours). Возвращает число записанных строк.
+    """
+    async def op(db):
+        await db.executemany(
+            "INSERT INTO shifts (waiter_id, date, hours) VALUES (?, ?, ?) "
+            "ON CONFLICT(waiter_id, date) DO UPDATE SET hours = excluded.hours",
+            shift_hours,
+        )
+        await db.executemany(
+            "INSERT INTO shifts (waiter_id, date, tasks) VALUES (?, ?, ?) "
+            "ON CONFLICT(waiter_id, date) DO UPDATE SET tasks = excluded.tasks",
+            shift_tasks,
+        )
+        await db.executemany(
+            "INSERT INTO work_hours (employee_id, date, hours) VALUES (?, ?, ?) "
+            "ON CONFLICT(employee_id, date) DO UPDATE SET hours = excluded.hours",
+            work_hours,
+        )
+        return len(shift_hours) + len(shift_tasks) + len(work_hours)
+
+    rows = await (await _get_pool()).transaction(op)
+    shift_month_cache.invalidate()
+    return rows
+
+# ================== media_files ==================
+async def get_media_file_id(sha256: str, kind: str) -> str | None:
+    """file_id уже загруженного в Telegram файла с таким содержимым или None."""
+    row = await _fetchone("SELECT file_id FROM media_files WHERE sha256 = ? AND kind = ?", (sha256, kind))
+    return row[0] if row else None
+
+async def set_media_file_id(sha256: str, kind: str, name: str, file_id: str):
+    await _execute(
+        "INSERT INTO media_files (sha256, kind, name, file_id, uploaded_at) VALUES (?,?,?,?,?) "
+        "ON CONFLICT(sha256, kind) DO UPDATE SET name=excluded.name, file_id=excluded.file_id, "
+        "uploaded_at=excluded.uploaded_at",
+        (sha256, kind, name, file_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+
+async def delete_media_file_id(sha256: str, kind: str):
+    """Забыть file_id, который Telegram больше не принимает."""
+    await _execute("DELETE FROM media_files WHERE sha256 = ? AND kind = ?", (sha256, kind))
 
-    # 3) Объединяем, удаляя полные дубликаты (хотя uid уже уникальные)
-    combined = waiters + employees
-    logger.debug("get_employees_with_shifts result: %s", combined)
-    return combined
 
+# METRICS=1: время каждой функции выше и обращения к базе на апдейт (app/metrics.py)
+metrics.instrument_module(globals(), exclude=("sql_start", "sql_stop", "flush_writes"))
@@ -0,0 +1,281 @@
+"""
+Потоковые выгрузки таблиц базы для админки: смены, часовка, результаты тестов,
+журнал стартов и карточки гостей — в xlsx или CSV.
+
+Строки читаются курсором SQLite кусками по EXPORT_CHUNK_ROWS через отдельное
+read-only соединение в своём потоке и сразу пишутся в файл: xlsx — через
+write-only книгу openpyxl (строки уходят во временный XML, а не в дерево ячеек),
+CSV — построчно. Память не растёт с объёмом выгрузки, event loop и читатели
+пула не заняты. В WAL выгрузка видит снимок базы на момент начала и не мешает записи.
+
+    path, rows = await export_table("shifts", ExportFilter("2024-01-01", "2024-12-31"), tmp_dir)
+"""
+
+import asyncio
+import csv
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from app.database import sqlite_db
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+# Бот может отправить документ не больше 50 МБ
+EXPORT_MAX_BYTES = 50 * 1024 * 1024
+# Лимит строк листа Excel (1 048 576) минус шапка — дальше продолжаем на новом листе
+XLSX_SHEET_ROWS = 1_048_575
+
+FORMATS = ("xlsx", "csv")
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    title: str
+    headers: tuple[str, ...]
+    sql: str                           # SELECT ... FROM ... без WHERE и ORDER BY
+    order_by: str
+    date_column: str | None = None     # 'YYYY-MM-DD' или 'YYYY-MM-DD HH:MM:SS'
+    person_column: str | None = None   # выражение с именем сотрудника для фильтра
+    widths: tuple[int, ...] = ()
+
+
+_SHIFT_NAME = "COALESCE(e.first_name || ' ' || e.last_name, w.name)"
+
+EXPORTS: dict[str, ExportSpec] = {
+    "shifts": ExportSpec(
+        title="Смены",
+        headers=("Дата", "Сотрудник", "Часы", "Задачи"),
+        sql=f"""
+            SELECT s.date, {_SHIFT_NAME} AS name, s.hours, s.tasks
+            FROM shifts s
+            JOIN waiters w ON s.waiter_id = w.id
+            LEFT JOIN employees e ON w.employee_id = e.id
+        """,
+        order_by="s.date",  # порядок индекса ix_shifts_date — без сортировки во временном B-дереве
+        date_column="s.date",
+        person_column=_SHIFT_NAME,
+        widths=(12, 28, 8, 40),
+    ),
+    "hours": ExportSpec(
+        title="Часовка",
+        headers=("Дата", "Сотрудник", "Должность", "Часы", "Ставка"),
+        sql="""
+            SELECT wh.date, e.last_name || ' ' || e.first_name AS name, e.role, wh.hours, e.rate
+            FROM work_hours wh
+            JOIN employees e ON e.id = wh.employee_id
+        """,
+        order_by="wh.date",
+        date_column="wh.date",
+        person_column="e.last_name || ' ' || e.first_name",
+        widths=(12, 28, 16, 8, 8),
+    ),
+    "tests": ExportSpec(
+        title="Результаты тестов",
+        headers=("Время", "tg_id", "Username", "Сотрудник", "Баллы", "Всего"),
+        # username — из последнего старта: JOIN со всем users_start размножал бы строки
+        sql=f"""
+            SELECT tr.timestamp, tr.tg_id,
+                   (SELECT us.username FROM users_start us
+                    WHERE us.tg_id = tr.tg_id ORDER BY us.id DESC LIMIT 1) AS username,
+                   {_SHIFT_NAME} AS name, tr.score, tr.total
+            FROM test_results tr
+            LEFT JOIN waiters w ON w.tg_id = tr.tg_id
+            LEFT JOIN employees e ON w.employee_id = e.id
+        """,
+        order_by="tr.timestamp DESC",
+        date_column="tr.timestamp",
+        person_column=f"COALESCE({_SHIFT_NAME}, '') || ' ' || COALESCE(username, '')",
+        widths=(20, 14, 20, 28, 8, 8),
+    ),
+    "starts": ExportSpec(
+        title="Старты бота",
+        headers=("Время", "tg_id", "Username"),
+        sql="SELECT us.start_date, us.tg_id, us.username FROM users_start us",
+        order_by="us.id",
+        date_column="us.start_date",
+        person_column="us.username",
+        widths=(20, 14, 24),
+    ),
+    "guests": ExportSpec(
+        title="Карточки гостей",
+        headers=("№", "Имя", "Телефон", "Предпочтения", "Аллергии", "tg_id"),
+        sql="SELECT g.id, g.name, g.phone, g.food, g.alerg, g.tg_id FROM guest_cards g",
+        order_by="g.id",
+        person_column="g.name",
+        widths=(6, 24, 16, 40, 30, 14),
+    ),
+}
+
+USAGE = (
+    "/export <вид> [с] [по] [сотрудник] [csv]\n"
+    "Виды: " + ", ".join(f"{kind} — {spec.title.lower()}" for kind, spec in EXPORTS.items()) + "\n"
+    "Даты — 2024-01-31 или 31.01.2024; одна дата — «начиная с». "
+    "Сотрудник — часть имени, без учёта регистра.\n"
+    "Пример: /export shifts 01.01.2024 31.03.2024 Иванов"
+)
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    date_from: str | None = None  # 'YYYY-MM-DD' включительно
+    date_to: str | None = None    # 'YYYY-MM-DD' включительно
+    person: str | None = None     # подстрока имени
+
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+
+
+def _parse_date(token: str) -> str | None:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(token, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def parse_command(args: str) -> tuple[str, ExportFilter, str]:
+    """Аргументы /export → (вид, фильтр, формат); ValueError с текстом для админа."""
+    tokens = args.split()
+    if not tokens or tokens[0].lower() not in EXPORTS:
+        raise ValueError("Неизвестный вид выгрузки.")
+    kind, fmt, dates, person = tokens[0].lower(), "xlsx", [], []
+    for token in tokens[1:]:
+        if token.lower() in FORMATS:
+            fmt = token.lower()
+        elif (day := _parse_date(token)) is not None:
+            dates.append(day)
+        else:
+            person.append(token)
+    if len(dates) > 2:
+        raise ValueError("Нужно не больше двух дат.")
+    flt = ExportFilter(
+        date_from=dates[0] if dates else None,
+        date_to=dates[1] if len(dates) == 2 else None,
+        person=" ".join(person) or None,
+    )
+    if flt.date_from and flt.date_to and flt.date_from > flt.date_to:
+        raise ValueError("Начальная дата позже конечной.")
+    return kind, flt, fmt
+
+
+def build_query(spec: ExportSpec, flt: ExportFilter) -> tuple[str, dict]:
+    """SQL выгрузки с условиями фильтра. Условия по дате — на саму колонку, чтобы работал индекс."""
+    where, params = [], {}
+    if flt.date_from or flt.date_to:
+        if spec.date_column is None:
+            raise ValueError(f"«{spec.title}» не фильтруются по датам.")
+        if flt.date_from:
+            where.append(f"{spec.date_column} >= :date_from")
+            params["date_from"] = flt.date_from
+        if flt.date_to:
+            # и для дат, и для отметок времени: всё, что раньше следующего дня
+            where.append(f"{spec.date_column} < date(:date_to, '+1 day')")
+            params["date_to"] = flt.date_to
+    if flt.person:
+        if spec.person_column is None:
+            raise ValueError(f"«{spec.title}» не фильтруются по сотруднику.")
+        where.append(f"instr(casefold({spec.person_column}), :person) > 0")
+        params["person"] = flt.person.casefold()
+    sql = spec.sql.strip()
+    if where:
+        sql += "\nWHERE " + " AND ".join(where)
+    return f"{sql}\nORDER BY {spec.order_by}", params
+
+
+def _casefold(value):
+    # lower() в SQLite понимает только ASCII — кириллицу сравниваем через Python
+    return value.casefold() if isinstance(value, str) else value
+
+
+def iter_chunks(conn: sqlite3.Connection, sql: str, params: dict, chunk_rows: int) -> Iterator[list]:
+    """Строки запроса кусками по chunk_rows: курсор SQLite шагает по результату, не материализуя его."""
+    cur = conn.execute(sql, params)
+    try:
+        while chunk := cur.fetchmany(chunk_rows):
+            yield chunk
+    finally:
+        cur.close()
+
+
+def write_xlsx(path: str, spec: ExportSpec, chunks: Iterable[list]) -> int:
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    ws, sheet_rows, total = None, XLSX_SHEET_ROWS, 0
+    for chunk in chunks:
+        for row in chunk:
+            if sheet_rows == XLSX_SHEET_ROWS:
+                number = len(wb.worksheets) + 1
+                ws = wb.create_sheet(spec.title if number == 1 else f"{spec.title} ({number})")
+                ws.freeze_panes = "A2"
+                for col, width in enumerate(spec.widths, start=1):
+                    ws.column_dimensions[get_column_letter(col)].width = width
+                header = []
+                for title in spec.headers:
+                    cell = WriteOnlyCell(ws, value=title)
+                    cell.font = bold
+                    header.append(cell)
+                ws.append(header)
+                sheet_rows = 0
+            ws.append(row)
+            sheet_rows += 1
+        total += len(chunk)
+    if ws is None:
+        # пустая выгрузка — всё равно валидная книга с шапкой
+        wb.create_sheet(spec.title).append(spec.headers)
+    wb.save(path)
+    return total
+
+
+def write_csv(path: str, spec: ExportSpec, chunks: Iterable[list]) -> int:
+    # utf-8-sig и «;» — чтобы русский Excel открыл файл двойным щелчком
+    total = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(spec.headers)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            total += len(chunk)
+    return total
+
+
+_WRITERS = {"xlsx": write_xlsx, "csv": write_csv}
+
+
+def export_to_file(kind: str, flt: ExportFilter, path: str, fmt: str = "xlsx",
+                   chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """Синхронная выгрузка в файл (для asyncio.to_thread); возвращает число строк."""
+    spec = EXPORTS[kind]
+    sql, params = build_query(spec, flt)
+    conn = sqlite_db.connect_readonly()
+    try:
+        conn.create_function("casefold", 1, _casefold, deterministic=True)
+        return _WRITERS[fmt](path, spec, iter_chunks(conn, sql, params, chunk_rows))
+    finally:
+        conn.close()
+
+
+def file_name(kind: str, flt: ExportFilter, fmt: str) -> str:
+    parts = [kind, flt.date_from, flt.date_to, flt.person]
+    name = "_".join(p for p in parts if p)
+    return re.sub(r"[^\w.-]+", "-", name) + f".{fmt}"
+
+
+async def export_table(kind: str, flt: ExportFilter, directory: str, fmt: str = "xlsx") -> tuple[str, int]:
+    """
+    Выгружает таблицу kind в файл в directory; возвращает (путь, число строк).
+    Перед чтением дожидается записей из очереди group commit (журнал стартов пишется без ожидания).
+    """
+    build_query(EXPORTS[kind], flt)  # ошибки фильтра — до сброса очереди и запуска потока
+    await sqlite_db.flush_writes()
+    path = os.path.join(directory, file_name(kind, flt, fmt))
+    rows = await asyncio.to_thread(export_to_file, kind, flt, path, fmt)
+    return path, rows
@@ -1 +1 @@
-from aiogram import F, Routerfrom aiogram.filters import CommandStart, CommandObject# from aiogram.enums import ChatActionfrom aiogram.fsm.context import FSMContextfrom aiogram.fsm.state import State, StatesGroupfrom aiogram.types import Message, CallbackQuery, FSInputFileimport app.keyboards as kbfrom app.database.sqlite_db import add_user_start, sql_add_guest_card, update_guest_tg_idrouter = Router()class Reg(StatesGroup):    name = State()    number = State()    photo = State()    food = State()    alerg = State()#https://t.me/THE_SSTAFF_BOT?start=ofstaff  ------- для офиков#https://t.me/THE_SSTAFF_BOT?start=postaff  ------- для посудомоек#https://t.me/THE_SSTAFF_BOT?start=admin    ------- для администраторов#https://t.me/THE_SSTAFF_BOT?start=povar    ------- для поваров@router.message(CommandStart(deep_link=True))async def cmd_start_of (message: Message, command: CommandObject):    param = command.args    if param == 'ofstaff':        await message.answer('привет, ты попал на страницу официатов', reply_markup=kb.ofik_inline)            #здесь надо создать кнопочкии "продолжить" к каждому старт, которые будут вести в другой файл    elif param == 'postaff':        await message.answer('привет, ты попал на страницу помошнников', reply_markup=kb.posyda_inline)    elif param == 'admin':        await message.answer('привет, ты попал на страницу администратора')    elif param == 'povar':        await message.answer('привет, ты попал на страницу повара', reply_markup=kb.povar_inline)# Обработчик команды /start без deep link@router.message(CommandStart())async def cmd_start(message: Message):    # Сохраняем данные пользователя в таблице users_start    add_user_start(        tg_id=message.from_user.id,        username=message.from_user.username or "NoUsername"    )    await message.answer(        'Привет!\n'        'Меня зовут Жозефина, я являюсь твоим помощником\n'        'в мир спокойствия и умиротворения.\n'        '\n'        'Сейчас тебе нужно выбрать среди кнопок ниже подходящую услугу',        reply_markup=kb.key_inline    )@router.callback_query(F.data == "yslygi")async def handle_service_selection(callback_query: CallbackQuery):    # Удаляем сообщение с приветствием    await callback_query.message.delete()    await callback_query.message.answer("Вы попали в страницу услуг!",                                        reply_markup=await kb.yslygi())@router.message(F.text == 'Вернуться в меню услуг')async def yslygi (massege: Message):    await massege.answer('Вы попали в меню услуг, здесь вы можете познакомиться со всеми возможными услугами у нас в ГК',                         reply_markup=await kb.yslygi())@router.message(F.text == 'Баня')async def banya(message: Message):    photo = FSInputFile('/Users/kostakovacev/PycharmProjects/STARODONIE/imge/BANA.jpg')    await message.answer_photo(photo,                         reply_markup =kb.back)@router.message(F.text == 'Массаж')async def banya(message: Message):    await message.answer('здесь будет информация про массаж)',                         reply_markup= kb.back)@router.message(F.text == 'CAP-борды')async def banya(message: Message):    await message.answer('здесь будет информация про борды)',                         reply_markup= kb.back)@router.message(F.text == 'Музей "Тихий Дон"')async def banya(message: Message):    await message.answer('здесь будет информация про музей)',                         reply_markup= kb.back)@router.message(F.text == 'Видонельня "Ведерников"')async def banya(message: Message):    await message.answer(f'💓Экскурсия по винодельне «Ведерниковъ» с дегустацией «Донские вина»\n'                         f'\n'                         f'Дегустационный сет:\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Губернаторское Розовое сухое розовое (Цимлянский черный)\n'                         f'3. Красностоп Золотовский красное сухое\n'                         f'4. Донское красное Голубок сух красное\n'                         f'5. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость: 1.200 рублей / персона\n'                         f'\n'                         f'💓Экскурсия по винодельне «Ведерниковъ» с дегустацией *«Автохтоны»*\n'                         f'\n'                         f'_Дегустационный сет:_\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Сибирьковый белое экстра брют\n'                         f'3. Губернаторское Розовое сухое\n'                         f'4. Губернаторское Голубок красное сухое\n'                         f'5. Красностоп Золотовский красное сухое\n'                         f'6. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость:_ 1.700 рублей / персона\n'                         f'\n'                         f'💓VIP экскурсия по винодельне «Ведерниковъ» с дегустацией *«Золотая коллекция»*\n'                         f'\n'                         f'Дегустационный сет:\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Сибирьковый белое экстра брют\n'                         f'3. Губернаторское Резерв белое сухое\n'                         f'4. Красностоп Золотовский красное сухое (выдержанное в дубе)\n'                         f'5. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'6. Каберне-Совиньон красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость:_ 2.500 рублей / персона.\n'                         f'\n'                         f'❗️❗️❗️\n'                         f'Если группа меньше 6 персон «Донские вина» за 1.200 - оплата 7.200; «Автохтоны» за 1.700 - оплата 8.500; «Золотая коллекция» за 2.500 - оплата 10.000 рублей',                         reply_markup= kb.back)#     прописать условия!!!@router.message(F.text == "Катание на катере")async def banya(message: Message):    await message.answer('здесь будет информация про катер)',                         reply_markup= kb.back)@router.message(F.text == "Вейкбординг")async def banya(message: Message):    await message.answer('здесь будет информация про доски )',                         reply_markup= kb.back)@router.message(F.text == 'Создать карточку гостя')async def cmd_start(message: Message, state: FSMContext):    await state.set_state(Reg.name) # Установка состояния Reg.name    await message.answer(f'Ну, что ж! \n'                         f'Начнём \n'                         f'Введит своё имя и фамилию:')@router.message(Reg.name)async def reg_name(message: Message, state: FSMContext):    await state.update_data(name=message.text)    await state.set_state(Reg.number)    await message.answer('Отправьте свой номер телефона')@router.message(Reg.number)async def reg_number(message: Message, state: FSMContext):    await state.update_data(number=message.text)    await state.set_state(Reg.photo)    await message.reply('Отправьте фото')@router.message(Reg.photo, F.photo)async def reg_photo(message: Message, state: FSMContext):    await state.update_data(photo=message.photo[-1].file_id)    data = await state.get_data()    await state.set_state(Reg.food)    await message.answer('Расскажи про свои предпочтения в еде, назови позиции которые больше всего тебе нравятся у нас')@router.message(Reg.food)async def reg_food(message: Message, state: FSMContext):    await state.update_data(food=message.text)    await state.set_state(Reg.alerg)    await message.answer('Нам обязательно нужно знать про твои аллергии, если они у тебя есть расскажи нам про них, в ином случае ставь "-"')@router.message(Reg.alerg)async def reg_alerg(message: Message, state: FSMContext):    await state.update_data(alerg=message.text)    data = await state.get_data()    await message.answer_photo(photo=data['photo'],                               caption=f"Информация о Вас: {data['name']},\n"                                       f"{data['number']},\n"                                       f"Вкусовые предпочтения: {data['food']},\n"                                       f"Аллергии: {data['alerg']}",                               reply_markup= kb.back)    # Сохраняем карточку гостя в таблице guest_cards    await sql_add_guest_card(state)    await state.clear()    await update_guest_tg_id(message.from_user.id)  # При необходимости обновляем tg_id# @router.message()# async def echo(message: Message):#     await message.answer('Это неизвестная команда.')# переместить позже в самый крайний файл
\ No newline at end of file
+from aiogram import F, Routerfrom aiogram.filters import CommandStart, CommandObject# from aiogram.enums import ChatActionfrom aiogram.fsm.context import FSMContextfrom aiogram.fsm.state import State, StatesGroupfrom aiogram.types import Message, CallbackQueryimport app.keyboards as kbfrom app.database.sqlite_db import add_user_start, sql_add_guest_card, update_guest_tg_idfrom app.media import send_mediarouter = Router()class Reg(StatesGroup):    name = State()    number = State()    photo = State()    food = State()    alerg = State()#https://t.me/THE_SSTAFF_BOT?start=ofstaff  ------- для офиков#https://t.me/THE_SSTAFF_BOT?start=postaff  ------- для посудомоек#https://t.me/THE_SSTAFF_BOT?start=admin    ------- для администраторов#https://t.me/THE_SSTAFF_BOT?start=povar    ------- для поваров@router.message(CommandStart(deep_link=True))async def cmd_start_of (message: Message, command: CommandObject):    param = command.args    if param == 'ofstaff':        await message.answer('привет, ты попал на страницу официатов', reply_markup=kb.ofik_inline)            #здесь надо создать кнопочкии "продолжить" к каждому старт, которые будут вести в другой файл    elif param == 'postaff':        await message.answer('привет, ты попал на страницу помошнников', reply_markup=kb.posyda_inline)    elif param == 'admin':        await message.answer('привет, ты попал на страницу администратора')    elif param == 'povar':        await message.answer('привет, ты попал на страницу повара', reply_markup=kb.povar_inline)# Обработчик команды /start без deep link@router.message(CommandStart())async def cmd_start(message: Message):    # Сохраняем данные пользователя в таблице users_start    await add_user_start(        tg_id=message.from_user.id,        username=message.from_user.username or "NoUsername"    )    await message.answer(        'Привет!\n'        'Меня зовут Жозефина, я являюсь твоим помощником\n'        'в мир спокойствия и умиротворения.\n'        '\n'        'Сейчас тебе нужно выбрать среди кнопок ниже подходящую услугу',        reply_markup=kb.key_inline    )@router.callback_query(F.data == "yslygi")async def handle_service_selection(callback_query: CallbackQuery):    # Удаляем сообщение с приветствием    await callback_query.message.delete()    await callback_query.message.answer("Вы попали в страницу услуг!",                                        reply_markup=await kb.yslygi())@router.message(F.text == 'Вернуться в меню услуг')async def yslygi (massege: Message):    await massege.answer('Вы попали в меню услуг, здесь вы можете познакомиться со всеми возможными услугами у нас в ГК',                         reply_markup=await kb.yslygi())@router.message(F.text == 'Баня')async def banya(message: Message):    await send_media(message.bot, message.chat.id, "BANA.JPG", "photo",                     reply_markup=kb.back)@router.message(F.text == 'Массаж')async def banya(message: Message):    await message.answer('здесь будет информация про массаж)',                         reply_markup= kb.back)@router.message(F.text == 'CAP-борды')async def banya(message: Message):    await message.answer('здесь будет информация про борды)',                         reply_markup= kb.back)@router.message(F.text == 'Музей "Тихий Дон"')async def banya(message: Message):    await message.answer('здесь будет информация про музей)',                         reply_markup= kb.back)@router.message(F.text == 'Видонельня "Ведерников"')async def banya(message: Message):    await message.answer(f'💓Экскурсия по винодельне «Ведерниковъ» с дегустацией «Донские вина»\n'                         f'\n'                         f'Дегустационный сет:\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Губернаторское Розовое сухое розовое (Цимлянский черный)\n'                         f'3. Красностоп Золотовский красное сухое\n'                         f'4. Донское красное Голубок сух красное\n'                         f'5. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость: 1.200 рублей / персона\n'                         f'\n'                         f'💓Экскурсия по винодельне «Ведерниковъ» с дегустацией *«Автохтоны»*\n'                         f'\n'                         f'_Дегустационный сет:_\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Сибирьковый белое экстра брют\n'                         f'3. Губернаторское Розовое сухое\n'                         f'4. Губернаторское Голубок красное сухое\n'                         f'5. Красностоп Золотовский красное сухое\n'                         f'6. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость:_ 1.700 рублей / персона\n'                         f'\n'                         f'💓VIP экскурсия по винодельне «Ведерниковъ» с дегустацией *«Золотая коллекция»*\n'                         f'\n'                         f'Дегустационный сет:\n'                         f'1. Сибирьковый белое сухое\n'                         f'2. Сибирьковый белое экстра брют\n'                         f'3. Губернаторское Резерв белое сухое\n'                         f'4. Красностоп Золотовский красное сухое (выдержанное в дубе)\n'                         f'5. Цимлянский черный красное сухое (выдержанное в дубе)\n'                         f'6. Каберне-Совиньон красное сухое (выдержанное в дубе)\n'                         f'\n'                         f'Стоимость:_ 2.500 рублей / персона.\n'                         f'\n'                         f'❗️❗️❗️\n'                         f'Если группа меньше 6 персон «Донские вина» за 1.200 - оплата 7.200; «Автохтоны» за 1.700 - оплата 8.500; «Золотая коллекция» за 2.500 - оплата 10.000 рублей',                         reply_markup= kb.back)#     прописать условия!!!@router.message(F.text == "Катание на катере")async def banya(message: Message):    await message.answer('здесь будет информация про катер)',                         reply_markup= kb.back)@router.message(F.text == "Вейкбординг")async def banya(message: Message):    await message.answer('здесь будет информация про доски )',                         reply_markup= kb.back)@router.message(F.text == 'Создать карточку гостя')async def cmd_start(message: Message, state: FSMContext):    await state.set_state(Reg.name) # Установка состояния Reg.name    await message.answer(f'Ну, что ж! \n'                         f'Начнём \n'                         f'Введит своё имя и фамилию:')@router.message(Reg.name)async def reg_name(message: Message, state: FSMContext):    await state.update_data(name=message.text)    await state.set_state(Reg.number)    await message.answer('Отправьте свой номер телефона')@router.message(Reg.number)async def reg_number(message: Message, state: FSMContext):    await state.update_data(number=message.text)    await state.set_state(Reg.photo)    await message.reply('Отправьте фото')@router.message(Reg.photo, F.photo)async def reg_photo(message: Message, state: FSMContext):    await state.update_data(photo=message.photo[-1].file_id)    data = await state.get_data()    await state.set_state(Reg.food)    await message.answer('Расскажи про свои предпочтения в еде, назови позиции которые больше всего тебе нравятся у нас')@router.message(Reg.food)async def reg_food(message: Message, state: FSMContext):    await state.update_data(food=message.text)    await state.set_state(Reg.alerg)    await message.answer('Нам обязательно нужно знать про твои аллергии, если они у тебя есть расскажи нам про них, в ином случае ставь "-"')@router.message(Reg.alerg)async def reg_alerg(message: Message, state: FSMContext):    await state.update_data(alerg=message.text)    data = await state.get_data()    await message.answer_photo(photo=data['photo'],                               caption=f"Информация о Вас: {data['name']},\n"                                       f"{data['number']},\n"                                       f"Вкусовые предпочтения: {data['food']},\n"                                       f"Аллергии: {data['alerg']}",                               reply_markup= kb.back)    # Сохраняем карточку гостя в таблице guest_cards    await sql_add_guest_card(state)    await state.clear()    await update_guest_tg_id(message.from_user.id)  # При необходимости обновляем tg_id# @router.message()# async def echo(message: Message):#     await message.answer('Это неизвестная команда.')# переместить позже в самый крайний файл
\ No newline at end of file
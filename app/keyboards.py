@@ -1 +1 @@
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, WebAppInfofrom aiogram.utils.keyboard import ReplyKeyboardBuilderkey = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='📱Контакты'), KeyboardButton(text='Меню ресторана')],    [KeyboardButton(text='Создать карточку гостя')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)open_youtube = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text='сайт', web_app=WebAppInfo(url='https://starodonye.com/rooms/'))]    ])key_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='WIFI', url="https://starodonye.com/rooms/")],    [InlineKeyboardButton(text='Услуги', callback_data='yslygi')]])back = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Вернуться в меню услуг')]],    resize_keyboard=True,    input_field_placeholder='Нажми кнопочку')async def yslygi():    all_data = ("Создать карточку гостя", "Баня", "Массаж", "CAP-борды", 'Музей "Тихий Дон"', 'Видонельня "Ведерников"', "Катание на катере",                "Вейкбординг",)    keyboard = ReplyKeyboardBuilder()    for data in all_data:        keyboard.add(KeyboardButton(text=data))    return keyboard.adjust(1, 3, 2, 2, 1).as_markup(resize_keyboard=True)# '''''''''''''''''МОДУЛЬ ОФИЦИАНТА''''''''''''''''''''''video_note_messages = {}ofik_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Начать покарять мир сервиса!', callback_data='ofik')]])per_block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Начнём-с')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)mini_app = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(        text='Открыть график',        web_app=WebAppInfo(url='https://38.180.158.77:443')  # URL, где крутится ваш Flask    )]])# ============================================================================# Inline-клавиатуры для навигации между уроками# ============================================================================lesson1_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="<<<ЖМЯК>>>", callback_data="lesson1_next")]])lesson2_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson2_next")]])lesson3_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson3_next")]])lesson4_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson4_next")]])lesson5_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson5_next")]])lesson6_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Пройти тест", callback_data="start_test")]])ofik_skip = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Пропустить', callback_data='skip1')]])# ============================================================================# Inline-клавиатуры для теста# ============================================================================new_test_q1_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Серьги-гвоздики или кольца диаметром до 3 см.", callback_data="new_q1_right")],    [InlineKeyboardButton(text="Висячие серьги с крупными камнями.", callback_data="new_q1_wrong")],    [InlineKeyboardButton(text="Массивные украшения с большим количеством страз.", callback_data="new_q1_wrong")]])new_test_q2_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Удобная, с закрытым носом, неброских цветов.", callback_data="new_q2_right")],    [InlineKeyboardButton(text="Открытые босоножки или сандалии.", callback_data="new_q2_wrong")],    [InlineKeyboardButton(text="Кроссовки с высокой платформой.", callback_data="new_q2_wrong")]])new_test_q3_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Волосы должны быть собраны.", callback_data="new_q3_right")],    [InlineKeyboardButton(text="Волосы могут быть распущены.", callback_data="new_q3_wrong")],    [InlineKeyboardButton(text="Допустима любая свободная укладка.", callback_data="new_q3_wrong")]])new_test_q4_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Пользоваться мобильными телефонами.", callback_data="new_q4_right")],    [InlineKeyboardButton(text="Улыбаться гостям.", callback_data="new_q4_wrong")],    [InlineKeyboardButton(text="Подавать меню.", callback_data="new_q4_wrong")]])new_test_q5_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Только на одной руке, легкий на пальцах, тяжелый на ладони.", callback_data="new_q5_right")],    [InlineKeyboardButton(text="Под двумя руками перед собой.", callback_data="new_q5_wrong")],    [InlineKeyboardButton(text="Под мышкой.", callback_data="new_q5_wrong")]])new_test_q6_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="В течение 3 минут.", callback_data="new_q6_right")],    [InlineKeyboardButton(text="В течение 10 минут.", callback_data="new_q6_wrong")],    [InlineKeyboardButton(text="В любое удобное для официанта время.", callback_data="new_q6_wrong")]])new_test_q7_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="После того, как убрана грязная посуда со стола.", callback_data="new_q7_right")],    [InlineKeyboardButton(text="Сразу при первом обращении гостя.", callback_data="new_q7_wrong")],    [InlineKeyboardButton(text="Только если гость сам попросит.", callback_data="new_q7_wrong")]])new_test_q8_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Выслушать гостя до конца.", callback_data="new_q8_right")],    [InlineKeyboardButton(text="Сразу объяснить, почему он неправ.", callback_data="new_q8_wrong")],    [InlineKeyboardButton(text="Прервать гостя, чтобы быстрее решить вопрос.", callback_data="new_q8_wrong")]])new_test_q9_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Конкуренция.", callback_data="new_q9_right")],    [InlineKeyboardButton(text="Забота.", callback_data="new_q9_wrong")],    [InlineKeyboardButton(text="Развитие.", callback_data="new_q9_wrong")]])# ============================================================================# Новые inline-клавиатуры для вопросов 10–18 (новый блок)# ============================================================================# Вопрос 10: Головные уборы для официантаnew_test_q10_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Фирменный головной убор.", callback_data="new_q10_right")],    [InlineKeyboardButton(text="Любой стильный головной убор.", callback_data="new_q10_wrong")],    [InlineKeyboardButton(text="Никакие головные уборы не допускаются.", callback_data="new_q10_wrong")]])# Вопрос 11: Стиль макияжа официанткиnew_test_q11_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Нейтральный и естественный.", callback_data="new_q11_right")],    [InlineKeyboardButton(text="Яркий и кричащий.", callback_data="new_q11_wrong")],    [InlineKeyboardButton(text="Отсутствие макияжа.", callback_data="new_q11_wrong")]])# Вопрос 12: Уход за униформой официантаnew_test_q12_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Всегда чистая и выглаженная униформа.", callback_data="new_q12_right")],    [InlineKeyboardButton(text="Периодическое стирание, даже если немного помята.", callback_data="new_q12_wrong")],    [InlineKeyboardButton(text="Без особого ухода, главное – комфорт.", callback_data="new_q12_wrong")]])# Вопрос 13: Проявление профессионализмаnew_test_q13_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Своевременное выполнение обязанностей и аккуратный внешний вид.", callback_data="new_q13_right")],    [InlineKeyboardButton(text="Личные разговоры с коллегами во время работы.", callback_data="new_q13_wrong")],    [InlineKeyboardButton(text="Чрезмерная самоуверенность.", callback_data="new_q13_wrong")]])# Вопрос 14: Действия для улучшения клиентского опытаnew_test_q14_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Внимательное отношение и готовность помочь.", callback_data="new_q14_right")],    [InlineKeyboardButton(text="Игнорирование просьб клиента.", callback_data="new_q14_wrong")],    [InlineKeyboardButton(text="Длительные перерывы в обслуживании.", callback_data="new_q14_wrong")]])# Вопрос 15: Обслуживание стола без нарушения этикетаnew_test_q15_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Следовать установленным стандартам сервировки.", callback_data="new_q15_right")],    [InlineKeyboardButton(text="Придумывать индивидуальный стиль для каждого гостя.", callback_data="new_q15_wrong")],    [InlineKeyboardButton(text="Обслуживать стол спонтанно.", callback_data="new_q15_wrong")]])# Вопрос 16: Роль коммуникации при заказе напитковnew_test_q16_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Помогает точно определить пожелания гостя.", callback_data="new_q16_right")],    [InlineKeyboardButton(text="Не играет роли – главное скорость.", callback_data="new_q16_wrong")],    [InlineKeyboardButton(text="Важна только для крупного заказа.", callback_data="new_q16_wrong")]])# Вопрос 17: Реакция на жалобы клиентаnew_test_q17_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Выслушать жалобу, извиниться и предложить решение.", callback_data="new_q17_right")],    [InlineKeyboardButton(text="Игнорировать жалобу.", callback_data="new_q17_wrong")],    [InlineKeyboardButton(text="Сразу передать жалобу менеджеру без попытки решения.", callback_data="new_q17_wrong")]])# Вопрос 18: Принципы работы в командеnew_test_q18_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Взаимное уважение и поддержка.", callback_data="new_q18_right")],    [InlineKeyboardButton(text="Конкуренция между коллегами.", callback_data="new_q18_wrong")],    [InlineKeyboardButton(text="Полное отсутствие коммуникации.", callback_data="new_q18_wrong")]])# '''''''''''''''''МОДУЛЬ ПОВАРА''''''''''''''''''''''''''povar_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='покарим куханную индустрию!', callback_data='povar_star')]])povar1block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='НУ приступим-с')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)# ''''''''''''''''МОДУЛЬ ПОСУДОМОЙКИ''''''''''''''''''''''posyda_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Начать обучение', callback_data='posyda_star')]])posyda1block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Погнали!')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)
\ No newline at end of file
+import calendarfrom functools import lru_cachefrom aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, WebAppInfofrom aiogram.utils.keyboard import ReplyKeyboardBuilderkey = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='📱Контакты'), KeyboardButton(text='Меню ресторана')],    [KeyboardButton(text='Создать карточку гостя')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)open_youtube = InlineKeyboardMarkup(inline_keyboard=[        [InlineKeyboardButton(text='сайт', web_app=WebAppInfo(url='https://starodonye.com/rooms/'))]    ])key_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='WIFI', url="https://starodonye.com/rooms/")],    [InlineKeyboardButton(text='Услуги', callback_data='yslygi')]])back = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Вернуться в меню услуг')]],    resize_keyboard=True,    input_field_placeholder='Нажми кнопочку')async def yslygi():    all_data = ("Создать карточку гостя", "Баня", "Массаж", "CAP-борды", 'Музей "Тихий Дон"', 'Видонельня "Ведерников"', "Катание на катере",                "Вейкбординг",)    keyboard = ReplyKeyboardBuilder()    for data in all_data:        keyboard.add(KeyboardButton(text=data))    return keyboard.adjust(1, 3, 2, 2, 1).as_markup(resize_keyboard=True)# '''''''''''''''''МОДУЛЬ ОФИЦИАНТА''''''''''''''''''''''ofik_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Начать покарять мир сервиса!', callback_data='ofik')]])per_block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Начнём-с')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)mini_app = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(        text='Открыть график',        web_app=WebAppInfo(url='https://38.180.158.77:443')  # URL, где крутится ваш Flask    )]])# ============================================================================# Inline-клавиатуры для навигации между уроками# ============================================================================lesson1_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="<<<ЖМЯК>>>", callback_data="lesson1_next")]])lesson2_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson2_next")]])lesson3_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson3_next")]])lesson4_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson4_next")]])lesson5_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Далее", callback_data="lesson5_next")]])lesson6_kb = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text="Пройти тест", callback_data="start_test")]])ofik_skip = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Пропустить', callback_data='skip1')]])# '''''''''''''''''МОДУЛЬ ПОВАРА''''''''''''''''''''''''''povar_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='покарим куханную индустрию!', callback_data='povar_star')]])povar1block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='НУ приступим-с')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)# ''''''''''''''''МОДУЛЬ ПОСУДОМОЙКИ''''''''''''''''''''''posyda_inline = InlineKeyboardMarkup(inline_keyboard=[    [InlineKeyboardButton(text='Начать обучение', callback_data='posyda_star')]])posyda1block = ReplyKeyboardMarkup(keyboard=[    [KeyboardButton(text='Погнали!')]],    resize_keyboard=True,    input_field_placeholder='Выбери какую-нибудь кнопочку:)',    one_time_keyboard=True)# КАЛЕНДАРЬ СМЕНCAL_WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")_CAL_BLANK = InlineKeyboardButton(text=" ", callback_data="IGNORE")@lru_cache(maxsize=64)def _calendar_skeleton(year: int, month: int):    """    Неизменяемая часть календаря месяца: шапка с навигацией, дни недели и сетка.    Клетка сетки — (дата, кнопка без отметки, кнопка с ✓); пустая клетка — (None, пробел, пробел).    Кнопки общие для всех клавиатур этого месяца, поэтому менять их нельзя.    """    header = (        (            InlineKeyboardButton(text="‹", callback_data=f"CAL_PREV|{year}|{month}"),            InlineKeyboardButton(text=f"{calendar.month_name[month]} {year}", callback_data="IGNORE"),            InlineKeyboardButton(text="›", callback_data=f"CAL_NEXT|{year}|{month}"),        ),        tuple(InlineKeyboardButton(text=d, callback_data="IGNORE") for d in CAL_WEEKDAYS),    )    weeks = []    for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month):        cells = []        for day in week:            if day == 0:                cells.append((None, _CAL_BLANK, _CAL_BLANK))            else:                ds = f"{year:04d}-{month:02d}-{day:02d}"                cells.append((                    ds,                    InlineKeyboardButton(text=str(day), callback_data=f"CAL_DAY|{ds}"),                    InlineKeyboardButton(text=f"{day}✓", callback_data=f"CAL_DAY|{ds}"),                ))        weeks.append(tuple(cells))    return header, tuple(weeks)def calendar_keyboard(year: int, month: int, marked, footer=()) -> InlineKeyboardMarkup:    """Календарь месяца из закэшированного каркаса: отмечает даты из marked и добавляет строки footer."""    header, weeks = _calendar_skeleton(year, month)    kb = [list(row) for row in header]    kb.extend([marked_btn if ds in marked else plain for ds, plain, marked_btn in week] for week in weeks)    kb.extend(list(row) for row in footer)    return InlineKeyboardMarkup(inline_keyboard=kb)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Отправка файлов из каталога imge/ с переиспользованием Telegram file_id.
+
+Файл загружается в Telegram один раз; полученный file_id хранится в таблице
+media_files по sha256 содержимого. Следующие отправки идут по file_id — без
+повторной загрузки. Если файл на диске поменялся, меняется хэш, и при первой
+отправке он загрузится заново.
+
+    await send_media(bot, chat_id, "startof.mp4", "video_note", reply_markup=kb.ofik_skip)
+
+Здесь же — потоковые скачивание и загрузка (download_chunks, StreamInputFile),
+чтобы гонять файлы Telegram через ffmpeg без промежуточных копий на диске.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import File, FSInputFile, InputFile, Message
+
+from app.database import sqlite_db
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = Path(os.getenv("MEDIA_DIR", Path(__file__).resolve().parent.parent / "imge"))
+
+# kind → метод Bot; имя аргумента с файлом совпадает с kind
+_SENDERS = {
+    "video_note": Bot.send_video_note,
+    "photo": Bot.send_photo,
+    "video": Bot.send_video,
+    "document": Bot.send_document,
+}
+
+# (путь, mtime_ns, size) → sha256: не перечитываем файл на каждой отправке
+_hashes: dict[tuple[str, int, int], str] = {}
+# (sha256, kind) → file_id
+_file_ids: dict[tuple[str, str], str] = {}
+_upload_locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+# Ответы Telegram, после которых file_id больше не годится; прочие BadRequest
+# (подпись, parse_mode, chat not found) повторная загрузка не исправит
+_STALE_FILE_ID = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "wrong file_id",
+    "file reference expired",
+    "file_reference_expired",
+    "can't use file of type",
+    "type of file mismatch",
+)
+
+
+def media_path(name: str) -> Path:
+    return MEDIA_DIR / name
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def content_hash(path: Path) -> str:
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    sha = _hashes.get(key)
+    if sha is None:
+        sha = await asyncio.to_thread(_sha256, path)
+        _hashes[key] = sha
+    return sha
+
+
+def _extract_file_id(message: Message, kind: str) -> str:
+    media = getattr(message, kind)
+    if kind == "photo":
+        media = media[-1]
+    return media.file_id
+
+
+async def _cached_file_id(key: tuple[str, str]) -> str | None:
+    file_id = _file_ids.get(key)
+    if file_id is None:
+        file_id = await sqlite_db.get_media_file_id(*key)
+        if file_id is not None:
+            _file_ids[key] = file_id
+    return file_id
+
+
+async def _forget(key: tuple[str, str]):
+    _file_ids.pop(key, None)
+    await sqlite_db.delete_media_file_id(*key)
+
+
+def _is_stale_file_id(error: TelegramBadRequest) -> bool:
+    message = error.message.lower()
+    return any(text in message for text in _STALE_FILE_ID)
+
+
+async def send_media(bot: Bot, chat_id: int, name: str, kind: str, **kwargs) -> Message:
+    """
+    Отправляет imge/<name> как kind (video_note, photo, video, document).
+    kwargs пробрасываются в метод Bot (reply_markup, caption, ...).
+    """
+    send = _SENDERS[kind]
+    path = media_path(name)
+    key = (await content_hash(path), kind)
+
+    file_id = await _cached_file_id(key)
+    if file_id is not None:
+        try:
+            return await send(bot, chat_id, **{kind: file_id}, **kwargs)
+        except TelegramBadRequest as e:
+            if not _is_stale_file_id(e):
+                raise
+            # file_id выдан другим токеном бота или протух — загрузим заново
+            logger.warning("file_id for %s rejected (%s), re-uploading", name, e)
+            await _forget(key)
+
+    # Параллельные первые отправки ждут одну загрузку, а не грузят файл каждая
+    lock = _upload_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        file_id = _file_ids.get(key)
+        if file_id is not None:
+            return await send(bot, chat_id, **{kind: file_id}, **kwargs)
+        message = await send(bot, chat_id, **{kind: FSInputFile(path)}, **kwargs)
+        file_id = _extract_file_id(message, kind)
+        _file_ids[key] = file_id
+        await sqlite_db.set_media_file_id(key[0], kind, name, file_id)
+        logger.info("Uploaded %s as %s, file_id cached", name, kind)
+        return message
+
+
+async def download_chunks(bot: Bot, file: str | File, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """Файл из Telegram (file_id или уже полученный get_file) кусками по мере скачивания, не сохраняя его целиком."""
+    if isinstance(file, str):
+        file = await bot.get_file(file)
+    url = bot.session.api.file_url(bot.token, file.file_path)
+    async for chunk in bot.session.stream_content(url=url, chunk_size=chunk_size):
+        yield chunk
+
+
+class StreamInputFile(InputFile):
+    """InputFile из асинхронного потока байтов (например, Transcoder.stream); читается один раз."""
+
+    def __init__(self, chunks: AsyncIterable[bytes], filename: str):
+        super().__init__(filename=filename)
+        self.chunks = chunks
+
+    async def read(self, bot: Bot) -> AsyncIterator[bytes]:
+        async for chunk in self.chunks:
+            yield chunk
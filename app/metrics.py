@@ -0,0 +1,261 @@
+"""
+Метрики горячего пути: время обработчиков по типу апдейта и обращения к sqlite_db.
+
+Включаются переменной METRICS=1; без неё middleware не подключается, а функции
+sqlite_db не оборачиваются — накладных расходов нет.
+
+  - bot_update_seconds{handler="CAL_DAY"} — время обработки апдейта; handler —
+    префикс callback_data до «|» или «:», команда или тип сообщения;
+  - bot_db_call_seconds{func="get_shifts_for_month"} — время функций sqlite_db;
+  - bot_db_calls_per_update / bot_db_seconds_per_update — сколько обращений
+    к базе и сколько времени в ней приходится на один апдейт;
+  - bot_cache_hits_total / bot_cache_misses_total / bot_cache_size{cache="identity"} —
+    кэши sqlite_db (watch_cache).
+
+Отдаются в текстовом формате Prometheus на http://METRICS_HOST:METRICS_PORT/metrics
+и/или сводкой в лог раз в METRICS_LOG_INTERVAL секунд.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS", "0") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 — без HTTP
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))  # 0 — без сводки в лог
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+# [секунды, число обращений] к sqlite_db в текущем апдейте
+_db_usage: contextvars.ContextVar[list | None] = contextvars.ContextVar("db_usage", default=None)
+# Вложенный вызов sqlite_db из sqlite_db не считаем в апдейт второй раз
+_db_depth: contextvars.ContextVar[int] = contextvars.ContextVar("db_depth", default=0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q (для сводки в лог)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self, name: str, labels: str = "") -> list[str]:
+        sep = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    def __init__(self):
+        self.updates: dict[str, Histogram] = {}
+        self.db_calls: dict[str, Histogram] = {}
+        self.db_calls_per_update = Histogram(COUNT_BUCKETS)
+        self.db_seconds_per_update = Histogram()
+        self.caches: dict[str, Any] = {}
+
+    def watch_cache(self, name: str, cache):
+        """Кэш с методом stats() (TTLCache): его попадания, промахи и размер попадут в /metrics."""
+        self.caches[name] = cache
+
+    def observe_update(self, handler: str, seconds: float, db_seconds: float, db_calls: int):
+        hist = self.updates.get(handler)
+        if hist is None:
+            hist = self.updates[handler] = Histogram()
+        hist.observe(seconds)
+        self.db_calls_per_update.observe(db_calls)
+        self.db_seconds_per_update.observe(db_seconds)
+
+    def observe_db(self, func: str, seconds: float):
+        hist = self.db_calls.get(func)
+        if hist is None:
+            hist = self.db_calls[func] = Histogram()
+        hist.observe(seconds)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines = ["# TYPE bot_update_seconds histogram"]
+        for handler, hist in sorted(self.updates.items()):
+            lines += hist.render("bot_update_seconds", f'handler="{_escape(handler)}"')
+        lines.append("# TYPE bot_db_call_seconds histogram")
+        for func, hist in sorted(self.db_calls.items()):
+            lines += hist.render("bot_db_call_seconds", f'func="{_escape(func)}"')
+        lines.append("# TYPE bot_db_calls_per_update histogram")
+        lines += self.db_calls_per_update.render("bot_db_calls_per_update")
+        lines.append("# TYPE bot_db_seconds_per_update histogram")
+        lines += self.db_seconds_per_update.render("bot_db_seconds_per_update")
+        stats = {name: cache.stats() for name, cache in sorted(self.caches.items())}
+        for metric, kind, field in (("bot_cache_hits_total", "counter", "hits"),
+                                    ("bot_cache_misses_total", "counter", "misses"),
+                                    ("bot_cache_size", "gauge", "size")):
+            lines.append(f"# TYPE {metric} {kind}")
+            lines += [f'{metric}{{cache="{_escape(name)}"}} {s[field]}' for name, s in stats.items()]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top: int = 10) -> str:
+        """Короткая сводка: самые медленные по p95 обработчики и функции базы."""
+        def rows(items):
+            ranked = sorted(items, key=lambda item: (item[1].quantile(0.95), item[1].sum), reverse=True)
+            return ", ".join(
+                f"{name} n={h.count} avg={h.sum / h.count * 1000:.1f}ms p95<={h.quantile(0.95) * 1000:g}ms"
+                for name, h in ranked[:top] if h.count
+            )
+
+        calls = self.db_calls_per_update
+        avg_calls = calls.sum / calls.count if calls.count else 0.0
+        caches = ", ".join(
+            f"{name} size={s['size']} hit_rate={s['hit_rate']:.0%}"
+            for name, s in ((name, cache.stats()) for name, cache in sorted(self.caches.items()))
+        )
+        return (f"updates: {rows(self.updates.items()) or '—'}\n"
+                f"db: {rows(self.db_calls.items()) or '—'}\n"
+                f"db calls per update: avg={avg_calls:.2f}\n"
+                f"caches: {caches or '—'}")
+
+
+registry = Registry()
+
+
+def update_label(update: Update) -> str:
+    """Метка апдейта с ограниченным числом значений: без дат, id и текста пользователя."""
+    if update.callback_query is not None:
+        data = update.callback_query.data or ""
+        return data.split("|", 1)[0].split(":", 1)[0] or "callback"
+    if update.message is not None:
+        text = update.message.text or ""
+        if text.startswith("/"):
+            return text.split(maxsplit=1)[0].split("@", 1)[0]
+        return update.message.content_type
+    return update.event_type
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Outer-middleware на dp.update: время апдейта и обращения к базе внутри него."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        usage = [0.0, 0]
+        token = _db_usage.set(usage)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            _db_usage.reset(token)
+            registry.observe_update(update_label(event), elapsed, usage[0], usage[1])
+
+
+def timed_db(name: str, func):
+    """Обёртка функции sqlite_db: время вызова в registry и в счётчик текущего апдейта."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        depth = _db_depth.get()
+        token = _db_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _db_depth.reset(token)
+            registry.observe_db(name, elapsed)
+            usage = _db_usage.get()
+            if usage is not None and depth == 0:
+                usage[0] += elapsed
+                usage[1] += 1
+
+    return wrapper
+
+
+def instrument_module(namespace: dict, exclude: tuple[str, ...] = ()):
+    """
+    Оборачивает публичные корутины модуля (вызывать в конце модуля: globals()).
+    Модули, импортирующие функции по имени, получат уже обёрнутые версии.
+    """
+    if not METRICS_ENABLED:
+        return
+    module = namespace["__name__"]
+    for name, obj in list(namespace.items()):
+        if (not name.startswith("_") and name not in exclude
+                and inspect.iscoroutinefunction(obj) and obj.__module__ == module):
+            namespace[name] = timed_db(name, obj)
+
+
+async def _log_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info("Metrics summary:\n%s", registry.summary())
+
+
+async def setup(dp: Dispatcher) -> Callable[[], Awaitable[None]]:
+    """Подключает middleware и запускает /metrics и сводку в лог; возвращает функцию остановки."""
+    if not METRICS_ENABLED:
+        async def noop():
+            return None
+        return noop
+
+    dp.update.outer_middleware(MetricsMiddleware())
+    runner = None
+    if METRICS_PORT:
+        app = web.Application()
+
+        async def metrics_handler(request: web.Request) -> web.Response:
+            return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+        app.router.add_get("/metrics", metrics_handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+        logger.info("Metrics on http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+    log_task = asyncio.create_task(_log_loop(METRICS_LOG_INTERVAL)) if METRICS_LOG_INTERVAL > 0 else None
+
+    async def stop():
+        if log_task is not None:
+            log_task.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        logger.info("Metrics summary:\n%s", registry.summary())
+
+    return stop
@@ -0,0 +1,301 @@
+"""
+Обработка апдейтов пулом воркеров — для long polling и для webhook.
+
+Апдейты разных чатов обрабатываются параллельно (до workers одновременно),
+апдейты одного чата — строго по очереди и в порядке поступления: у каждого
+чата своя очередь, и её в каждый момент разбирает не больше одного воркера.
+Медленный чат не задерживает остальные.
+
+При остановке (SIGINT/SIGTERM) приём новых апдейтов прекращается, а уже
+принятые дорабатываются (не дольше DRAIN_TIMEOUT секунд). getUpdates
+запрашивается со следующего непринятого update_id, поэтому один зависший
+апдейт не останавливает приём остальных — но Telegram тем самым считает
+принятые апдейты доставленными. Брошенные по таймауту drain апдейты
+сохраняются в PENDING_UPDATES_PATH и обрабатываются первыми при следующем
+запуске (в обоих режимах). Принятое и не доработанное к аварийному
+падению процесса теряется.
+
+    BOT_MODE=polling  — getUpdates, как раньше
+    BOT_MODE=webhook  — aiohttp-сервер на WEBHOOK_HOST:WEBHOOK_PORT,
+                        Telegram шлёт апдейты на WEBHOOK_URL + WEBHOOK_PATH
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+from collections import deque
+from contextlib import suppress
+from typing import Hashable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import Update
+from aiogram.types.update import UpdateTypeLookupError
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+UPDATE_QUEUE_LIMIT = int(os.getenv("UPDATE_QUEUE_LIMIT", "1000"))
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", "10"))
+PENDING_UPDATES_PATH = os.getenv("PENDING_UPDATES_PATH", "pending_updates.json")
+
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # публичный https-адрес, без пути
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+_BACKOFF = BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1)
+
+
+def chat_key(update: Update) -> Hashable:
+    """Ключ очереди: чат апдейта, иначе пользователь; апдейты без того и другого не упорядочиваются."""
+    try:
+        event = update.event
+    except UpdateTypeLookupError:
+        return ("update", update.update_id)
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return ("update", update.update_id)
+
+
+class UpdatePipeline:
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = UPDATE_WORKERS,
+                 max_pending: int = UPDATE_QUEUE_LIMIT, **workflow_data):
+        self.dp = dp
+        self.bot = bot
+        self.workers = max(1, workers)
+        self.workflow_data = workflow_data
+        self._slots = asyncio.Semaphore(max(1, max_pending))
+        self._chats: dict[Hashable, deque[Update]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Принятые и ещё не обработанные до конца (в том числе прерванные drain), по update_id
+        self._unfinished: dict[int, Update] = {}
+        self.next_id = 0  # следующий ещё не принятый update_id
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Принятые, но ещё не обработанные апдейты."""
+        return self._pending
+
+    def confirm_offset(self) -> int:
+        """Нижняя граница: все апдейты с меньшим update_id обработаны до конца."""
+        return min(self._unfinished, default=self.next_id)
+
+    def unfinished(self) -> list[Update]:
+        """Принятые и не доработанные апдейты в порядке update_id."""
+        return [self._unfinished[update_id] for update_id in sorted(self._unfinished)]
+
+    def save_unfinished(self, path: str = PENDING_UPDATES_PATH) -> int:
+        """Сохраняет брошенные апдейты для следующего запуска (load_pending); возвращает их число."""
+        updates = self.unfinished()
+        if updates:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([update.model_dump(mode="json", exclude_none=True) for update in updates], f)
+            logger.warning("%d unfinished updates saved to %s", len(updates), path)
+        return len(updates)
+
+    async def load_pending(self, path: str = PENDING_UPDATES_PATH) -> int:
+        """Ставит в очередь апдейты, сохранённые прошлым запуском, и удаляет файл."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return 0
+        for item in raw:
+            await self.submit(Update.model_validate(item, context={"bot": self.bot}))
+        os.remove(path)
+        logger.info("%d updates from the previous run resubmitted", len(raw))
+        return len(raw)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, update: Update):
+        """Ставит апдейт в очередь его чата; ждёт, если принято уже max_pending апдейтов."""
+        if self._closed:
+            raise RuntimeError("Pipeline is draining, update rejected")
+        await self._slots.acquire()
+        self._pending += 1
+        self._idle.clear()
+        self._unfinished[update.update_id] = update
+        self.next_id = max(self.next_id, update.update_id + 1)
+        key = chat_key(update)
+        queue = self._chats.get(key)
+        if queue is None:
+            # Чат не в работе — первый свободный воркер возьмёт его
+            self._chats[key] = deque([update])
+            self._ready.put_nowait(key)
+        else:
+            queue.append(update)
+
+    async def _process(self, update: Update):
+        try:
+            response = await self.dp.feed_update(self.bot, update, **self.workflow_data)
+            if isinstance(response, TelegramMethod):
+                await self.dp.silent_call_request(self.bot, response)
+        except Exception:
+            logger.exception("Update %s failed", update.update_id)
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._chats[key]
+            update = queue.popleft()
+            try:
+                await self._process(update)
+                # Прерванный отменой (drain по таймауту) остаётся неподтверждённым
+                del self._unfinished[update.update_id]
+            finally:
+                if queue:
+                    # Остальные апдейты чата — в конец очереди, чтобы не занимать воркер подряд
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+                self._pending -= 1
+                self._slots.release()
+                if not self._pending:
+                    self._idle.set()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """Перестаёт принимать апдейты, дорабатывает принятые и останавливает воркеров."""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            logger.warning("Drain timed out, %d updates dropped", self._pending)
+            drained = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return drained
+
+
+def _stop_event() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    return stop
+
+
+async def _poll(pipeline: UpdatePipeline, bot: Bot, get_updates: GetUpdates, stop: asyncio.Event):
+    backoff = Backoff(config=_BACKOFF)
+    while not stop.is_set():
+        if pipeline.next_id:
+            # Со следующего непринятого, а не с самого раннего недоработанного: зависший
+            # обработчик не должен держать getUpdates на одной и той же пачке
+            get_updates.offset = pipeline.next_id
+        try:
+            updates = await bot(get_updates, request_timeout=POLLING_TIMEOUT + 10)
+        except Exception as e:
+            logger.error("Failed to fetch updates - %s: %s", type(e).__name__, e)
+            await backoff.asleep()
+            continue
+        backoff.reset()
+        for update in updates:
+            if update.update_id >= pipeline.next_id:
+                await pipeline.submit(update)
+
+
+async def run_polling(dp: Dispatcher, bot: Bot, workers: int = UPDATE_WORKERS, stop: asyncio.Event | None = None):
+    """Long polling: getUpdates → пул воркеров; останавливается по SIGINT/SIGTERM или stop."""
+    stop = stop or _stop_event()
+    await bot.delete_webhook()
+    pipeline = UpdatePipeline(dp, bot, workers)
+    get_updates = GetUpdates(timeout=POLLING_TIMEOUT, allowed_updates=dp.resolve_used_update_types())
+    await dp.emit_startup(bot=bot, dispatcher=dp, **dp.workflow_data)
+    pipeline.start()
+    await pipeline.load_pending()
+    poller = asyncio.create_task(_poll(pipeline, bot, get_updates, stop))
+    logger.info("Polling with %d workers", pipeline.workers)
+    try:
+        await asyncio.wait([poller, asyncio.create_task(stop.wait())], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Прерванный getUpdates не подтверждён — эти апдейты придут снова после перезапуска
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+        await pipeline.drain()
+        pipeline.save_unfinished()
+        # Подтверждаем последнюю принятую пачку, иначе Telegram пришлёт её снова
+        if pipeline.next_id:
+            with suppress(Exception):
+                await bot(GetUpdates(offset=pipeline.next_id, timeout=0, limit=1))
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, **dp.workflow_data)
+        await bot.session.close()
+
+
+def webhook_app(pipeline: UpdatePipeline, bot: Bot, secret: str = WEBHOOK_SECRET) -> web.Application:
+    """aiohttp-приложение, которое принимает апдейты и отвечает сразу, не дожидаясь обработки."""
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret:
+            return web.Response(status=401)
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        try:
+            await pipeline.submit(update)
+        except RuntimeError:
+            # Идёт остановка: пусть Telegram повторит апдейт позже
+            return web.Response(status=503)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, workers: int = UPDATE_WORKERS, stop: asyncio.Event | None = None):
+    """Webhook: aiohttp-сервер → пул воркеров; останавливается по SIGINT/SIGTERM или stop."""
+    if not WEBHOOK_URL:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL")
+    stop = stop or _stop_event()
+    pipeline = UpdatePipeline(dp, bot, workers)
+    runner = web.AppRunner(webhook_app(pipeline, bot))
+    await runner.setup()
+    await dp.emit_startup(bot=bot, dispatcher=dp, **dp.workflow_data)
+    pipeline.start()
+    await pipeline.load_pending()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    await bot.set_webhook(
+        WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET or None,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=min(100, max(workers, 40)),
+    )
+    logger.info("Webhook on %s:%d%s with %d workers", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, pipeline.workers)
+    try:
+        await stop.wait()
+    finally:
+        # Вебхук не удаляем: пока бот перезапускается, Telegram копит апдейты у себя
+        await pipeline.drain()
+        pipeline.save_unfinished()
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, **dp.workflow_data)
+        await bot.session.close()
+
+
+async def run(dp: Dispatcher, bot: Bot, mode: str = BOT_MODE):
+    if mode == "webhook":
+        await run_webhook(dp, bot)
+    elif mode == "polling":
+        await run_polling(dp, bot)
+    else:
+        raise ValueError(f"Unknown BOT_MODE: {mode!r}")
@@ -0,0 +1,265 @@
+"""
+Загрузка графика смен из таблицы (xlsx или CSV): сотрудники по строкам, даты по столбцам.
+
+Шапка — первая строка, где есть даты (2025-03-01, 01.03.2025 или 01.03 — год
+берётся из параметра year); столбцы без даты (Ставка, З/П) пропускаются.
+В первом столбце — имя: «Имя Фамилия», «Фамилия Имя» или имя официанта из бота.
+Значение ячейки:
+  - число (или «8,5») — часы смены; пусто или 0 — смены нет, ничего не меняем;
+  - другой текст — задачи на смену.
+Строки без значений (заголовки групп, «Итого») пропускаются, так что
+принимается и файл из «Экспортировать таблицу».
+
+Книга читается в read-only режиме openpyxl построчно в отдельном потоке (не держит
+цикл событий бота), имена разрешаются по одной заранее загруженной карте, текущие смены за период — одним запросом. Сначала
+prepare() собирает план и предпросмотр изменений, затем apply() пишет всё
+одним executemany в одной транзакции:
+
+    plan = await prepare(path, year=2025)
+    if not plan.errors:
+        await apply(plan)
+"""
+
+import asyncio
+import csv
+import hashlib
+import re
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Iterator
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from app.database import sqlite_db
+
+MAX_HOURS = 24
+PREVIEW_LINES = 20
+_SKIP_ROWS = ("итого",)
+# Битый или не тот файл: не zip под видом .xlsx, не текст под видом .csv
+_UNREADABLE = (zipfile.BadZipFile, InvalidFileException, csv.Error, UnicodeDecodeError, KeyError)
+
+
+def _name_key(name: str) -> str:
+    return " ".join(name.replace("ё", "е").replace("Ё", "Е").split()).casefold()
+
+
+def _parse_date(value, year: int) -> str | None:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    if re.fullmatch(r"\d{1,2}\.\d{1,2}", text):
+        try:
+            return datetime.strptime(f"{text}.{year}", "%d.%m.%Y").date().isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def _parse_hours(value) -> float | None:
+    """Часы из ячейки; None — это не число (значит, задачи)."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return None
+
+
+class _Semicolon(csv.excel):
+    delimiter = ";"
+
+
+def read_rows(path: str) -> Iterator[tuple]:
+    """Строки таблицы кортежами значений; xlsx — первый лист в read-only режиме."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+            except csv.Error:
+                # Один столбец или пустой файл: разделитель не угадать — как в нашей выгрузке
+                dialect = _Semicolon
+            for row in csv.reader(f, dialect):
+                yield tuple(cell if cell.strip() else None for cell in row)
+        return
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+@dataclass
+class Person:
+    name: str
+    waiter_id: int | None
+    employee_id: int | None
+
+
+class NameMap:
+    """Имя из таблицы → официант/сотрудник; строится из одного запроса к базе."""
+
+    def __init__(self, people: list[tuple]):
+        self._people: dict[str, Person] = {}
+        self._ambiguous: set[str] = set()
+        for waiter_id, employee_id, first_name, last_name, waiter_name in people:
+            full = f"{first_name or ''} {last_name or ''}".strip()
+            person = Person(full or waiter_name or "", waiter_id, employee_id)
+            keys = {_name_key(full), _name_key(f"{last_name or ''} {first_name or ''}"), _name_key(waiter_name or "")}
+            for key in keys - {""}:
+                known = self._people.get(key)
+                if known is not None and (known.waiter_id, known.employee_id) != (waiter_id, employee_id):
+                    self._ambiguous.add(key)
+                self._people.setdefault(key, person)
+
+    def resolve(self, name: str) -> Person:
+        """Person или ValueError с понятной причиной."""
+        key = _name_key(name)
+        if key in self._ambiguous:
+            raise ValueError(f"«{name}» — несколько сотрудников с таким именем")
+        person = self._people.get(key)
+        if person is None:
+            raise ValueError(f"«{name}» не найден среди официантов и сотрудников")
+        return person
+
+
+@dataclass
+class SchedulePlan:
+    shift_hours: list[tuple[int, str, float]] = field(default_factory=list)
+    shift_tasks: list[tuple[int, str, str]] = field(default_factory=list)
+    work_hours: list[tuple[int, str, float]] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    changes: list[str] = field(default_factory=list)
+    counts: Counter = field(default_factory=Counter)
+    first: str | None = None
+    last: str | None = None
+
+    def digest(self) -> str:
+        """Отпечаток изменений относительно базы: совпал — предпросмотр всё ещё верен."""
+        text = "\n".join([*self.errors, *self.changes, *(f"{k}={v}" for k, v in sorted(self.counts.items()))])
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    @property
+    def rows(self) -> int:
+        return len(self.shift_hours) + len(self.shift_tasks) + len(self.work_hours)
+
+    def preview(self, limit: int = PREVIEW_LINES) -> str:
+        if self.errors:
+            text = f"❗️ Ошибок: {len(self.errors)} — график не загружен.\n" + "\n".join(self.errors[:limit])
+            return text + (f"\n… и ещё {len(self.errors) - limit}" if len(self.errors) > limit else "")
+        if not self.rows:
+            return "В таблице нет ни одной смены."
+        text = (f"Период {self.first} — {self.last}: новых {self.counts['new']}, "
+                f"изменённых {self.counts['changed']}, без изменений {self.counts['same']}.")
+        if self.changes:
+            text += "\n\n" + "\n".join(self.changes[:limit])
+            if len(self.changes) > limit:
+                text += f"\n… и ещё {len(self.changes) - limit}"
+        return text
+
+
+def _parse_grid(rows: Iterator[tuple], year: int, names: NameMap, plan: SchedulePlan) -> list[tuple]:
+    """Ячейки таблицы → [(person, name, date, hours, tasks)], ошибки — в plan.errors."""
+    columns: dict[int, str] | None = None
+    cells, seen = [], set()
+    for number, row in enumerate(rows, start=1):
+        if columns is None:
+            found = {i: d for i, value in enumerate(row) if i and (d := _parse_date(value, year))}
+            if found:
+                columns = found
+            continue
+        if not row or row[0] is None:
+            continue
+        name = str(row[0]).strip()
+        values = [(columns[i], row[i]) for i in columns if i < len(row) and row[i] not in (None, "")]
+        if not name or not values or name.casefold().startswith(_SKIP_ROWS):
+            continue
+        try:
+            person = names.resolve(name)
+        except ValueError as e:
+            plan.errors.append(f"строка {number}: {e}")
+            continue
+        for day, value in values:
+            hours = _parse_hours(value)
+            tasks = None
+            if hours is None:
+                tasks = str(value).strip()
+            elif hours == 0:
+                continue
+            elif not 0 < hours <= MAX_HOURS:
+                plan.errors.append(f"строка {number}, {day}: {value} — часов должно быть от 0 до {MAX_HOURS}")
+                continue
+            if tasks is not None and person.waiter_id is None:
+                plan.errors.append(f"строка {number}, {day}: задачи можно назначить только официанту ({name})")
+                continue
+            key = (person.waiter_id, person.employee_id, day)
+            if key in seen:
+                plan.errors.append(f"строка {number}, {day}: {name} уже встречается выше")
+                continue
+            seen.add(key)
+            cells.append((person, day, hours, tasks))
+    if columns is None:
+        plan.errors.append("Не найдена строка с датами в шапке таблицы.")
+    return cells
+
+
+async def prepare(path: str, year: int | None = None) -> SchedulePlan:
+    """Читает и проверяет таблицу, сравнивает с текущим графиком; в базу не пишет."""
+    plan = SchedulePlan()
+    names = NameMap(await sqlite_db.get_people_for_import())
+    try:
+        cells = await asyncio.to_thread(_parse_grid, read_rows(path), year or date.today().year, names, plan)
+    except _UNREADABLE as e:
+        plan.errors.append(f"Не удалось прочитать файл: {str(e) or type(e).__name__}")
+        return plan
+    if plan.errors or not cells:
+        return plan
+
+    plan.first = min(c[1] for c in cells)
+    plan.last = max(c[1] for c in cells)
+    shifts, work_hours = await sqlite_db.get_schedule_snapshot(plan.first, plan.last)
+    for person, day, hours, tasks in cells:
+        if person.waiter_id is not None:
+            old_hours, old_tasks = shifts.get((person.waiter_id, day), (None, None))
+            exists = (person.waiter_id, day) in shifts
+            if tasks is None:
+                plan.shift_hours.append((person.waiter_id, day, hours))
+                old, new = old_hours, hours
+            else:
+                plan.shift_tasks.append((person.waiter_id, day, tasks))
+                old, new = old_tasks, tasks
+        else:
+            exists = (person.employee_id, day) in work_hours
+            old, new = work_hours.get((person.employee_id, day)), hours
+            plan.work_hours.append((person.employee_id, day, hours))
+        if not exists:
+            plan.counts["new"] += 1
+            plan.changes.append(f"+ {person.name} {day}: {new}")
+        elif old != new:
+            plan.counts["changed"] += 1
+            plan.changes.append(f"~ {person.name} {day}: {old or '—'} → {new}")
+        else:
+            plan.counts["same"] += 1
+    return plan
+
+
+async def apply(plan: SchedulePlan) -> int:
+    """Пишет план одной транзакцией; возвращает число строк."""
+    if plan.errors:
+        raise ValueError("plan has validation errors")
+    return await sqlite_db.bulk_upsert_schedule(plan.shift_hours, plan.shift_tasks, plan.work_hours)
@@ -1,12 +1,15 @@
+from dataclasses import replace
+
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import StatesGroup, State
-from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery
 from aiogram.types import Message
 
 import app.keyboards as kb
 from app.database import sqlite_db
+from app.media import send_media
+from app.training.quiz import start_quiz
 
 waiter = Router()
 
@@ -143,52 +146,34 @@ LESSON6_TEXT = (
     "• Ни в коем случае не допускается касаться верхней части бокалов из гигиенических соображений, тем более, если они уже находились в употреблении.\n"
 )
 
-# ============================================================================
-# Состояния для теста (18 вопросов)
-# ============================================================================
-class TestStates(StatesGroup):
-    q1 = State()
-    q2 = State()
-    q3 = State()
-    q4 = State()
-    q5 = State()
-    q6 = State()
-    q7 = State()
-    q8 = State()
-    q9 = State()
-    q10 = State()
-    q11 = State()
-    q12 = State()
-    q13 = State()
-    q14 = State()
-    q15 = State()
-    q16 = State()
-    q17 = State()
-    q18 = State()
-
 # ============================================================================
 # Обработчики уроков и переходов между уроками (оставляем без изменений)
 # ============================================================================
+def _video_note_state(state: FSMContext) -> FSMContext:
+    """Отдельная запись FSM для id приветственной видео-заметки: state.clear() в уроках её не стирает."""
+    return FSMContext(state.storage, replace(state.key, destiny="video_note"))
+
+
 @waiter.callback_query(F.data == "ofik")
-async def per_block(callback_query: CallbackQuery):
+async def per_block(callback_query: CallbackQuery, state: FSMContext):
     chat_id = callback_query.message.chat.id
     user_id = callback_query.from_user.id
-    sqlite_db.add_waiter(user_id)
-    if user_id in kb.video_note_messages:
+    await sqlite_db.add_waiter(user_id)
+    note_state = _video_note_state(state)
+    message_id = await note_state.get_value("message_id")
+    if message_id is not None:
         try:
-            await callback_query.bot.delete_message(chat_id=chat_id, message_id=kb.video_note_messages[user_id])
+            await callback_query.bot.delete_message(chat_id=chat_id, message_id=message_id)
         except Exception as e:
             print(f"Ошибка при удалении видео-заметки: {e}")
         finally:
-            kb.video_note_messages.pop(user_id, None)
+            await note_state.clear()
     await callback_query.answer()
-    video_note = FSInputFile('/root/bot/imge/startof.mp4')
-    sent_message = await callback_query.bot.send_video_note(
-        chat_id=chat_id,
-        video_note=video_note,
+    sent_message = await send_media(
+        callback_query.bot, chat_id, "startof.mp4", "video_note",
         reply_markup=kb.ofik_skip
     )
-    kb.video_note_messages[user_id] = sent_message.message_id
+    await note_state.set_data({"message_id": sent_message.message_id})
 
 @waiter.callback_query(F.data == "skip1")
 async def start_training(callback_query: CallbackQuery, state: FSMContext):
@@ -227,276 +212,8 @@ async def lesson5_next(callback_query: CallbackQuery, state: FSMContext):
 @waiter.callback_query(F.data == "start_test")
 async def start_new_test(callback_query: CallbackQuery, state: FSMContext):
     await callback_query.message.delete()
-    # Инициализируем счет теста как целое число
-    await state.update_data(score=0)
-    question1 = "<b>Вопрос 1:</b> Какие украшения допускаются для официанта-девушки?"
-    await callback_query.message.answer(question1, parse_mode="HTML", reply_markup=kb.new_test_q1_kb)
-    await state.set_state(TestStates.q1)
-
-@waiter.callback_query(F.data.in_(["new_q1_right", "new_q1_wrong"]))
-async def answer_new_q1(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q1_right":
-        feedback = "Правильно! Допускаются серьги-гвоздики или кольца диаметром до 3 см."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: серьги-гвоздики или кольца диаметром до 3 см."
-    await state.update_data(score=score)
-    question2 = "<b>Вопрос 2:</b> Какой должна быть обувь официанта?"
-    await callback_query.message.answer(question2, parse_mode="HTML", reply_markup=kb.new_test_q2_kb)
-    await state.set_state(TestStates.q2)
-
-@waiter.callback_query(F.data.in_(["new_q2_right", "new_q2_wrong"]))
-async def answer_new_q2(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q2_right":
-        feedback = "Верно! Официант должен носить удобную обувь с закрытым носом, неброских цветов."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: удобная, с закрытым носом, неброских цветов."
-    await state.update_data(score=score)
-    question3 = "<b>Вопрос 3:</b> Как должны быть уложены волосы у официанта-мужчины, если они длинные?"
-    await callback_query.message.answer(question3, parse_mode="HTML", reply_markup=kb.new_test_q3_kb)
-    await state.set_state(TestStates.q3)
-
-@waiter.callback_query(F.data.in_(["new_q3_right", "new_q3_wrong"]))
-async def answer_new_q3(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q3_right":
-        feedback = "Правильно! Волосы должны быть собраны."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: волосы должны быть собраны."
-    await state.update_data(score=score)
-    question4 = "<b>Вопрос 4:</b> Что категорически запрещено официантам делать в зале?"
-    await callback_query.message.answer(question4, parse_mode="HTML", reply_markup=kb.new_test_q4_kb)
-    await state.set_state(TestStates.q4)
-
-@waiter.callback_query(F.data.in_(["new_q4_right", "new_q4_wrong"]))
-async def answer_new_q4(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q4_right":
-        feedback = "Верно! Официантам запрещено пользоваться мобильными телефонами."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: пользоваться мобильными телефонами."
-    await state.update_data(score=score)
-    question5 = "<b>Вопрос 5:</b> Как нужно носить поднос с напитками и блюдами?"
-    await callback_query.message.answer(question5, parse_mode="HTML", reply_markup=kb.new_test_q5_kb)
-    await state.set_state(TestStates.q5)
-
-@waiter.callback_query(F.data.in_(["new_q5_right", "new_q5_wrong"]))
-async def answer_new_q5(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q5_right":
-        feedback = "Верно! Поднос носят только на одной руке, легкий на пальцах, тяжелый на ладони."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: только на одной руке, легкий на пальцах, тяжелый на ладони."
-    await state.update_data(score=score)
-    question6 = "<b>Вопрос 6:</b> В течение какого времени официант должен подойти к гостю после посадки?"
-    await callback_query.message.answer(question6, parse_mode="HTML", reply_markup=kb.new_test_q6_kb)
-    await state.set_state(TestStates.q6)
-
-@waiter.callback_query(F.data.in_(["new_q6_right", "new_q6_wrong"]))
-async def answer_new_q6(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q6_right":
-        feedback = "Верно! Официант должен подойти к гостю в течение 3 минут."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: в течение 3 минут."
-    await state.update_data(score=score)
-    question7 = "<b>Вопрос 7:</b> Когда необходимо предложить гостям десерты и горячие напитки?"
-    await callback_query.message.answer(question7, parse_mode="HTML", reply_markup=kb.new_test_q7_kb)
-    await state.set_state(TestStates.q7)
-
-@waiter.callback_query(F.data.in_(["new_q7_right", "new_q7_wrong"]))
-async def answer_new_q7(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q7_right":
-        feedback = "Верно! Предложение должно происходить после того, как убрана грязная посуда со стола."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: после того, как убрана грязная посуда со стола."
-    await state.update_data(score=score)
-    question8 = "<b>Вопрос 8:</b> Какой первый шаг в работе с возражениями гостей?"
-    await callback_query.message.answer(question8, parse_mode="HTML", reply_markup=kb.new_test_q8_kb)
-    await state.set_state(TestStates.q8)
-
-@waiter.callback_query(F.data.in_(["new_q8_right", "new_q8_wrong"]))
-async def answer_new_q8(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q8_right":
-        feedback = "Верно! Первым шагом является выслушать гостя до конца."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: выслушать гостя до конца."
-    await state.update_data(score=score)
-    question9 = "<b>Вопрос 9:</b> Какая из перечисленных ценностей НЕ относится к ресторану Стародонье?"
-    await callback_query.message.answer(question9, parse_mode="HTML", reply_markup=kb.new_test_q9_kb)
-    await state.set_state(TestStates.q9)
-
-@waiter.callback_query(F.data.in_(["new_q9_right", "new_q9_wrong"]))
-async def answer_new_q9(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q9_right":
-        feedback = "Отлично! Конкуренция – это ценность, которая не соответствует ценностям ресторана Стародонье."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: конкуренция."
-    await state.update_data(score=score)
-    question10 = "<b>Вопрос 10:</b> Какие головные уборы допускаются для официанта?"
-    await callback_query.message.answer(question10, parse_mode="HTML", reply_markup=kb.new_test_q10_kb)
-    await state.set_state(TestStates.q10)
-
-@waiter.callback_query(F.data.in_(["new_q10_right", "new_q10_wrong"]))
-async def answer_new_q10(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q10_right":
-        feedback = "Верно! Фирменный головной убор допускается."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: фирменный головной убор."
-    await state.update_data(score=score)
-    question11 = "<b>Вопрос 11:</b> Какой должен быть стиль макияжа официантки?"
-    await callback_query.message.answer(question11, parse_mode="HTML", reply_markup=kb.new_test_q11_kb)
-    await state.set_state(TestStates.q11)
-
-@waiter.callback_query(F.data.in_(["new_q11_right", "new_q11_wrong"]))
-async def answer_new_q11(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q11_right":
-        feedback = "Верно! Нейтральный и естественный макияж предпочтителен."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: нейтральный и естественный макияж."
-    await state.update_data(score=score)
-    question12 = "<b>Вопрос 12:</b> Как правильно ухаживать за униформой официанта?"
-    await callback_query.message.answer(question12, parse_mode="HTML", reply_markup=kb.new_test_q12_kb)
-    await state.set_state(TestStates.q12)
-
-@waiter.callback_query(F.data.in_(["new_q12_right", "new_q12_wrong"]))
-async def answer_new_q12(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q12_right":
-        feedback = "Верно! Униформа должна быть всегда чистой и выглаженной."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: всегда чистая и выглаженная униформа."
-    await state.update_data(score=score)
-    question13 = "<b>Вопрос 13:</b> Что является проявлением профессионализма на рабочем месте?"
-    await callback_query.message.answer(question13, parse_mode="HTML", reply_markup=kb.new_test_q13_kb)
-    await state.set_state(TestStates.q13)
-
-@waiter.callback_query(F.data.in_(["new_q13_right", "new_q13_wrong"]))
-async def answer_new_q13(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q13_right":
-        feedback = "Верно! Своевременное выполнение обязанностей и аккуратный внешний вид – проявление профессионализма."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: своевременное выполнение обязанностей и аккуратный внешний вид."
-    await state.update_data(score=score)
-    question14 = "<b>Вопрос 14:</b> Какие действия способствуют улучшению клиентского опыта?"
-    await callback_query.message.answer(question14, parse_mode="HTML", reply_markup=kb.new_test_q14_kb)
-    await state.set_state(TestStates.q14)
-
-@waiter.callback_query(F.data.in_(["new_q14_right", "new_q14_wrong"]))
-async def answer_new_q14(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q14_right":
-        feedback = "Верно! Внимательное отношение и готовность помочь значительно улучшают клиентский опыт."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: внимательное отношение и готовность помочь."
-    await state.update_data(score=score)
-    question15 = "<b>Вопрос 15:</b> Как правильно обслуживать стол без нарушения этикета?"
-    await callback_query.message.answer(question15, parse_mode="HTML", reply_markup=kb.new_test_q15_kb)
-    await state.set_state(TestStates.q15)
-
-@waiter.callback_query(F.data.in_(["new_q15_right", "new_q15_wrong"]))
-async def answer_new_q15(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q15_right":
-        feedback = "Верно! Следование стандартам сервировки – залог правильного обслуживания."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: следовать установленным стандартам сервировки."
-    await state.update_data(score=score)
-    question16 = "<b>Вопрос 16:</b> Какую роль играет коммуникация с гостями при заказе напитков?"
-    await callback_query.message.answer(question16, parse_mode="HTML", reply_markup=kb.new_test_q16_kb)
-    await state.set_state(TestStates.q16)
-
-@waiter.callback_query(F.data.in_(["new_q16_right", "new_q16_wrong"]))
-async def answer_new_q16(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q16_right":
-        feedback = "Верно! Точная коммуникация помогает удовлетворить пожелания гостя."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: коммуникация позволяет точно определить пожелания гостя."
-    await state.update_data(score=score)
-    question17 = "<b>Вопрос 17:</b> Как официант должен реагировать на жалобы клиента?"
-    await callback_query.message.answer(question17, parse_mode="HTML", reply_markup=kb.new_test_q17_kb)
-    await state.set_state(TestStates.q17)
-
-@waiter.callback_query(F.data.in_(["new_q17_right", "new_q17_wrong"]))
-async def answer_new_q17(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q17_right":
-        feedback = "Верно! Выслушать жалобу, извиниться и предложить решение – оптимальная реакция."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: выслушать жалобу, извиниться и предложить решение."
-    await state.update_data(score=score)
-    question18 = "<b>Вопрос 18:</b> Какие принципы работы в команде наиболее важны для ресторана Стародонье?"
-    await callback_query.message.answer(question18, parse_mode="HTML", reply_markup=kb.new_test_q18_kb)
-    await state.set_state(TestStates.q18)
-
-@waiter.callback_query(F.data.in_(["new_q18_right", "new_q18_wrong"]))
-async def answer_new_q18(callback_query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    score = int(data.get("score", 0))
-    if callback_query.data == "new_q18_right":
-        feedback = "Отлично! Взаимное уважение и поддержка – ключевые принципы."
-        score += 1
-    else:
-        feedback = "Неверно. Правильный ответ: взаимное уважение и поддержка."
-    await state.update_data(score=score)
-    # Получаем финальный счет
-    data = await state.get_data()
-    final_score = int(data.get("score", 0))
-    final_text = (
-        f"{feedback}\n\n"
-        "Поздравляем, вы прошли тест!\n"
-        "Спасибо за прохождение теста! Будем рады видеть вас в нашем Telegram‑форуме.\n\n"
-        f"Ваш результат: {final_score} из 18."
-    )
-    tg_id = callback_query.from_user.id
-    sqlite_db.add_test_result(tg_id, final_score, 18)
-    forum_keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="Перейти в форум", url="https://t.me/+d6m5PBG2e6M3ZmFi")]
-    ])
-    await callback_query.message.answer(final_text, parse_mode="HTML", reply_markup=forum_keyboard)
-    await state.clear()
+    # Вопросы, ответы и пояснения — в app/training/quizzes/waiter.json
+    await start_quiz(callback_query, state, "waiter")
 
 
 @waiter.message(Command("mini_app"))
@@ -1,19 +1,19 @@
 import asyncio
 
 from aiogram import F, Router
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 
 
 import app.keyboards as kb
+from app.media import send_media
 
 posyda = Router()
 
 @posyda.callback_query(F.data == 'povar_star')
 async def posyda_star (callback_query: CallbackQuery):
     await callback_query.message.delete()
-    note = FSInputFile('/Users/kostakovacev/PycharmProjects/STARODONIE/imge/startof.mp4')
-    await callback_query.message.answer_video_note(note,
-                                                   reply_markup=kb.posyda1block)
+    await send_media(callback_query.bot, callback_query.message.chat.id, "startof.mp4", "video_note",
+                     reply_markup=kb.posyda1block)
 
 
 @posyda.message(F.text == 'Погнали!')
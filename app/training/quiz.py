@@ -0,0 +1,125 @@
+"""
+Тесты по обучению, описанные данными: вопросы, варианты ответа и пояснения
+лежат в app/training/quizzes/<id>.json, новый тест — это новый файл, без кода.
+
+Все ответы приходят в один обработчик с callback_data вида quiz:<id>:<вопрос>:<ответ>,
+ответ находится индексами за O(1). Счёт и номер текущего вопроса хранятся в FSM
+и меняются под замком пользователя, так что двойное нажатие или кнопка старого
+вопроса не засчитываются дважды.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from weakref import WeakValueDictionary
+
+from aiogram import F, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.database import sqlite_db
+
+QUIZ_DIR = Path(__file__).with_name("quizzes")
+
+quiz = Router()
+
+
+class QuizStates(StatesGroup):
+    in_progress = State()
+
+
+@dataclass(frozen=True)
+class Question:
+    text: str
+    correct: int  # индекс правильного ответа
+    right: str    # пояснение после правильного ответа
+    wrong: str
+    keyboard: InlineKeyboardMarkup
+
+
+@dataclass(frozen=True)
+class Quiz:
+    id: str
+    questions: tuple[Question, ...]
+    final_text: str  # str.format с {score} и {total}
+    final_keyboard: InlineKeyboardMarkup | None
+
+
+def _load(path: Path) -> Quiz:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    quiz_id = data["id"]
+    questions = []
+    for q, item in enumerate(data["questions"]):
+        correct = [a for a, answer in enumerate(item["answers"]) if answer.get("correct")]
+        if len(correct) != 1:
+            raise ValueError(f"{path.name}: question {q + 1} must have exactly one correct answer")
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=answer["text"], callback_data=f"quiz:{quiz_id}:{q}:{a}")]
+            for a, answer in enumerate(item["answers"])
+        ])
+        questions.append(Question(item["text"], correct[0], item["right"], item["wrong"], keyboard))
+    button = data.get("final_button")
+    final_keyboard = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(**button)]]) if button else None
+    return Quiz(quiz_id, tuple(questions), data["final_text"], final_keyboard)
+
+
+QUIZZES: dict[str, Quiz] = {q.id: q for q in map(_load, sorted(QUIZ_DIR.glob("*.json")))}
+
+# Замок на пользователя: чтение и запись счёта — одна операция
+_locks: "WeakValueDictionary[tuple[int, int], asyncio.Lock]" = WeakValueDictionary()
+
+
+def _lock_for(callback_query: CallbackQuery) -> asyncio.Lock:
+    key = (callback_query.message.chat.id, callback_query.from_user.id)
+    lock = _locks.get(key)
+    if lock is None:
+        lock = _locks[key] = asyncio.Lock()
+    return lock
+
+
+async def start_quiz(callback_query: CallbackQuery, state: FSMContext, quiz_id: str):
+    """Начинает тест quiz_id с первого вопроса."""
+    first = QUIZZES[quiz_id].questions[0]
+    async with _lock_for(callback_query):
+        await state.set_state(QuizStates.in_progress)
+        await state.set_data({"quiz": quiz_id, "question": 0, "score": 0})
+    await callback_query.message.answer(first.text, parse_mode="HTML", reply_markup=first.keyboard)
+
+
+@quiz.callback_query(F.data.startswith("quiz:"))
+async def quiz_answer(callback_query: CallbackQuery, state: FSMContext):
+    _, quiz_id, q, a = callback_query.data.split(":")
+    q, a = int(q), int(a)
+    current = QUIZZES.get(quiz_id)
+    if current is None or q >= len(current.questions):
+        await callback_query.answer("Этот тест больше недоступен")
+        return
+    question = current.questions[q]
+
+    async with _lock_for(callback_query):
+        data = await state.get_data()
+        if data.get("quiz") != quiz_id or data.get("question") != q:
+            # повторное нажатие или кнопка из прошлого прохождения
+            await callback_query.answer("Этот вопрос уже пройден")
+            return
+        score = data["score"] + (a == question.correct)
+        await state.update_data(question=q + 1, score=score)
+
+    await callback_query.answer()
+    feedback = question.right if a == question.correct else question.wrong
+    if q + 1 < len(current.questions):
+        following = current.questions[q + 1]
+        await callback_query.message.answer(
+            f"{feedback}\n\n{following.text}", parse_mode="HTML", reply_markup=following.keyboard
+        )
+        return
+
+    total = len(current.questions)
+    await sqlite_db.add_test_result(callback_query.from_user.id, score, total)
+    await state.clear()
+    await callback_query.message.answer(
+        f"{feedback}\n\n{current.final_text.format(score=score, total=total)}",
+        parse_mode="HTML", reply_markup=current.final_keyboard,
+    )
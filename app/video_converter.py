@@ -1,36 +1,391 @@
-import subprocess
+import asyncio
+import hashlib
+import logging
 import os
+import shutil
+import subprocess
+import tempfile
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+FFMPEG = os.getenv("FFMPEG_BIN", "ffmpeg")
+# ffmpeg сам грузит ядро, поэтому параллельных кодирований не больше числа ядер
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", str(os.cpu_count() or 1)))
+TRANSCODE_TIMEOUT = float(os.getenv("TRANSCODE_TIMEOUT", "120"))
+# Потоков x264 на один ffmpeg; 0 — поровну делим ядра между воркерами
+TRANSCODE_THREADS = int(os.getenv("TRANSCODE_THREADS", "0"))
+TRANSCODE_CACHE_DIR = os.getenv("TRANSCODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "videonote-cache"))
+TRANSCODE_CACHE_MAX_MB = float(os.getenv("TRANSCODE_CACHE_MAX_MB", "512"))
+# Ролики от этого размера кодируем потоком, без копий на диске (см. Transcoder.stream)
+STREAM_MIN_BYTES = int(float(os.getenv("VIDEONOTE_STREAM_MIN_MB", "8")) * 2**20)
+
+
+class TranscodeError(Exception):
+    """ffmpeg завершился с ошибкой или не уложился в таймаут."""
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """Настройки кодирования video note. Сравнить профили: python -m bench.encode_presets."""
+    name: str
+    preset: str          # -preset x264: скорость кодирования против размера
+    crf: int             # качество видео, больше — меньше файл
+    audio_bitrate: str
+    max_duration: float = 60.0  # кружок в Telegram не длиннее минуты — остальное не кодируем
 
-def convert_to_videonote(input_path: str, output_path: str = "video_note.mp4", size: int = 360):
+
+PROFILES = {
+    "fast": EncodingProfile("fast", "veryfast", 26, "64k"),
+    "balanced": EncodingProfile("balanced", "medium", 23, "96k"),
+    "small": EncodingProfile("small", "slow", 30, "48k"),
+}
+DEFAULT_PROFILE = os.getenv("VIDEONOTE_PROFILE", "balanced")
+
+
+def get_profile(profile: str | EncodingProfile | None = None) -> EncodingProfile:
+    if isinstance(profile, EncodingProfile):
+        return profile
+    return PROFILES[profile or DEFAULT_PROFILE]
+
+
+def videonote_cmd(input_path: str, output_path: str, size: int = 360, fragmented: bool = False,
+                  profile: str | EncodingProfile | None = None, threads: int = 0) -> list[str]:
     """
-    Конвертирует видео в квадрат 1:1, подходящий для отправки как video note.
-    - input_path: путь к исходному видео
-    - output_path: куда сохранить результат
-    - size: размер по ширине/высоте (например, 360)
+    Команда ffmpeg: квадрат size×size, H.264 baseline + AAC по профилю profile.
+    fragmented=True — фрагментированный MP4, который можно писать в пайп (pipe:1).
+    threads=0 — число потоков выбирает x264.
     """
+    profile = get_profile(profile)
     cmd = [
-        "ffmpeg",
+        FFMPEG,
         "-y",  # автоматическая перезапись выходного файла, если он существует
         "-i", input_path,
-        "-vf", f"scale={size}:{size}:force_original_aspect_ratio=decrease",
+        # центральный квадрат: scale с force_original_aspect_ratio давал не квадрат,
+        # а на 16:9 — нечётную высоту, которую libx264 с yuv420p не принимает
+        "-vf", f"crop='min(iw,ih)':'min(iw,ih)',scale={size}:{size}",
         "-c:v", "libx264",
         "-profile:v", "baseline",
         "-level", "3.0",
         "-pix_fmt", "yuv420p",
+        "-preset", profile.preset,
+        "-crf", str(profile.crf),
+        "-threads", str(threads),
         "-c:a", "aac",
-        output_path
+        "-b:a", profile.audio_bitrate,
+        "-t", f"{profile.max_duration:g}",
     ]
+    if fragmented:
+        # moov в начале и фрагменты по ключевым кадрам: назад по выходу ffmpeg не ходит
+        cmd += ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    return cmd + [output_path]
 
+
+def convert_to_videonote(input_path: str, output_path: str = "video_note.mp4", size: int = 360,
+                         profile: str | None = None):
+    """
+    Конвертирует видео в квадрат 1:1, подходящий для отправки как video note.
+    Блокирующая версия для запуска из консоли; в обработчиках — Transcoder.
+    - input_path: путь к исходному видео
+    - output_path: куда сохранить результат
+    - size: размер по ширине/высоте (например, 360)
+    - profile: fast / balanced / small (по умолчанию VIDEONOTE_PROFILE)
+    """
     try:
-        subprocess.run(cmd, check=True)
+        subprocess.run(videonote_cmd(input_path, output_path, size, profile=profile), check=True)
         print(f"Файл {output_path} успешно создан.")
     except subprocess.CalledProcessError as e:
         print(f"Ошибка при конвертации: {e}")
 
+
+class Transcoder:
+    """
+    Асинхронное кодирование video note: ffmpeg запускается подпроцессом,
+    одновременно работает не больше workers процессов, остальные ждут очереди.
+    Каждый результат пишется в свой временный файл, так что параллельные
+    конвертации не перетирают друг друга. При таймауте или отмене задачи
+    ffmpeg убивается, а недописанный файл удаляется.
+    """
+
+    def __init__(self, workers: int = TRANSCODE_WORKERS, timeout: float = TRANSCODE_TIMEOUT,
+                 tmp_dir: str | None = None, threads: int = TRANSCODE_THREADS):
+        self.workers = workers
+        self.timeout = timeout
+        self.tmp_dir = tmp_dir
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self._slots = asyncio.Semaphore(workers)
+
+    def cmd(self, input_path: str, output_path: str, size: int = 360,
+            profile: str | EncodingProfile | None = None, fragmented: bool = False) -> list[str]:
+        return videonote_cmd(input_path, output_path, size, fragmented, profile, self.threads)
+
+    async def _run(self, cmd: list[str], timeout: float):
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except BaseException:
+            # таймаут или отмена: не оставляем ffmpeg работать впустую
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+        if proc.returncode:
+            tail = stderr.decode(errors="replace").strip().splitlines()[-3:]
+            raise TranscodeError(f"ffmpeg exited with {proc.returncode}: {' | '.join(tail)}")
+
+    async def convert(self, input_path: str, size: int = 360, timeout: float | None = None,
+                      profile: str | EncodingProfile | None = None) -> str:
+        """
+        Кодирует input_path и возвращает путь к новому временному .mp4.
+        Файл принадлежит вызывающему — удалить его после отправки (или использовать converted()).
+        """
+        fd, output_path = tempfile.mkstemp(suffix=".mp4", prefix="videonote-", dir=self.tmp_dir)
+        os.close(fd)
+        try:
+            async with self._slots:
+                await self._run(self.cmd(input_path, output_path, size, profile), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            os.unlink(output_path)
+            raise TranscodeError(f"ffmpeg timed out after {timeout or self.timeout:g} s") from None
+        except BaseException:
+            os.unlink(output_path)
+            raise
+        return output_path
+
+    async def stream(self, chunks: AsyncIterable[bytes], size: int = 360, timeout: float | None = None,
+                     profile: str | EncodingProfile | None = None,
+                     read_size: int = 1 << 16) -> AsyncIterator[bytes]:
+        """
+        Потоковое кодирование: байты исходника из chunks идут в stdin ffmpeg,
+        фрагментированный MP4 отдаётся из stdout по мере готовности. На диск
+        ничего не пишется, в памяти — только буферы пайпов, сколько бы ни весил ролик.
+        Исходник должен читаться последовательно: MP4 с moov в конце из пайпа не прочитать.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        async with self._slots:
+            proc = await asyncio.create_subprocess_exec(
+                *self.cmd("pipe:0", "pipe:1", size, profile, fragmented=True),
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stderr_tail: deque[bytes] = deque(maxlen=4)
+            feeder = asyncio.create_task(self._feed(proc.stdin, chunks))
+            drainer = asyncio.create_task(self._drain(proc.stderr, stderr_tail))
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(proc.stdout.read(read_size), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        raise TranscodeError(f"ffmpeg timed out after {timeout or self.timeout:g} s") from None
+                    if not chunk:
+                        break
+                    yield chunk
+                await proc.wait()
+                await drainer
+                # ошибка источника закрывает stdin, и ffmpeg может честно выйти с обрезанным роликом
+                if feeder.done() and not feeder.cancelled() and feeder.exception():
+                    raise TranscodeError(f"source stream failed: {feeder.exception()!r}")
+                if proc.returncode:
+                    tail = b"".join(stderr_tail).decode(errors="replace").strip().splitlines()[-3:]
+                    raise TranscodeError(f"ffmpeg exited with {proc.returncode}: {' | '.join(tail)}")
+            finally:
+                # отмена, таймаут или потребитель бросил чтение: гасим ffmpeg и вспомогательные задачи
+                feeder.cancel()
+                drainer.cancel()
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+
+    @staticmethod
+    async def _feed(stdin: asyncio.StreamWriter, chunks: AsyncIterable[bytes]):
+        try:
+            async for chunk in chunks:
+                stdin.write(chunk)
+                await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg уже вышел — причину покажет код возврата
+        finally:
+            stdin.close()
+
+    @staticmethod
+    async def _drain(stderr: asyncio.StreamReader, tail: deque):
+        """Читает stderr, чтобы ffmpeg не встал на полном пайпе; хранит только хвост."""
+        while chunk := await stderr.read(4096):
+            tail.append(chunk)
+
+    def submit(self, input_path: str, size: int = 360, timeout: float | None = None,
+               profile: str | EncodingProfile | None = None) -> asyncio.Task:
+        """Ставит конвертацию в фон; задачу можно await-ить или cancel()."""
+        return asyncio.create_task(self.convert(input_path, size, timeout, profile))
+
+    @asynccontextmanager
+    async def converted(self, input_path: str, size: int = 360, timeout: float | None = None,
+                        profile: str | EncodingProfile | None = None):
+        """async with transcoder.converted(src) as path: ... — временный файл удаляется на выходе."""
+        output_path = await self.convert(input_path, size, timeout, profile)
+        try:
+            yield output_path
+        finally:
+            os.unlink(output_path)
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class TranscodeCache:
+    """
+    Дисковый кэш готовых video note: ключ — sha256 содержимого исходника плюс
+    параметры кодирования (сама команда ffmpeg), так что смена настроек
+    не отдаёт старый результат. Суммарный размер ограничен max_bytes,
+    вытесняются давно не использованные файлы (LRU по mtime, переживает рестарт).
+
+    Одинаковые запросы, пришедшие во время кодирования, ждут один и тот же
+    ffmpeg. Поэтому отмена одного ожидающего его не убивает — результат всё
+    равно попадёт в кэш для остальных.
+    """
+
+    def __init__(self, transcoder: Transcoder, directory: str = TRANSCODE_CACHE_DIR,
+                 max_bytes: int = int(TRANSCODE_CACHE_MAX_MB * 2**20)):
+        self.transcoder = transcoder
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        # key → размер файла; порядок — от давно использованных к недавним
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        files = [e for e in os.scandir(directory) if e.name.endswith(".mp4")]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self._entries[entry.name[:-4]] = entry.stat().st_size
+        self._total = sum(self._entries.values())
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pins: Counter = Counter()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    async def _key(self, input_path: str, size: int, profile: str | EncodingProfile | None) -> str:
+        content = await asyncio.to_thread(_file_sha256, input_path)
+        params = "\0".join(self.transcoder.cmd("", "", size, profile))
+        return hashlib.sha256(f"{content}\0{params}".encode()).hexdigest()
+
+    def _touch(self, key: str) -> bool:
+        """Отмечает использование записи; False, если файл пропал с диска."""
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            self._total -= self._entries.pop(key)
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def _evict(self, keep: str):
+        for key in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if key == keep or self._pins[key]:
+                continue
+            self._total -= self._entries.pop(key)
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    async def _fill(self, key: str, input_path: str, size: int, timeout: float | None,
+                    profile: str | EncodingProfile | None):
+        output = await self.transcoder.convert(input_path, size, timeout, profile)
+        shutil.move(output, self._path(key))
+        self._entries[key] = os.path.getsize(self._path(key))
+        self._total += self._entries[key]
+        logger.info("Transcoded %s into cache: %d bytes, cache %d/%d bytes",
+                    input_path, self._entries[key], self._total, self.max_bytes)
+        self._evict(keep=key)
+
+    def _unpin(self, key: str):
+        self._pins[key] -= 1
+        if not self._pins[key]:
+            del self._pins[key]
+
+    async def _get(self, input_path: str, size: int, timeout: float | None,
+                   profile: str | EncodingProfile | None) -> str:
+        """Ключ готового файла, уже закреплённый (снять — _unpin)."""
+        key = await self._key(input_path, size, profile)
+        # Закрепляем до ожидания ffmpeg: между готовностью файла и пробуждением
+        # этого ожидающего чужой _fill мог бы вытеснить ещё не закреплённую запись
+        self._pins[key] += 1
+        try:
+            if key in self._entries and self._touch(key):
+                self.hits += 1
+                return key
+            task = self._inflight.get(key)
+            if task is not None:
+                self.joined += 1
+            else:
+                self.misses += 1
+                task = asyncio.ensure_future(self._fill(key, input_path, size, timeout, profile))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            await asyncio.shield(task)
+        except BaseException:
+            self._unpin(key)
+            raise
+        return key
+
+    @asynccontextmanager
+    async def converted(self, input_path: str, size: int = 360, timeout: float | None = None,
+                        profile: str | EncodingProfile | None = None):
+        """
+        async with cache.converted(src) as path: ... — path лежит в кэше и не
+        вытесняется, пока блок не завершился; удалять его не нужно.
+        """
+        key = await self._get(input_path, size, timeout, profile)
+        try:
+            yield self._path(key)
+        finally:
+            self._unpin(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.joined
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "joined": self.joined,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.joined) / lookups if lookups else 0.0,
+        }
+
+
+# Общие на процесс бота: ограничение по ядрам действует для всех роутеров
+transcoder = Transcoder()
+_transcode_cache: TranscodeCache | None = None
+
+
+def get_transcode_cache() -> TranscodeCache:
+    """Общий кэш video note; каталог создаётся и сканируется при первом обращении, а не при импорте."""
+    global _transcode_cache
+    if _transcode_cache is None:
+        _transcode_cache = TranscodeCache(transcoder)
+    return _transcode_cache
+
+
 if __name__ == "__main__":
     # Пример использования:
     current_dir = os.path.dirname(os.path.abspath(__file__))
     input_file = os.path.join(current_dir, "test_input.mp4")
     output_file = os.path.join(current_dir, "test_output.mp4")
 
-    convert_to_videonote(input_file, output_file, size=360)
+    convert_to_videonote(input_file, output_file, size=360, profile=DEFAULT_PROFILE)
@@ -0,0 +1,235 @@
+"""
+Бэкенд мини-приложения «график работы» (Telegram WebApp, кнопка kb.mini_app).
+
+Один запрос отдаёт всё, что нужно экрану месяца официанта:
+
+    GET /api/schedule?month=YYYY-MM
+    Authorization: tma <initData>
+
+    {"month": "2025-03", "waiter": {"id": 7, "name": "Имя Фамилия"},
+     "days": [{"date": "2025-03-01", "hours": 8.0, "tasks": "зал", "tips": 500.0}, ...],
+     "totals": {"hours": 168.0, "rate": 140.0, "pay": 23520.0, "tips": 8500.0, "tip_days": 17}}
+
+Пользователь определяется по initData, подписанной токеном бота (TOKEN), —
+сессии не нужны. Чтение — из общего пула read-only соединений SQLite
+(connect_readonly, WAL не мешает боту писать), часы и чаевые — из итогов
+monthly_hours / monthly_tips. Ответ кэшируется на (пользователь, месяц)
+на WEBAPP_CACHE_TTL секунд и отдаётся с ETag и Last-Modified: повторное
+открытие мини-приложения с If-None-Match получает 304 без тела.
+
+    python -m app.webapp            # разработка, WEBAPP_HOST / WEBAPP_PORT
+    gunicorn 'app.webapp:create_app()'
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from aiogram.utils.web_app import safe_parse_webapp_init_data
+from flask import Flask, Response, jsonify, request
+
+from app.database import sqlite_db
+
+logger = logging.getLogger(__name__)
+
+_MONTH = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
+
+
+class ReadOnlyPool:
+    """
+    Общий на все потоки WSGI-сервера набор read-only соединений.
+    Соединения открываются лениво, не больше size; запрос ждёт свободное.
+    """
+
+    def __init__(self, path: str | None = None, size: int = 4):
+        self.path = path
+        self.size = max(1, size)
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        return sqlite_db.connect_readonly(self.path, check_same_thread=False)
+
+    @contextmanager
+    def connection(self):
+        if self._closed:
+            raise RuntimeError("ReadOnlyPool is closed")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                opened = self._opened < self.size
+                if opened:
+                    self._opened += 1
+            if opened:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        if conn is None:
+            # Метка закрытия: возвращаем её для остальных ждущих
+            self._idle.put(None)
+            raise RuntimeError("ReadOnlyPool is closed")
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                closed = self._closed
+                if closed:
+                    self._opened -= 1
+            if closed:
+                # Пул закрыли, пока соединение было занято: закрываем при возврате
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """Закрывает свободные соединения; занятые закроются, когда их вернут."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+                with self._lock:
+                    self._opened -= 1
+        self._idle.put(None)  # будит запросы, ждущие свободного соединения
+
+
+class ResponseCache:
+    """
+    Готовые ответы по (tg_id, месяц): (expires, body, etag, last_modified).
+    Просроченная запись не удаляется сразу: если пересобранное тело совпало
+    по ETag, Last-Modified остаётся прежним. Вытеснение — LRU по maxsize.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 15.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> tuple | None:
+        """Свежая запись (body, etag, last_modified) или None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1:]
+
+    def put(self, key, body: bytes) -> tuple:
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None and old[2] == etag:
+                modified = old[3]
+            else:
+                modified = datetime.now(timezone.utc).replace(microsecond=0)
+            if self.ttl > 0:
+                self._data[key] = (time.monotonic() + self.ttl, body, etag, modified)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return body, etag, modified
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def _error(status: int, code: str) -> Response:
+    response = jsonify({"error": code})
+    response.status_code = status
+    return response
+
+
+def create_app(db_path: str | None = None, bot_token: str | None = None) -> Flask:
+    """Flask-приложение API; настройки — из окружения (.env)."""
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    token = bot_token or os.getenv("TOKEN") or ""
+    auth_max_age = int(os.getenv("WEBAPP_AUTH_MAX_AGE", "86400"))
+    pool = ReadOnlyPool(db_path, int(os.getenv("WEBAPP_POOL_SIZE", "4")))
+    cache = ResponseCache(int(os.getenv("WEBAPP_CACHE_SIZE", "4096")), float(os.getenv("WEBAPP_CACHE_TTL", "15")))
+    app.extensions["schedule_pool"] = pool
+    app.extensions["schedule_cache"] = cache
+
+    def current_user() -> int | None:
+        scheme, _, init_data = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "tma" or not init_data or not token:
+            return None
+        try:
+            data = safe_parse_webapp_init_data(token, init_data)
+        except ValueError:
+            return None
+        if data.user is None:
+            return None
+        if auth_max_age and time.time() - data.auth_date.timestamp() > auth_max_age:
+            return None
+        return data.user.id
+
+    @app.get("/api/schedule")
+    def schedule():
+        tg_id = current_user()
+        if tg_id is None:
+            return _error(401, "unauthorized")
+        ym = request.args.get("month") or date.today().strftime("%Y-%m")
+        if not _MONTH.fullmatch(ym):
+            return _error(400, "bad_month")
+
+        key = (tg_id, ym)
+        entry = cache.get(key)
+        if entry is None:
+            with pool.connection() as conn:
+                data = sqlite_db.read_waiter_month(conn, tg_id, ym)
+            if data is None:
+                return _error(404, "not_a_waiter")
+            entry = cache.put(key, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode())
+        body, etag, modified = entry
+
+        response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.last_modified = modified
+        # Кэшировать можно только в браузере пользователя и только с проверкой
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Authorization")
+        return response.make_conditional(request)
+
+    @app.get("/api/health")
+    def health():
+        return jsonify({"ok": True, "cache": cache.stats()})
+
+    return app
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    # app.database уже импортирован до load_dotenv: путь к базе передаём явно
+    create_app(os.getenv("DB_PATH")).run(host=os.getenv("WEBAPP_HOST", "127.0.0.1"), port=int(os.getenv("WEBAPP_PORT", "8080")))
@@ -0,0 +1,67 @@
+"""
+Рассылка админам/официантам: последовательная отправка (как было в forecast_send)
+против Broadcaster. Telegram имитируется: задержка ответа, один медленный чат
+и RetryAfter на части первых попыток.
+
+    python -m bench.broadcast --recipients 40 --latency-ms 120
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.broadcast import Broadcaster
+
+
+def fake_send(latency: float, slow_chat: int, flood_ratio: float, seed: int = 1):
+    rnd = random.Random(seed)
+    flooded: set[int] = set()
+
+    async def send(chat_id: int):
+        await asyncio.sleep(latency * (10 if chat_id == slow_chat else 1))
+        if chat_id not in flooded and rnd.random() < flood_ratio:
+            flooded.add(chat_id)
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=""), "Flood control exceeded", 1)
+        return chat_id
+
+    return send
+
+
+async def sequential(chat_ids, send) -> int:
+    delivered = 0
+    for chat_id in chat_ids:
+        try:
+            await send(chat_id)
+            delivered += 1
+        except Exception:
+            continue
+    return delivered
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=120)
+    parser.add_argument("--flood-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    chat_ids = list(range(1000, 1000 + args.recipients))
+    latency = args.latency_ms / 1000
+
+    started = time.perf_counter()
+    delivered = await sequential(chat_ids, fake_send(latency, chat_ids[0], args.flood_ratio))
+    print(f"sequential   {time.perf_counter() - started:6.2f} s  delivered {delivered}/{len(chat_ids)}")
+
+    started = time.perf_counter()
+    results = await Broadcaster().deliver(chat_ids, fake_send(latency, chat_ids[0], args.flood_ratio))
+    retried = sum(r.attempts > 1 for r in results)
+    print(f"broadcaster  {time.perf_counter() - started:6.2f} s  delivered {sum(r.ok for r in results)}/{len(chat_ids)}"
+          f"  retried {retried}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Рендер inline-календаря: прежний make_calendar (все ~50 кнопок заново на каждое
+нажатие + inline_keyboard.append) против календаря из закэшированного каркаса месяца.
+Печатает рендеров в секунду и пик выделенной памяти на один рендер (tracemalloc).
+
+    python -m bench.calendar_render --renders 20000
+"""
+
+import argparse
+import calendar
+import time
+import tracemalloc
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.calendar_router import MENU_ROW, make_calendar
+
+YEAR, MONTH = 2025, 3
+MARKED = {f"{YEAR}-{MONTH:02d}-{d:02d}" for d in range(1, 32, 3)}
+
+
+def legacy_make_calendar(year: int, month: int, marked) -> InlineKeyboardMarkup:
+    """make_calendar из calendar_router до кэширования — точка отсчёта."""
+    kb = [[
+        InlineKeyboardButton(text="‹", callback_data=f"CAL_PREV|{year}|{month}"),
+        InlineKeyboardButton(text=f"{calendar.month_name[month]} {year}", callback_data="IGNORE"),
+        InlineKeyboardButton(text="›", callback_data=f"CAL_NEXT|{year}|{month}"),
+    ], [
+        InlineKeyboardButton(text=d, callback_data="IGNORE")
+        for d in ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+    ]]
+    for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month):
+        row = []
+        for day in week:
+            if day == 0:
+                row.append(InlineKeyboardButton(text=" ", callback_data="IGNORE"))
+            else:
+                ds = f"{year:04d}-{month:02d}-{day:02d}"
+                mark = "✓" if ds in marked else ""
+                row.append(InlineKeyboardButton(text=f"{day}{mark}", callback_data=f"CAL_DAY|{ds}"))
+        kb.append(row)
+    kb.append([InlineKeyboardButton(text="❌ Отмена", callback_data="CAL_CANCEL")])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+def render_legacy():
+    kb = legacy_make_calendar(YEAR, MONTH, MARKED)
+    kb.inline_keyboard.append([InlineKeyboardButton(text="⏪ В меню", callback_data="W_MENU")])
+    return kb
+
+
+def render_cached():
+    return make_calendar(YEAR, MONTH, MARKED, footer=[MENU_ROW])
+
+
+def _measure(render, renders: int) -> tuple[float, int]:
+    render()  # прогрев: каркас месяца попадает в кэш
+    started = time.perf_counter()
+    for _ in range(renders):
+        render()
+    rate = renders / (time.perf_counter() - started)
+
+    tracemalloc.start()
+    render()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rate, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    # одинаковая разметка — иначе сравнение бессмысленно
+    assert render_legacy().model_dump() == render_cached().model_dump()
+    for label, render in (("legacy", render_legacy), ("cached", render_cached)):
+        rate, peak = _measure(render, args.renders)
+        print(f"{label:<7} {rate:10.0f} renders/s  peak {peak / 1024:7.1f} KiB/render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Бенчмарк пути записи sqlite_db: записей в секунду до и после WAL + group commit.
+
+Запуск из корня репозитория:
+    python -m bench.db_writes --writes 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from app.database import sqlite_db
+
+# "до": rollback-журнал и COMMIT на каждую запись; "после": WAL и group commit
+MODES = {
+    "commit-per-write": dict(journal_mode="DELETE", batch_size=1, batch_window=0),
+    "wal-per-write": dict(journal_mode="WAL", batch_size=1, batch_window=0),
+    "wal-group-commit": dict(journal_mode="WAL"),
+}
+
+
+async def _run(mode: str, writes: int, concurrency: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        await sqlite_db.sql_start(os.path.join(tmp, "bench.db"), **MODES[mode])
+        try:
+            await asyncio.gather(*(sqlite_db.add_waiter(tg_id) for tg_id in range(concurrency)))
+            wids = [await sqlite_db.get_waiter_id_by_tg(tg_id) for tg_id in range(concurrency)]
+
+            async def worker(n: int):
+                # конец смены: каждый официант вносит чаевые и часы за свои дни
+                for i in range(n, writes, concurrency):
+                    date = f"2025-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}"
+                    await sqlite_db.add_tip(wids[n], date, float(i))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(n) for n in range(concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            await sqlite_db.sql_stop()
+    return writes / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    # aiosqlite пишет в DEBUG каждую операцию — это исказит замер
+    logging.getLogger("aiosqlite").setLevel(logging.INFO)
+
+    for mode in MODES:
+        rate = await _run(mode, args.writes, args.concurrency)
+        print(f"{mode:<18} {rate:10.0f} writes/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
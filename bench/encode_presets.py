@@ -0,0 +1,53 @@
+"""
+Матрица профилей кодирования video note: каждый профиль из PROFILES × число
+потоков × ролик. Печатает время кодирования, процессорное время ffmpeg и размер
+результата, чтобы выбирать VIDEONOTE_PROFILE / TRANSCODE_THREADS по цифрам.
+Нужен ffmpeg в PATH (или FFMPEG_BIN).
+
+    python -m bench.encode_presets --clips imge/startof.mp4 --threads 1,0 --size 360
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+
+from app.video_converter import PROFILES, Transcoder
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", default="imge/startof.mp4", help="ролики через запятую")
+    parser.add_argument("--threads", default="1,0", help="значения -threads через запятую (0 — авто)")
+    parser.add_argument("--size", type=int, default=360)
+    args = parser.parse_args()
+
+    print(f"{'clip':<20} {'profile':<9} {'threads':>7} {'wall':>7} {'cpu':>7} {'output':>9} {'ratio':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for clip in args.clips.split(","):
+            source_size = os.path.getsize(clip)
+            for threads in map(int, args.threads.split(",")):
+                # threads=0 в Transcoder означает «поделить ядра», а здесь нужен именно авто-режим x264
+                transcoder = Transcoder(workers=1, tmp_dir=tmp)
+                transcoder.threads = threads
+                for name in PROFILES:
+                    cpu_before = _children_cpu()
+                    started = time.perf_counter()
+                    output = await transcoder.convert(clip, args.size, profile=name)
+                    wall = time.perf_counter() - started
+                    cpu = _children_cpu() - cpu_before
+                    size = os.path.getsize(output)
+                    os.unlink(output)
+                    print(f"{os.path.basename(clip):<20} {name:<9} {threads or 'auto':>7} {wall:6.2f}s {cpu:6.2f}s "
+                          f"{size / 1024:7.0f}KB {size / source_size:6.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Потоковая выгрузка (app/export.py) против fetchall на миллионе смен.
+
+Засеивает shifts синтетикой (по умолчанию 1 000 000 строк) и выгружает всю
+таблицу в отдельном процессе на каждый вариант, чтобы ru_maxrss был честным:
+  fetchall — как выгрузка поверх get_all_shifts(): все строки в список,
+             затем обычная книга openpyxl (дерево ячеек в памяти);
+  xlsx     — export_to_file: курсор кусками в write-only книгу;
+  csv      — export_to_file: курсор кусками в CSV.
+Потоковые варианты гоняются и на четверти объёма — пик памяти не должен
+зависеть от числа строк.
+
+    python -m bench.export --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from openpyxl import Workbook
+
+from app import export
+from app.database import sqlite_db
+
+WAITERS = 200
+
+
+def seed(path: str, rows: int):
+    async def schema():
+        await sqlite_db.sql_start(path)
+        await sqlite_db.sql_stop()
+
+    asyncio.run(schema())
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO employees (last_name, first_name, role, rate) VALUES (?, ?, 'ОФИЦИАНТЫ', 140.0)",
+        ((f"Фамилия{i}", f"Имя{i}") for i in range(WAITERS)),
+    )
+    conn.executemany(
+        "INSERT INTO waiters (tg_id, name, employee_id) VALUES (?, ?, ?)",
+        ((1000 + i, f"Официант {i}", i + 1 if i % 2 else None) for i in range(WAITERS)),
+    )
+    days = rows // WAITERS
+    start = date.today() - timedelta(days=days)
+    conn.executemany(
+        "INSERT INTO shifts (waiter_id, date, hours, tasks) VALUES (?, ?, 8.0, 'зал, бар')",
+        ((w, (start + timedelta(days=d)).isoformat()) for d in range(days) for w in range(1, WAITERS + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_fetchall(path: str, out: str, rows: int) -> int:
+    spec = export.EXPORTS["shifts"]
+    sql, params = export.build_query(spec, export.ExportFilter())
+    conn = sqlite_db.connect_readonly()
+    data = conn.execute(sql, params).fetchall()
+    conn.close()
+    wb = Workbook()
+    ws = wb.active
+    ws.append(spec.headers)
+    for row in data:
+        ws.append(row)
+    wb.save(out)
+    return len(data)
+
+
+def run_stream(fmt: str):
+    def run(path: str, out: str, rows: int) -> int:
+        flt = export.ExportFilter()
+        if rows:
+            # четверть объёма — по фильтру дат, как выгрузка за период
+            days = rows // WAITERS
+            flt = export.ExportFilter(date_from=(date.today() - timedelta(days=days)).isoformat())
+        return export.export_to_file("shifts", flt, out, fmt)
+    return run
+
+
+VARIANTS = {"fetchall": run_fetchall, "xlsx": run_stream("xlsx"), "csv": run_stream("csv")}
+
+
+def child(variant: str, path: str, rows: int):
+    sqlite_db.DB_PATH = path
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, f"out.{'csv' if variant == 'csv' else 'xlsx'}")
+        started = time.perf_counter()
+        exported = VARIANTS[variant](path, out, rows)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(out)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"rows": exported, "elapsed": elapsed, "rss_mb": peak - base, "file_mb": size / 2**20}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=3, metavar=("VARIANT", "DB", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.db")
+        started = time.perf_counter()
+        seed(path, args.rows)
+        print(f"seeded {args.rows} shifts in {time.perf_counter() - started:.1f}s, "
+              f"db {os.path.getsize(path) / 2**20:.0f}MB\n")
+        print(f"{'variant':<9} {'rows':>9} {'time':>7} {'rows/s':>9} {'RSS +':>9} {'file':>8}")
+        runs = [("xlsx", args.rows // 4), ("csv", args.rows // 4), ("xlsx", 0), ("csv", 0), ("fetchall", 0)]
+        for variant, rows in runs:
+            proc = subprocess.run([sys.executable, "-m", "bench.export", "--child", variant, path, str(rows)],
+                                  check=True, capture_output=True, text=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{variant:<9} {r['rows']:>9} {r['elapsed']:6.1f}s {r['rows'] / r['elapsed']:>9.0f} "
+                  f"{r['rss_mb']:7.1f}MB {r['file_mb']:6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Хранилище FSM под нагрузкой: каждый «апдейт» — get_state, get_data,
+update_data и set_state, как в обработчиках уроков и теста. Сравнивает
+MemoryStorage, SQLiteStorage с отложенной записью и SQLiteStorage, который
+сбрасывает каждую запись сразу; затем проверяет, что состояние пережило
+перезапуск (новый экземпляр хранилища на том же файле).
+
+    python -m bench.fsm_storage --updates 20000 --users 500
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.database.fsm_storage import SQLiteStorage
+
+
+def _key(user: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user, user_id=user)
+
+
+async def _update(storage, key: StorageKey, write_through: bool):
+    await storage.get_state(key)
+    data = await storage.get_data(key)
+    await storage.update_data(key, {"question": data.get("question", 0) + 1, "score": data.get("score", 0)})
+    await storage.set_state(key, "QuizStates:in_progress")
+    if write_through:
+        await storage.flush()
+
+
+async def _run(storage, updates: int, users: int, write_through: bool = False) -> float:
+    rnd = random.Random(1)
+    started = time.perf_counter()
+    # апдейты разных пользователей идут параллельно, как в диспетчере
+    for _ in range(updates // 50):
+        await asyncio.gather(*(_update(storage, _key(rnd.randrange(users)), write_through) for _ in range(50)))
+    elapsed = time.perf_counter() - started
+    await storage.close()
+    return updates / elapsed
+
+
+async def _check_restart(path: str, users: int):
+    storage = SQLiteStorage(path)
+    total = 0
+    for user in range(users):
+        total += (await storage.get_data(_key(user))).get("question", 0)
+    state = await storage.get_state(_key(0))
+    await storage.close()
+    return total, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    logging.getLogger("aiosqlite").setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rate = asyncio.run(_run(MemoryStorage(), args.updates, args.users))
+        print(f"memory             {rate:8.0f} updates/s")
+        path = os.path.join(tmp, "sync.db")
+        rate = asyncio.run(_run(SQLiteStorage(path), args.updates, args.users, write_through=True))
+        print(f"sqlite, flush each {rate:8.0f} updates/s")
+        path = os.path.join(tmp, "fsm.db")
+        rate = asyncio.run(_run(SQLiteStorage(path), args.updates, args.users))
+        print(f"sqlite, batched    {rate:8.0f} updates/s")
+
+        total, state = asyncio.run(_check_restart(path, args.users))
+        print(f"after restart: {total} of {args.updates} answers kept, state={state}")
+
+
+if __name__ == "__main__":
+    main()
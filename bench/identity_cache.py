@@ -0,0 +1,56 @@
+"""
+Кэш идентичностей sqlite_db на горячем пути колбэков календаря:
+каждый колбэк начинается с get_waiter_id_by_tg, часть — с get_employees_with_shifts.
+Сравнивает поиски в секунду без кэша (TTL 0) и с кэшем, печатает счётчики.
+
+    python -m bench.identity_cache --callbacks 20000 --waiters 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from app.database import sqlite_db
+
+
+async def _run(path: str, callbacks: int, waiters: int, ttl: float) -> tuple[float, dict]:
+    sqlite_db.identity_cache.ttl = ttl
+    await sqlite_db.sql_start(path)
+    try:
+        await asyncio.gather(*(sqlite_db.add_waiter(1000 + i) for i in range(waiters)))
+        sqlite_db.identity_cache.hits = sqlite_db.identity_cache.misses = 0
+        rnd = random.Random(1)
+
+        started = time.perf_counter()
+        for i in range(callbacks):
+            wid = await sqlite_db.get_waiter_id_by_tg(1000 + rnd.randrange(waiters))
+            await sqlite_db.get_employee_id_for_waiter(wid)
+            if i % 10 == 0:
+                await sqlite_db.get_employees_with_shifts()
+        elapsed = time.perf_counter() - started
+    finally:
+        await sqlite_db.sql_stop()
+    return callbacks / elapsed, sqlite_db.identity_cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callbacks", type=int, default=20000)
+    parser.add_argument("--waiters", type=int, default=60)
+    args = parser.parse_args()
+    logging.getLogger("aiosqlite").setLevel(logging.INFO)
+    logging.getLogger("app.database.sqlite_db").setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, ttl in (("no cache", 0.0), ("cached", sqlite_db.IDENTITY_CACHE_TTL)):
+            rate, stats = asyncio.run(_run(os.path.join(tmp, "identity.db"), args.callbacks, args.waiters, ttl))
+            print(f"{label:<9} {rate:10.0f} callbacks/s  hits={stats['hits']} misses={stats['misses']} "
+                  f"hit_rate={stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
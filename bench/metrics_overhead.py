@@ -0,0 +1,83 @@
+"""
+Цена инструментирования app/metrics.py на горячем пути.
+
+Сравнивает вызов get_waiter_id_by_tg (из кэша идентичностей — самый дешёвый
+вызов sqlite_db) без обёртки и через metrics.timed_db, и feed_update
+простого колбэка без MetricsMiddleware и с ним. Без METRICS=1 обёртки и
+middleware не ставятся вовсе, так что первая строка каждой пары — это и есть
+цена выключенных метрик.
+
+    python -m bench.metrics_overhead --calls 100000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Update
+
+from app import metrics
+from app.database import sqlite_db
+from bench.mock_api import BOT_TOKEN, callback_update
+
+
+async def _db_calls(path: str, calls: int) -> tuple[float, float]:
+    await sqlite_db.sql_start(path)
+    await sqlite_db.add_waiter(1000)
+    raw = sqlite_db.get_waiter_id_by_tg
+    timed = metrics.timed_db("get_waiter_id_by_tg", raw)
+    results = []
+    for func in (raw, timed):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await func(1000)
+        results.append((time.perf_counter() - started) / calls)
+    await sqlite_db.sql_stop()
+    return results[0], results[1]
+
+
+async def _updates(calls: int) -> tuple[float, float]:
+    bot = Bot(BOT_TOKEN)
+    update = Update.model_validate(callback_update(1, 1000, "IGNORE"), context={"bot": bot})
+    results = []
+    for with_metrics in (False, True):
+        router = Router()
+
+        @router.callback_query(F.data == "IGNORE")
+        async def ignore(q: CallbackQuery):
+            return None
+
+        dp = Dispatcher()
+        dp.include_router(router)
+        if with_metrics:
+            dp.update.outer_middleware(metrics.MetricsMiddleware())
+        started = time.perf_counter()
+        for _ in range(calls):
+            await dp.feed_update(bot, update)
+        results.append((time.perf_counter() - started) / calls)
+    await bot.session.close()
+    return results[0], results[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain, timed = asyncio.run(_db_calls(os.path.join(tmp, "metrics.db"), args.calls))
+    print(f"sqlite_db call   plain {plain * 1e6:6.2f} us  timed {timed * 1e6:6.2f} us  (+{(timed - plain) * 1e6:.2f} us)")
+    plain, timed = asyncio.run(_updates(args.calls // 10))
+    print(f"feed_update      plain {plain * 1e6:6.1f} us  timed {timed * 1e6:6.1f} us  (+{(timed - plain) * 1e6:.1f} us)")
+    print()
+    print(metrics.registry.render().splitlines()[0])
+    print(metrics.registry.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Локальный поддельный Telegram Bot API для нагрузочных прогонов.
+
+aiohttp-сервер на 127.0.0.1 отвечает на методы, которые вызывают роутеры бота,
+правдоподобными ответами с задержкой latency, отдаёт через getUpdates
+подложенные апдейты и считает вызовы. Бот подключается к нему как к обычному
+Bot API-серверу:
+
+    api = MockTelegramAPI(latency=0.02)
+    bot = await api.start()
+    api.push(message_update(1, chat_id=10, text="/start"))
+    ...
+    await api.stop()
+"""
+
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+BOT_TOKEN = "123456:bench"
+
+# Методы, которые возвращают Message; у медиа-методов — поле с файлом
+_MESSAGE_METHODS = {
+    "sendmessage": None,
+    "editmessagetext": None,
+    "editmessagereplymarkup": None,
+    "sendphoto": "photo",
+    "sendvideo": "video",
+    "sendvideonote": "video_note",
+    "senddocument": "document",
+}
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def message_update(update_id: int, chat_id: int, text: str, user_id: int | None = None) -> dict:
+    """Сырой апдейт с текстовым сообщением в личном чате."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": _user(user_id or chat_id),
+            "text": text,
+        },
+    }
+
+
+def callback_update(update_id: int, chat_id: int, data: str, user_id: int | None = None) -> dict:
+    """Сырой апдейт с нажатием inline-кнопки под сообщением бота."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id or chat_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "bench"},
+                "text": "…",
+            },
+        },
+    }
+
+
+class MockTelegramAPI:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._updates: list[dict] = []
+        self._arrived = asyncio.Event()
+        self._message_ids = itertools.count(1_000_000)
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    def push(self, *updates: dict):
+        """Кладёт апдейты в очередь getUpdates."""
+        self._updates.extend(updates)
+        self._arrived.set()
+
+    async def start(self) -> Bot:
+        """Запускает сервер на свободном порту и возвращает подключённый к нему Bot."""
+        app = web.Application(client_max_size=64 * 1024 * 1024)  # загрузка видео и документов
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.bot()
+
+    def bot(self) -> Bot:
+        return Bot(BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(self.url)))
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        data = await request.post()
+        self.calls[method] += 1
+        if method == "getupdates":
+            result = await self._get_updates(data)
+        else:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            result = self._result(method, data)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, data) -> list[dict]:
+        offset = int(data.get("offset") or 0)
+        limit = int(data.get("limit") or 100)
+        # getUpdates подтверждает всё, что меньше offset
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), float(data.get("timeout") or 0) or 0.01)
+            except asyncio.TimeoutError:
+                return []
+        return self._updates[:limit]
+
+    def _result(self, method: str, data):
+        if method == "getme":
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method in _MESSAGE_METHODS:
+            message = {
+                "message_id": int(data.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": int(data.get("chat_id") or 0), "type": "private"},
+                "text": data.get("text") or "",
+            }
+            media = _MESSAGE_METHODS[method]
+            if media is not None:
+                file = {"file_id": f"mock-{method}", "file_unique_id": f"mock-{method}"}
+                if media == "photo":
+                    message[media] = [{**file, "width": 1, "height": 1}]
+                elif media == "video_note":
+                    message[media] = {**file, "length": 1, "duration": 1}
+                elif media == "video":
+                    message[media] = {**file, "width": 1, "height": 1, "duration": 1}
+                else:
+                    message[media] = file
+            return message
+        # answerCallbackQuery, deleteMessage, setWebhook, deleteWebhook и прочее
+        return True
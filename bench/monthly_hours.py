@@ -0,0 +1,143 @@
+"""
+Сводка monthly_hours против пересчёта часов за месяц из сырых строк.
+
+Засеивает многолетнюю базу (bench.query_plans.seed) и сравнивает:
+  - чтение зарплатной ведомости за месяц: прежний запрос с CTE и анти-джойном
+    по work_hours/shifts против get_month_hours_with_rate из сводки;
+  - цену триггеров на записи: обновление часов смен и work_hours с триггерами
+    monthly_hours и без них (на копии базы с удалёнными триггерами);
+  - check_monthly_hours за месяц и за всю историю, rebuild_monthly_hours.
+
+    python -m bench.monthly_hours --years 5 --waiters 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.database import sqlite_db
+from bench.query_plans import seed
+
+# Прежний get_month_hours_with_rate: каждый вызов пересчитывает месяц заново
+RAW_MONTH = """
+    WITH wh AS (
+        SELECT employee_id, date, hours FROM work_hours WHERE date BETWEEN :first AND :last
+    ),
+    sh AS (
+        SELECT w.employee_id, s.date, s.hours
+        FROM shifts s
+        JOIN waiters w ON w.id = s.waiter_id
+        WHERE s.date BETWEEN :first AND :last
+          AND w.employee_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM wh WHERE wh.employee_id = w.employee_id AND wh.date = s.date)
+    ),
+    unioned AS (SELECT * FROM wh UNION ALL SELECT * FROM sh)
+    SELECT e.first_name || ' ' || e.last_name AS fio, SUM(u.hours) AS hours, COALESCE(e.rate, :rate) AS rate
+    FROM unioned u
+    JOIN employees e ON e.id = u.employee_id
+    GROUP BY e.id
+    ORDER BY fio
+"""
+
+
+def _timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def _writes(path: str, waiters: int, updates: int) -> float:
+    """updates обновлений часов (смены и work_hours пополам) в одной транзакции; секунд на обновление."""
+    conn = sqlite3.connect(path)
+    days = [(date.today() - timedelta(days=d)).isoformat() for d in range(365)]
+    started = time.perf_counter()
+    conn.executemany(
+        "UPDATE shifts SET hours = ? WHERE waiter_id = ? AND date = ?",
+        ((6.5, 1 + i % waiters, days[i % len(days)]) for i in range(updates // 2)),
+    )
+    conn.executemany(
+        "INSERT INTO work_hours (employee_id, date, hours) VALUES (?, ?, ?) "
+        "ON CONFLICT(employee_id, date) DO UPDATE SET hours = excluded.hours",
+        ((1 + i % waiters, days[i % len(days)], 7.5) for i in range(updates // 2)),
+    )
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / updates
+
+
+async def _summary(path: str, ym: str, repeat: int):
+    await sqlite_db.sql_start(path)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await sqlite_db.get_month_hours_with_rate(ym)
+    read = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    diffs = await sqlite_db.check_monthly_hours(ym)
+    check_month = time.perf_counter() - started
+    started = time.perf_counter()
+    diffs_all = await sqlite_db.check_monthly_hours()
+    check_all = time.perf_counter() - started
+    started = time.perf_counter()
+    rows = await sqlite_db.rebuild_monthly_hours()
+    rebuild = time.perf_counter() - started
+    await sqlite_db.sql_stop()
+    return read, check_month, len(diffs), check_all, len(diffs_all), rebuild, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--waiters", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hours.db")
+        seed(path, args.years, args.waiters)
+        ym = (date.today() - timedelta(days=40)).strftime("%Y-%m")
+        first, last = sqlite_db._month_bounds(ym)
+
+        conn = sqlite3.connect(path)
+        raw = _timed(lambda: conn.execute(RAW_MONTH, {"first": first, "last": last, "rate": 140.0}).fetchall(),
+                     args.repeat)
+        conn.close()
+        read, check_month, diffs, check_all, diffs_all, rebuild, rows = asyncio.run(_summary(path, ym, args.repeat))
+        print(f"payroll for {ym}: raw CTE {raw * 1000:.2f} ms, monthly_hours {read * 1000:.2f} ms "
+              f"({raw / read:.0f}x)")
+
+        plain = os.path.join(tmp, "plain.db")
+        shutil.copyfile(path, plain)
+        conn = sqlite3.connect(plain)
+        for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_monthly_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.commit()
+        conn.close()
+        with_triggers = _writes(path, args.waiters, args.updates)
+        without = _writes(plain, args.waiters, args.updates)
+        print(f"hours update: {without * 1e6:.1f} us without triggers, {with_triggers * 1e6:.1f} us with "
+              f"(+{(with_triggers - without) * 1e6:.1f} us)")
+        print(f"check month {check_month * 1000:.1f} ms ({diffs} diffs), "
+              f"check all {check_all * 1000:.0f} ms ({diffs_all} diffs), rebuild all {rebuild * 1000:.0f} ms ({rows} rows)")
+
+        async def verify():
+            await sqlite_db.sql_start(path)
+            left = await sqlite_db.check_monthly_hours()
+            await sqlite_db.sql_stop()
+            return left
+
+        print(f"after {args.updates} trigger-maintained updates: {len(asyncio.run(verify()))} diffs")
+
+
+if __name__ == "__main__":
+    main()
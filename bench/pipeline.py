@@ -0,0 +1,130 @@
+"""
+Пропускная способность UpdatePipeline на поддельном Bot API (bench.mock_api).
+
+Каждый апдейт — сообщение с порядковым номером внутри чата; обработчик
+отвечает message.answer (один вызов API с задержкой --latency). Прогоняет
+long polling и webhook с разным числом воркеров, проверяет, что в каждом чате
+апдейты обработаны по порядку, и что остановка сразу после приёма
+дорабатывает все принятые апдейты.
+
+    python -m bench.pipeline --chats 200 --per-chat 5 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+import aiohttp
+from aiogram import Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+
+from app import pipeline as pl
+from bench.mock_api import MockTelegramAPI, message_update
+
+
+def _updates(chats: int, per_chat: int) -> list[dict]:
+    # Чаты вперемешку, как приходят апдейты в час пересменки
+    return [
+        message_update(seq * chats + chat + 1, chat_id=10_000 + chat, text=str(seq))
+        for seq in range(per_chat)
+        for chat in range(chats)
+    ]
+
+
+def _dispatcher(seen: dict, done: asyncio.Event, total: int) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        await message.answer(message.text)
+        seen[message.chat.id].append(int(message.text))
+        if sum(map(len, seen.values())) == total:
+            done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def _ordered(seen: dict) -> bool:
+    return all(seq == sorted(seq) for seq in seen.values())
+
+
+async def _polling(updates: list[dict], workers: int, latency: float) -> tuple[float, bool]:
+    api = MockTelegramAPI(latency)
+    bot = await api.start()
+    seen, done, stop = defaultdict(list), asyncio.Event(), asyncio.Event()
+    dp = _dispatcher(seen, done, len(updates))
+    api.push(*updates)
+    started = time.perf_counter()
+    runner = asyncio.create_task(pl.run_polling(dp, bot, workers, stop=stop))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await runner
+    await api.stop()
+    return len(updates) / elapsed, _ordered(seen)
+
+
+async def _webhook(updates: list[dict], workers: int, latency: float, stop_early: bool = False) -> tuple[float, bool, int]:
+    api = MockTelegramAPI(latency)
+    bot = await api.start()
+    seen, done = defaultdict(list), asyncio.Event()
+    dp = _dispatcher(seen, done, len(updates))
+    pipeline = pl.UpdatePipeline(dp, bot, workers)
+    runner = web.AppRunner(pl.webhook_app(pipeline, bot, secret=""), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}{pl.WEBHOOK_PATH}"
+    pipeline.start()
+
+    # Telegram держит до 40 одновременных соединений с вебхуком; апдейты одного чата — по одному
+    started = time.perf_counter()
+    connections = asyncio.Semaphore(40)
+    chat_locks = defaultdict(asyncio.Lock)
+    async with aiohttp.ClientSession() as session:
+        async def post(update):
+            async with chat_locks[update["message"]["chat"]["id"]], connections:
+                async with session.post(url, json=update) as resp:
+                    resp.raise_for_status()
+
+        await asyncio.gather(*(post(u) for u in updates))
+    if stop_early:
+        drained = await pipeline.drain()
+    else:
+        await done.wait()
+        drained = await pipeline.drain()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    await bot.session.close()
+    await api.stop()
+    handled = sum(map(len, seen.values()))
+    return len(updates) / elapsed, _ordered(seen) and drained, handled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--per-chat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка поддельного API, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    updates = _updates(args.chats, args.per_chat)
+
+    for workers in (1, 16, 64):
+        rate, ordered = asyncio.run(_polling(updates, workers, args.latency))
+        print(f"polling  workers={workers:<3} {rate:7.0f} updates/s  per-chat order kept: {ordered}")
+    for workers in (1, 16, 64):
+        rate, ordered, _ = asyncio.run(_webhook(updates, workers, args.latency))
+        print(f"webhook  workers={workers:<3} {rate:7.0f} updates/s  per-chat order kept: {ordered}")
+
+    _, ok, handled = asyncio.run(_webhook(updates, 16, args.latency, stop_early=True))
+    print(f"drain right after accepting: {handled} of {len(updates)} handled, in order: {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Проверка планов запросов sqlite_db на многолетней базе.
+
+Засеивает базу (по умолчанию 5 лет смен, часов и чаевых на 60 официантов),
+перехватывает SQL, который реально выполняют функции sqlite_db, и прогоняет
+каждый запрос через EXPLAIN QUERY PLAN. Если по shifts/work_hours/tips идёт
+полный проход (SCAN) вместо поиска по индексу (SEARCH) — выход с кодом 1.
+
+    python -m bench.query_plans --years 5 --waiters 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.database import sqlite_db
+
+# Таблицы, которые растут вместе с историей, и их алиасы в запросах sqlite_db
+# (SCAN по материализованному CTE вроде wh — это уже отфильтрованный месяц)
+BIG_TABLES = re.compile(r"^SCAN (shifts|work_hours|tips|s)\b")
+
+
+def seed(path: str, years: int, waiters: int):
+    """Заполняет базу синтетическими сменами, часами и чаевыми."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE employees (id INTEGER PRIMARY KEY AUTOINCREMENT, last_name TEXT NOT NULL,
+                                first_name TEXT NOT NULL, role TEXT NOT NULL, rate FLOAT);
+        CREATE TABLE waiters (id INTEGER PRIMARY KEY AUTOINCREMENT, tg_id INTEGER UNIQUE,
+                              name TEXT DEFAULT "", employee_id INTEGER);
+    """)
+    conn.executemany(
+        "INSERT INTO employees (last_name, first_name, role, rate) VALUES (?, ?, ?, ?)",
+        [(f"Фамилия{i}", f"Имя{i}", "ОФИЦИАНТЫ", 140.0) for i in range(waiters)],
+    )
+    conn.executemany(
+        "INSERT INTO waiters (tg_id, name, employee_id) VALUES (?, ?, ?)",
+        [(1000 + i, f"Официант {i}", i + 1 if i % 2 else None) for i in range(waiters)],
+    )
+    conn.commit()
+    conn.close()
+
+    # Остальные таблицы создаёт sql_start(), данные досыпаем после
+    asyncio.run(_create_schema(path))
+
+    start = date.today() - timedelta(days=365 * years)
+    days = [(start + timedelta(days=d)).isoformat() for d in range(365 * years)]
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO shifts (waiter_id, date, hours, tasks) VALUES (?, ?, ?, '')",
+        ((w, d, 8.0) for w in range(1, waiters + 1) for i, d in enumerate(days) if (i + w) % 3),
+    )
+    conn.executemany(
+        "INSERT INTO work_hours (employee_id, date, hours) VALUES (?, ?, ?)",
+        ((e, d, 6.0) for e in range(1, waiters + 1) for i, d in enumerate(days) if (i + e) % 4 == 0),
+    )
+    conn.executemany(
+        "INSERT INTO tips (waiter_id, date, amount) VALUES (?, ?, ?)",
+        ((w, d, 500.0) for w in range(1, waiters + 1) for i, d in enumerate(days) if (i + w) % 3),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def _create_schema(path: str):
+    await sqlite_db.sql_start(path)
+    await sqlite_db.sql_stop()
+
+
+async def capture(path: str) -> list[tuple[str, str]]:
+    """Вызывает функции sqlite_db и возвращает [(функция, выполненный SQL), ...]."""
+    await sqlite_db.sql_start(path)
+    statements: list[str] = []
+    for conn in sqlite_db.pool._opened:
+        await conn.set_trace_callback(statements.append)
+
+    ym = (date.today() - timedelta(days=40)).strftime("%Y-%m")
+    day = f"{ym}-15"
+    calls = [
+        ("get_shifts_for", sqlite_db.get_shifts_for(7)),
+        ("get_shifts_for_month", sqlite_db.get_shifts_for_month(7, *map(int, ym.split("-")))),
+        ("get_month_tips", sqlite_db.get_month_tips(7, ym)),
+        ("get_work_hours", sqlite_db.get_work_hours(4, day)),
+        ("get_work_hours_range", sqlite_db.get_work_hours_range(f"{ym}-01", day)),
+        ("get_month_hours_with_rate", sqlite_db.get_month_hours_with_rate(ym)),
+        ("clear_month_tips", sqlite_db.clear_month_tips(7, ym)),
+        ("clear_month_shifts", sqlite_db.clear_month_shifts(ym)),
+        ("clear_month_hours", sqlite_db.clear_month_hours(ym)),
+    ]
+    captured = []
+    for name, coro in calls:
+        statements.clear()
+        started = time.perf_counter()
+        await coro
+        elapsed = (time.perf_counter() - started) * 1000
+        for sql in statements:
+            if re.match(r"\s*(SELECT|WITH|UPDATE|DELETE)", sql, re.I):
+                captured.append((f"{name} ({elapsed:.1f} ms)", sql))
+    await sqlite_db.sql_stop()
+    return captured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--waiters", type=int, default=60)
+    args = parser.parse_args()
+    logging.getLogger("aiosqlite").setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plans.db")
+        seed(path, args.years, args.waiters)
+        captured = asyncio.run(capture(path))
+
+        conn = sqlite3.connect(path)
+        failures = 0
+        for name, sql in captured:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            bad = [line for line in plan if BIG_TABLES.match(line)]
+            failures += bool(bad)
+            print(f"{'FAIL' if bad else 'ok  '} {name}")
+            for line in plan:
+                print(f"       {line}")
+        conn.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Нагрузочный прогон настоящих роутеров бота: пересменка, когда сотни
+официантов одновременно открывают календарь, листают месяцы, вносят чаевые
+и проходят обучение.
+
+База засеивается многолетней историей (bench.query_plans.seed), апдейты
+идут через тот же диспетчер, что в main.py, и UpdatePipeline, а Bot API
+подменён локальным сервером bench.mock_api с задержкой --latency.
+Каждый официант начинает в случайный момент первых --ramp секунд и шлёт
+следующий апдейт через --think секунд.
+
+Печатает задержку обработчика (p50/p95/p99), полную задержку с ожиданием в
+очереди, пропускную способность и время в базе на апдейт — в целом и по
+типам апдейтов.
+
+    python -m bench.replay --waiters 300 --years 3 --latency 0.03 --workers 16 --think 1
+"""
+
+import argparse
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import date
+
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from app import pipeline as pl
+from app.database import sqlite_db
+from app.database.fsm_storage import SQLiteStorage
+from app.training.quiz import QUIZZES
+from bench.mock_api import MockTelegramAPI, callback_update, message_update
+from bench.query_plans import seed
+from main import build_dispatcher
+
+# [секунды в базе, число обращений] текущего апдейта
+_db_usage: contextvars.ContextVar[list | None] = contextvars.ContextVar("db_usage", default=None)
+
+
+def _session(tg_id: int, training: bool) -> list[tuple[str, str]]:
+    """Апдейты одного официанта по порядку: ("msg", текст) или ("cb", callback_data)."""
+    today = date.today()
+    prev_y, prev_m = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    steps = [
+        ("msg", "/menu"),
+        ("cb", "W_CALENDAR"),
+        ("cb", f"CAL_PREV|{today.year}|{today.month}"),
+        ("cb", f"CAL_NEXT|{prev_y}|{prev_m}"),
+        ("cb", f"CAL_DAY|{today.replace(day=1 + tg_id % 28).isoformat()}"),
+        ("cb", "W_MENU"),
+        ("cb", "TIPS_START"),
+        ("msg", str(500 + tg_id % 1000)),
+        ("cb", "W_MENU"),
+    ]
+    if training:
+        steps += [("cb", "ofik"), ("cb", "skip1")]
+        steps += [("cb", f"lesson{i}_next") for i in range(1, 6)]
+        steps.append(("cb", "start_test"))
+        quiz = QUIZZES["waiter"]
+        steps += [("cb", f"quiz:waiter:{q}:{tg_id % len(question.keyboard.inline_keyboard)}")
+                  for q, question in enumerate(quiz.questions)]
+    return steps
+
+
+def _label(kind: str, payload: str) -> str:
+    if kind == "msg":
+        return payload if payload.startswith("/") else "text"
+    return payload.split("|")[0].split(":")[0].rstrip("0123456789_") or payload
+
+
+def _instrument_pool(pool: sqlite_db.ConnectionPool):
+    """Считает время в базе на апдейт: чтения — внутри read(), записи — от постановки в очередь до COMMIT."""
+    read, submit = pool.read, pool.submit
+
+    @asynccontextmanager
+    async def timed_read():
+        usage = _db_usage.get()
+        started = time.perf_counter()
+        async with read() as db:
+            yield db
+        if usage is not None:
+            usage[0] += time.perf_counter() - started
+            usage[1] += 1
+
+    def timed_submit(op):
+        usage = _db_usage.get()
+        started = time.perf_counter()
+        fut = submit(op)
+        if usage is not None:
+            usage[1] += 1
+            fut.add_done_callback(lambda _: usage.__setitem__(0, usage[0] + time.perf_counter() - started))
+        return fut
+
+    pool.read, pool.submit = timed_read, timed_submit
+
+
+async def _replay(args, db_path: str, fsm_path: str) -> dict:
+    api = MockTelegramAPI(args.latency)
+    bot = await api.start()
+    storage = SQLiteStorage(fsm_path) if args.fsm == "sqlite" else MemoryStorage()
+    dp = build_dispatcher(storage)
+    await sqlite_db.sql_start(db_path)
+    _instrument_pool(sqlite_db.pool)
+
+    submitted: dict[int, float] = {}
+    samples: list[tuple[str, float, float, float, int]] = []  # label, handler, total, db, queries
+    labels: dict[int, str] = {}
+    done = asyncio.Event()
+
+    @dp.update.outer_middleware()
+    async def measure(handler, event, data):
+        usage = [0.0, 0]
+        token = _db_usage.set(usage)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            finished = time.perf_counter()
+            _db_usage.reset(token)
+            samples.append((labels[event.update_id], finished - started,
+                            finished - submitted[event.update_id], usage[0], usage[1]))
+            if len(samples) == len(submitted) and sending_done:
+                done.set()
+
+    rnd = random.Random(1)
+    schedule = []
+    update_id = 0
+    for i in range(args.waiters):
+        tg_id = 1000 + i
+        start = rnd.uniform(0, args.ramp)
+        for k, (kind, payload) in enumerate(_session(tg_id, not args.no_training)):
+            update_id += 1
+            raw = message_update(update_id, tg_id, payload) if kind == "msg" else callback_update(update_id, tg_id, payload)
+            labels[update_id] = _label(kind, payload)
+            schedule.append((start + k * args.think, update_id, raw))
+    schedule.sort(key=lambda item: item[0])
+
+    pipeline = pl.UpdatePipeline(dp, bot, args.workers, max_pending=len(schedule))
+    pipeline.start()
+    sending_done = False
+    started = time.perf_counter()
+    for at, uid, raw in schedule:
+        delay = started + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        submitted[uid] = time.perf_counter()
+        await pipeline.submit(Update.model_validate(raw, context={"bot": bot}))
+    sending_done = True
+    if len(samples) < len(submitted):
+        await done.wait()
+    elapsed = time.perf_counter() - started
+
+    await pipeline.drain()
+    await storage.close()
+    await sqlite_db.sql_stop()
+    await bot.session.close()
+    await api.stop()
+    return {"samples": samples, "elapsed": elapsed, "api_calls": sum(api.calls.values())}
+
+
+def _pct(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        v = values[0] if values else 0.0
+        return v, v, v
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+def _report(result: dict):
+    samples = result["samples"]
+    ms = 1000
+    print(f"{len(samples)} updates in {result['elapsed']:.1f} s = {len(samples) / result['elapsed']:.0f} updates/s, "
+          f"{result['api_calls']} Bot API calls")
+    for title, idx in (("handler", 1), ("end-to-end", 2), ("db time", 3)):
+        p50, p95, p99 = _pct([s[idx] for s in samples])
+        print(f"  {title:<11} p50={p50 * ms:7.1f} ms  p95={p95 * ms:7.1f} ms  p99={p99 * ms:7.1f} ms")
+    print(f"  db queries per update: {statistics.fmean(s[4] for s in samples):.2f}")
+
+    by_label = defaultdict(list)
+    for s in samples:
+        by_label[s[0]].append(s)
+    print(f"\n  {'update':<12} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'db/upd':>8} {'q/upd':>6}")
+    for label, rows in sorted(by_label.items(), key=lambda item: -_pct([r[1] for r in item[1]])[1]):
+        p50, p95, p99 = _pct([r[1] for r in rows])
+        db_ms = statistics.fmean(r[3] for r in rows) * ms
+        queries = statistics.fmean(r[4] for r in rows)
+        print(f"  {label:<12} {len(rows):>6} {p50 * ms:7.1f}ms {p95 * ms:7.1f}ms {p99 * ms:7.1f}ms "
+              f"{db_ms:6.2f}ms {queries:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--waiters", type=int, default=300)
+    parser.add_argument("--years", type=int, default=3, help="лет истории в засеянной базе")
+    parser.add_argument("--workers", type=int, default=pl.UPDATE_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка поддельного Bot API, с")
+    parser.add_argument("--ramp", type=float, default=5.0, help="за сколько секунд подключаются все официанты")
+    parser.add_argument("--think", type=float, default=1.0, help="пауза официанта между апдейтами, с")
+    parser.add_argument("--fsm", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--no-training", action="store_true", help="только календарь и чаевые")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, force=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "replay.db")
+        started = time.perf_counter()
+        seed(db_path, args.years, args.waiters)
+        print(f"seeded {args.years} years for {args.waiters} waiters in {time.perf_counter() - started:.1f} s")
+        _report(asyncio.run(_replay(args, db_path, os.path.join(tmp, "fsm.db"))))
+
+
+if __name__ == "__main__":
+    main()
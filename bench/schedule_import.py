@@ -0,0 +1,125 @@
+"""
+Загрузка графика из таблицы (app/schedule_import.py) против поштучных add_shift/set_shift_hours.
+
+Строит таблицу сотрудники × дни месяца (по умолчанию 330 × 31 ≈ 10 000 ячеек)
+в xlsx и CSV, засеивает официантов с такими именами и замеряет prepare (чтение
+в read-only режиме, проверка, разрешение имён, предпросмотр) и apply
+(executemany одной транзакцией). Для сравнения — прежний путь: на каждую
+ячейку add_shift + set_shift_hours, каждый со своим COMMIT (на выборке,
+пересчитано на всю таблицу).
+
+    python -m bench.schedule_import --staff 330 --sample 300
+"""
+
+import argparse
+import asyncio
+import calendar
+import csv
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date
+
+from openpyxl import Workbook
+
+from app import schedule_import
+from app.database import sqlite_db
+
+
+def _grid(staff: int, year: int, month: int) -> tuple[list, list[list]]:
+    days = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+    header = ["ФИО"] + [d.strftime("%d.%m") for d in days] + ["Ставка"]
+    rows = []
+    for i in range(staff):
+        cells = [(8 + i % 4) if (i + d.day) % 3 else "зал" for d in days]
+        rows.append([f"Фамилия{i} Имя{i}"] + cells + [140])
+    return header, rows
+
+
+def write_files(tmp: str, staff: int, year: int, month: int) -> tuple[str, str, int]:
+    header, rows = _grid(staff, year, month)
+    xlsx, csv_path = os.path.join(tmp, "schedule.xlsx"), os.path.join(tmp, "schedule.csv")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(xlsx)
+    with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(header)
+        writer.writerows(rows)
+    return xlsx, csv_path, staff * (len(header) - 2)
+
+
+def seed(path: str, staff: int):
+    async def schema():
+        await sqlite_db.sql_start(path)
+        await sqlite_db.sql_stop()
+
+    asyncio.run(schema())
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO employees (last_name, first_name, role, rate) VALUES (?, ?, 'ОФИЦИАНТЫ', 140.0)",
+        ((f"Фамилия{i}", f"Имя{i}") for i in range(staff)),
+    )
+    conn.executemany(
+        "INSERT INTO waiters (tg_id, name, employee_id) VALUES (?, '', ?)",
+        ((1000 + i, i + 1) for i in range(staff)),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run(path: str, files: dict[str, str], year: int, sample: int) -> list[tuple[str, float, str]]:
+    await sqlite_db.sql_start(path)
+    results = []
+    for fmt, file in files.items():
+        started = time.perf_counter()
+        plan = await schedule_import.prepare(file, year)
+        prepared = time.perf_counter() - started
+        assert not plan.errors, plan.errors[:3]
+        started = time.perf_counter()
+        rows = await schedule_import.apply(plan)
+        applied = time.perf_counter() - started
+        results.append((f"{fmt} prepare", prepared, f"{plan.counts['new']} new, {plan.counts['changed']} changed, "
+                                                    f"{plan.counts['same']} same"))
+        results.append((f"{fmt} apply", applied, f"{rows} rows"))
+
+    # Прежний путь: две записи с COMMIT на каждую ячейку
+    plan = await schedule_import.prepare(files["xlsx"], year)
+    cells = plan.shift_hours[:sample]
+    started = time.perf_counter()
+    for waiter_id, day, hours in cells:
+        await sqlite_db.add_shift(waiter_id, day)
+        await sqlite_db.set_shift_hours(waiter_id, day, hours)
+    per_cell = (time.perf_counter() - started) / len(cells)
+    results.append(("per-cell add_shift+set_shift_hours", per_cell * plan.rows,
+                    f"extrapolated from {len(cells)} cells"))
+    left = await sqlite_db.check_monthly_hours()
+    await sqlite_db.sql_stop()
+    results.append(("monthly_hours diffs after import", 0.0, str(len(left))))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--staff", type=int, default=330)
+    parser.add_argument("--sample", type=int, default=300, help="ячеек для поштучного пути")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx, csv_path, cells = write_files(tmp, args.staff, today.year, today.month)
+        path = os.path.join(tmp, "import.db")
+        seed(path, args.staff)
+        print(f"{cells} cells, xlsx {os.path.getsize(xlsx) / 1024:.0f}KB\n")
+        for name, seconds, note in asyncio.run(run(path, {"xlsx": xlsx, "csv": csv_path}, today.year, args.sample)):
+            print(f"{name:<36} {seconds * 1000:9.1f} ms  {note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Профиль запросов sqlite_db на многолетней базе (QUERY_PROFILE=1, app/database/profiler.py).
+
+Засеивает базу как bench.query_plans, добавляет журнал стартов и результаты
+тестов, вызывает тяжёлые функции (месячная зарплата, выгрузка смен,
+результаты тестов) и горячие функции календаря, затем печатает сводку —
+то же, что /slow_queries в админке, — и выражения с полным проходом по таблице.
+
+    python -m bench.slow_queries --years 5 --waiters 60 --slow-ms 20
+"""
+
+import os
+
+# Профилирование включается при импорте sqlite_db
+os.environ.setdefault("QUERY_PROFILE", "1")
+
+import argparse
+import asyncio
+import logging
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+
+from app.database import sqlite_db
+from app.database.profiler import profiler
+from bench.query_plans import seed
+
+
+def _seed_people(path: str, waiters: int, starts: int):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users_start (tg_id, username, start_date) VALUES (?, ?, '2024-01-01 10:00:00')",
+        ((1000 + i % (waiters * 20), f"user{i}") for i in range(starts)),
+    )
+    conn.executemany(
+        "INSERT INTO test_results (tg_id, score, total, timestamp) VALUES (?, ?, 18, '2024-01-01 10:00:00')",
+        ((1000 + i, i % 19) for i in range(waiters * 10)),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _workload(path: str, waiters: int):
+    await sqlite_db.sql_start(path)
+    ym = (date.today() - timedelta(days=40)).strftime("%Y-%m")
+    today = date.today()
+    for _ in range(3):
+        await sqlite_db.get_month_hours_with_rate(ym)
+        await sqlite_db.get_all_shifts()
+        await sqlite_db.get_all_test_results_with_username()
+        await sqlite_db.get_work_hours_range(f"{ym}-01", f"{ym}-28")
+    for w in range(1, waiters + 1):
+        sqlite_db.shift_month_cache.invalidate()
+        await sqlite_db.get_shifts_for_month(w, today.year, today.month)
+        await sqlite_db.get_month_tips(w, ym)
+    await sqlite_db.sql_stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--waiters", type=int, default=60)
+    parser.add_argument("--starts", type=int, default=50000, help="строк в журнале стартов")
+    parser.add_argument("--slow-ms", type=float, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    profiler.slow = args.slow_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.db")
+        seed(path, args.years, args.waiters)
+        _seed_people(path, args.waiters, args.starts)
+        profiler.reset()
+        asyncio.run(_workload(path, args.waiters))
+
+    print("\nTop statements by total time:")
+    print(profiler.report(8))
+    scans = [s for s in profiler.stats.values() if s.scans]
+    print(f"\nStatements with full table scans: {len(scans)}")
+    for s in scans:
+        print(f"  {s.sql[:120]}…  {'; '.join(s.scans)}")
+
+
+if __name__ == "__main__":
+    main()
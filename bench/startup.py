@@ -0,0 +1,71 @@
+"""
+Время старта sqlite_db на большой базе: холодный старт (все миграции),
+тёплый старт (схема актуальна) и то, что раньше делалось на каждом старте —
+полная проверка внешних ключей PRAGMA foreign_key_check.
+
+    python -m bench.startup --years 5 --waiters 60 --repeat 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from app.database import sqlite_db
+from bench.query_plans import seed
+
+
+async def _start_once(path: str) -> float:
+    started = time.perf_counter()
+    await sqlite_db.sql_start(path)
+    elapsed = time.perf_counter() - started
+    await sqlite_db.sql_stop()
+    return elapsed
+
+
+def _reset_version(path: str):
+    """Делает вид, что база создана до появления миграций."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+
+def _fk_check(path: str) -> float:
+    conn = sqlite3.connect(path)
+    started = time.perf_counter()
+    conn.execute("PRAGMA foreign_key_check").fetchall()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--waiters", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("aiosqlite").setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.db")
+        seed(path, args.years, args.waiters)
+        size_mb = os.path.getsize(path) / 2**20
+
+        _reset_version(path)
+        cold = asyncio.run(_start_once(path))
+        warm = [asyncio.run(_start_once(path)) for _ in range(args.repeat)]
+        fk = [_fk_check(path) for _ in range(args.repeat)]
+
+    print(f"database            {size_mb:8.1f} MB")
+    print(f"cold start          {cold * 1000:8.1f} ms  (migrations 1..{len(sqlite_db.migrations.MIGRATIONS)})")
+    print(f"warm start (median) {statistics.median(warm) * 1000:8.1f} ms")
+    print(f"foreign_key_check   {statistics.median(fk) * 1000:8.1f} ms  (paid on every start before)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Потоковая конвертация video note против пути через диск на больших синтетических роликах.
+
+Для каждого ролика в отдельном процессе (чтобы ru_maxrss был честным):
+  stream — байты читаются кусками (как при скачивании), идут в stdin ffmpeg,
+           выход читается из stdout кусками (как при загрузке);
+  file   — «скачивание» во временный файл, ffmpeg в другой файл, чтение результата.
+Печатает пиковый RSS процесса бота, пиковый RSS ffmpeg и байты на временном диске.
+Нужен ffmpeg в PATH (или FFMPEG_BIN).
+
+    python -m bench.stream_rss --seconds 15,60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.video_converter import FFMPEG, Transcoder
+
+CHUNK = 1 << 16
+
+
+def make_input(path: str, seconds: int):
+    """Синтетический 720p-ролик с высоким битрейтом; moov в начале, чтобы читался из пайпа."""
+    subprocess.run([
+        FFMPEG, "-v", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440",
+        "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "8M",
+        "-c:a", "aac", "-movflags", "+faststart", path,
+    ], check=True)
+
+
+async def _file_chunks(path: str):
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            yield chunk
+            await asyncio.sleep(0)
+
+
+async def run_stream(src: str, tmp: str) -> dict:
+    out = 0
+    async for chunk in Transcoder(workers=1).stream(_file_chunks(src)):
+        out += len(chunk)
+    return {"out_bytes": out, "tmp_bytes": 0}
+
+
+async def run_file(src: str, tmp: str) -> dict:
+    downloaded = shutil.copyfile(src, os.path.join(tmp, "download.mp4"))
+    result = await Transcoder(workers=1, tmp_dir=tmp).convert(downloaded)
+    tmp_bytes = os.path.getsize(downloaded) + os.path.getsize(result)
+    out = 0
+    async for chunk in _file_chunks(result):
+        out += len(chunk)
+    return {"out_bytes": out, "tmp_bytes": tmp_bytes}
+
+
+def child(mode: str, src: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        result = asyncio.run({"stream": run_stream, "file": run_file}[mode](src, tmp))
+    result["elapsed"] = time.perf_counter() - started
+    result["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result["ffmpeg_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", default="15,60", help="длины синтетических роликов через запятую")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SRC"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'input':>10} {'mode':<7} {'bot RSS':>9} {'ffmpeg RSS':>11} {'temp disk':>10} {'output':>9} {'time':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in map(int, args.seconds.split(",")):
+            src = os.path.join(tmp, f"synthetic-{seconds}s.mp4")
+            make_input(src, seconds)
+            size_mb = os.path.getsize(src) / 2**20
+            for mode in ("stream", "file"):
+                proc = subprocess.run([sys.executable, "-m", "bench.stream_rss", "--child", mode, src],
+                                      check=True, capture_output=True, text=True)
+                r = json.loads(proc.stdout.strip().splitlines()[-1])
+                print(f"{size_mb:8.1f}MB {mode:<7} {r['rss_mb']:7.1f}MB {r['ffmpeg_rss_mb']:9.1f}MB "
+                      f"{r['tmp_bytes'] / 2**20:8.1f}MB {r['out_bytes'] / 2**20:7.1f}MB {r['elapsed']:6.1f}s")
+
+
+if __name__ == "__main__":
+    main()
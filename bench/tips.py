@@ -0,0 +1,90 @@
+"""
+Итоги чаевых из monthly_tips против SUM по tips на чтении.
+
+Засеивает многолетнюю базу (bench.query_plans.seed) и сравнивает:
+  - путь tips_save: прежний add_tip + SUM(amount) за месяц против add_tip,
+    который возвращает итог из той же транзакции;
+  - рейтинг за месяц и отчёт за год: GROUP BY по tips против итогов monthly_tips.
+
+    python -m bench.tips --years 5 --waiters 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.database import sqlite_db
+from bench.query_plans import seed
+
+RAW_MONTH = "SELECT COALESCE(SUM(amount), 0) FROM tips WHERE waiter_id = ? AND date BETWEEN ? AND ?"
+RAW_REPORT = """
+    SELECT COALESCE(e.first_name || ' ' || e.last_name, NULLIF(w.name, ''), 'Без имени') AS name,
+           SUM(t.amount) AS total, COUNT(*) AS days
+    FROM tips t
+    JOIN waiters w ON w.id = t.waiter_id
+    LEFT JOIN employees e ON e.id = w.employee_id
+    WHERE t.date BETWEEN ? AND ?
+    GROUP BY t.waiter_id
+    ORDER BY total DESC
+"""
+
+
+async def _per_call(calls: int, make) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        await make(i)
+    return (time.perf_counter() - started) / calls * 1000
+
+
+async def run(path: str, waiters: int, calls: int):
+    await sqlite_db.sql_start(path)
+    today = date.today()
+    ym = today.strftime("%Y-%m")
+    first, last = sqlite_db._month_bounds(ym)
+    year_from = (today - timedelta(days=365)).strftime("%Y-%m")
+
+    async def old_save(i):
+        w = 1 + i % waiters
+        await sqlite_db.add_tip(w, today.isoformat(), float(i))
+        await sqlite_db._fetchone(RAW_MONTH, (w, first, last))
+
+    async def new_save(i):
+        await sqlite_db.add_tip(1 + i % waiters, today.isoformat(), float(i))
+
+    results = {
+        "tips_save: add_tip + SUM": await _per_call(calls, old_save),
+        "tips_save: add_tip total": await _per_call(calls, new_save),
+        "month leaderboard: GROUP BY tips": await _per_call(
+            calls, lambda i: sqlite_db._fetchall(RAW_REPORT + " LIMIT 10", (first, last))),
+        "month leaderboard: monthly_tips": await _per_call(
+            calls, lambda i: sqlite_db.get_tips_leaderboard(ym)),
+        "year report: GROUP BY tips": await _per_call(
+            max(1, calls // 10), lambda i: sqlite_db._fetchall(RAW_REPORT, (f"{year_from}-01", last))),
+        "year report: monthly_tips": await _per_call(
+            calls, lambda i: sqlite_db.get_tips_report(year_from, ym)),
+    }
+    await sqlite_db.sql_stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--waiters", type=int, default=60)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tips.db")
+        seed(path, args.years, args.waiters)
+        for name, ms in asyncio.run(run(path, args.waiters, args.calls)).items():
+            print(f"{name:<36} {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
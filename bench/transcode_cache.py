@@ -0,0 +1,56 @@
+"""
+Кэш готовых video note: первая конвертация (ffmpeg), повтор того же ролика
+(из кэша) и N одновременных запросов одного нового ролика (один ffmpeg на всех).
+Нужен ffmpeg в PATH (или FFMPEG_BIN).
+
+    python -m bench.transcode_cache --input imge/startof.mp4 --repeat 20 --concurrent 5
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.video_converter import TranscodeCache, Transcoder
+
+
+async def _timed(cache: TranscodeCache, src: str, size: int) -> float:
+    started = time.perf_counter()
+    async with cache.converted(src, size):
+        pass
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", default="imge/startof.mp4")
+    parser.add_argument("--size", type=int, default=240)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--concurrent", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranscodeCache(Transcoder(tmp_dir=tmp), os.path.join(tmp, "cache"))
+
+        miss = await _timed(cache, args.input, args.size)
+        hits = [await _timed(cache, args.input, args.size) for _ in range(args.repeat)]
+
+        # тот же ролик под другим именем, но другой размер — новый ключ
+        other = shutil.copy(args.input, os.path.join(tmp, "copy.mp4"))
+        started = time.perf_counter()
+        await asyncio.gather(*(_timed(cache, other, args.size + 16) for _ in range(args.concurrent)))
+        together = time.perf_counter() - started
+
+        stats = cache.stats()
+
+    print(f"first conversion      {miss * 1000:9.1f} ms  (ffmpeg)")
+    print(f"repeat (median)       {statistics.median(hits) * 1000:9.1f} ms  (cache hit, x{args.repeat})")
+    print(f"{args.concurrent} concurrent, new key {together * 1000:9.1f} ms  (misses+joined = 1+{stats['joined']})")
+    print(f"stats                 {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
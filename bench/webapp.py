@@ -0,0 +1,137 @@
+"""
+Нагрузочный прогон API мини-приложения (app/webapp.py) через WSGI-клиент Werkzeug.
+
+Засеивает многолетнюю базу (bench.query_plans.seed), подписывает initData для
+каждого официанта тем же HMAC, что и Telegram, и в нескольких потоках гоняет
+GET /api/schedule за текущий месяц:
+  cold  — кэш ответов выключен, каждый запрос читает базу через пул;
+  warm  — кэш включён, тело отдаётся из памяти;
+  304   — клиент присылает If-None-Match, тело не передаётся.
+Для сравнения — прежний путь экрана месяца в чате: get_waiter_id_by_tg,
+get_shifts_for_month и get_month_tips через асинхронный пул бота
+(без учёта сетевых round trip до Telegram, которых там по одному на экран).
+
+    python -m bench.webapp --years 3 --waiters 60 --threads 8 --requests 4000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+from urllib.parse import urlencode
+
+from app import webapp
+from app.database import sqlite_db
+from bench.query_plans import seed
+
+TOKEN = "123456:bench-token"
+
+
+def sign_init_data(token: str, tg_id: int) -> str:
+    """initData, подписанная как в Telegram WebApp."""
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": f"bench{tg_id}",
+        "user": json.dumps({"id": tg_id, "first_name": f"Официант {tg_id}"}, ensure_ascii=False),
+    }
+    check = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def load(app, users: list[str], threads: int, requests: int, conditional: bool) -> tuple[float, list[float]]:
+    """requests запросов в threads потоках; (секунд всего, задержки в секундах)."""
+    latencies: list[float] = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker(n: int):
+        client = app.test_client()
+        etags: dict[str, str] = {}
+        mine = []
+        for i in range(per_thread):
+            auth = users[(n * per_thread + i) % len(users)]
+            headers = {"Authorization": f"tma {auth}"}
+            if conditional and auth in etags:
+                headers["If-None-Match"] = etags[auth]
+            started = time.perf_counter()
+            response = client.get("/api/schedule", headers=headers)
+            mine.append(time.perf_counter() - started)
+            assert response.status_code in (200, 304), response.status_code
+            etags[auth] = response.headers["ETag"]
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - started, latencies
+
+
+async def chat_path(path: str, waiters: int, calls: int) -> float:
+    await sqlite_db.sql_start(path)
+    today = date.today()
+    ym = today.strftime("%Y-%m")
+    started = time.perf_counter()
+    for i in range(calls):
+        waiter_id = await sqlite_db.get_waiter_id_by_tg(1000 + i % waiters)
+        sqlite_db.shift_month_cache.invalidate()
+        await sqlite_db.get_shifts_for_month(waiter_id, today.year, today.month)
+        await sqlite_db.get_month_tips(waiter_id, ym)
+    elapsed = (time.perf_counter() - started) / calls
+    await sqlite_db.sql_stop()
+    return elapsed
+
+
+def _report(name: str, elapsed: float, latencies: list[float]):
+    ms = sorted(x * 1000 for x in latencies)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(f"{name:<22} {len(ms) / elapsed:8.0f} req/s  p50 {statistics.median(ms):6.2f} ms  p95 {p95:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--waiters", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "webapp.db")
+        seed(path, args.years, args.waiters)
+        users = [sign_init_data(TOKEN, 1000 + i) for i in range(args.waiters)]
+
+        for name, ttl, conditional in (("cold (no cache)", "0", False), ("warm cache", "60", False),
+                                       ("If-None-Match → 304", "60", True)):
+            os.environ["WEBAPP_CACHE_TTL"] = ttl
+            app = webapp.create_app(path, TOKEN)
+            elapsed, latencies = load(app, users, args.threads, args.requests, conditional)
+            _report(name, elapsed, latencies)
+            app.extensions["schedule_pool"].close()
+
+        client = webapp.create_app(path, TOKEN).test_client()
+        response = client.get("/api/schedule", headers={"Authorization": f"tma {users[1]}"})
+        print(f"\nresponse {len(response.data)} B, ETag {response.headers['ETag']}")
+        bad = client.get("/api/schedule", headers={"Authorization": f"tma {users[1]}0"})
+        print(f"tampered initData → {bad.status_code}")
+
+        per_screen = asyncio.run(chat_path(path, args.waiters, args.requests // 4))
+        print(f"chat path: 3 pool queries per screen {per_screen * 1000:.2f} ms (single task, no Telegram RTT)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-import asyncioimport loggingimport osfrom aiogram import Bot, Dispatcherfrom dotenv import load_dotenvfrom app.admin import adminfrom app.calendar_router import calendar_routerfrom app.database import sqlite_dbfrom app.database.sqlite_db import SQLfrom app.handler import routerfrom app.training.offteach import waiterfrom app.training.posyda import posydafrom app.training.povar import povarasync def main():    load_dotenv()    dp = Dispatcher()    bot = Bot(token=os.getenv('TOKEN'))    dp.include_routers(router, calendar_router, waiter, povar, posyda, admin, SQL)    # dp.startup.register(on_startup)    sqlite_db.sql_start()    await dp.start_polling(bot)# async def startup(dispatcher: Dispatcher):#     await sql_start_command()#     print('Starting up...')if __name__ == '__main__':    logging.basicConfig(level=logging.INFO)  # Подключение логирования    try:        asyncio.run(main())    except KeyboardInterrupt:        print('Бот выключен')
\ No newline at end of file
+import asyncioimport loggingimport osfrom aiogram import Bot, Dispatcherfrom aiogram.fsm.storage.base import BaseStoragefrom dotenv import load_dotenv# До импорта app.*: настройки модулей (BOT_MODE, FSM_STORAGE, DB_PATH, ...) читаются при импортеload_dotenv()from app import metricsfrom app.admin import adminfrom app.calendar_router import calendar_routerfrom app.database import sqlite_dbfrom app.database.fsm_storage import make_isolation, make_storagefrom app.database.sqlite_db import SQLfrom app.handler import routerfrom app.pipeline import runfrom app.training.offteach import waiterfrom app.training.posyda import posydafrom app.training.povar import povarfrom app.training.quiz import quizdef build_dispatcher(storage: BaseStorage | None = None) -> Dispatcher:    """Диспетчер со всеми роутерами бота (роутер можно подключить только к одному диспетчеру)."""    storage = storage or make_storage()    dp = Dispatcher(storage=storage, events_isolation=make_isolation(storage))    dp.include_routers(router, calendar_router, waiter, quiz, povar, posyda, admin, SQL)    return dpasync def main():    dp = build_dispatcher()    stop_metrics = await metrics.setup(dp)  # METRICS=1    bot = Bot(token=os.getenv('TOKEN'))    # dp.startup.register(on_startup)    await sqlite_db.sql_start()    try:        await run(dp, bot)  # BOT_MODE=polling | webhook    finally:        await stop_metrics()        await dp.storage.close()        await dp.fsm.events_isolation.close()        await sqlite_db.sql_stop()# async def startup(dispatcher: Dispatcher):#     await sql_start_command()#     print('Starting up...')if __name__ == '__main__':    logging.basicConfig(level=logging.INFO)  # Подключение логирования    try:        asyncio.run(main())    except KeyboardInterrupt:        print('Бот выключен')
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+SQLiteStorage: отложенная запись одной строкой, переживание перезапуска,
+изменения во время flush, срок жизни сессий и запрет второго процесса.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from app.database.fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+def _storage(path, **kwargs) -> SQLiteStorage:
+    # Фоновый flush не мешает: тесты зовут flush() сами
+    return SQLiteStorage(str(path), flush_interval=3600, **kwargs)
+
+
+def _rows(path) -> list[tuple]:
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("SELECT state, data FROM fsm").fetchall()
+    finally:
+        conn.close()
+
+
+def test_state_and_data_are_one_row_write(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def scenario():
+        storage = _storage(path)
+        statements: list[str] = []
+        try:
+            await storage.get_state(KEY)
+            for conn in storage._pool._opened:
+                await conn.set_trace_callback(statements.append)
+            await storage.set_state(KEY, "Quiz:answer")
+            await storage.update_data(KEY, {"question": 1})
+            await storage.update_data(KEY, {"score": 2})
+            await storage.flush()
+        finally:
+            await storage.close()
+        return [sql for sql in statements if "INSERT INTO fsm" in sql]
+
+    assert len(asyncio.run(scenario())) == 1
+    assert _rows(path) == [("Quiz:answer", '{"question": 1, "score": 2}')]
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def scenario():
+        storage = _storage(path)
+        await storage.set_state(KEY, "Quiz:answer")
+        await storage.set_data(KEY, {"name": "Аня"})
+        await storage.close()  # close сам сбрасывает несохранённое
+
+        restarted = _storage(path)
+        try:
+            return await restarted.get_state(KEY), await restarted.get_data(KEY)
+        finally:
+            await restarted.close()
+
+    assert asyncio.run(scenario()) == ("Quiz:answer", {"name": "Аня"})
+
+
+def test_write_during_flush_stays_dirty(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def scenario():
+        storage = _storage(path)
+        try:
+            await storage.set_data(KEY, {"n": 1})
+            transaction = storage._pool.transaction
+
+            async def interleaved(op):
+                # Обработчик успевает изменить ключ, пока пачка пишется
+                await storage.set_data(KEY, {"n": 2})
+                return await transaction(op)
+
+            storage._pool.transaction = interleaved
+            await storage.flush()
+            storage._pool.transaction = transaction
+            assert _rows(path) == [(None, '{"n": 1}')]
+            k = storage.key_builder.build(KEY)
+            assert storage._cache[k].dirty and k in storage._dirty
+
+            await storage.flush()
+            assert not storage._cache[k].dirty
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
+    assert _rows(path) == [(None, '{"n": 2}')]
+
+
+def test_sessions_expire_after_ttl(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def scenario():
+        storage = _storage(path, ttl=0.2)
+        try:
+            await storage.set_state(KEY, "Quiz:answer")
+            await storage.flush()
+            assert await storage.get_state(KEY) == "Quiz:answer"
+            await asyncio.sleep(0.3)
+            assert await storage.get_state(KEY) is None
+            assert await storage.purge() == 1
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
+    assert _rows(path) == []
+
+
+def test_second_process_on_same_file_is_refused(tmp_path):
+    path = tmp_path / "fsm.db"
+
+    async def scenario():
+        first = _storage(path)
+        second = _storage(path)
+        try:
+            await first.get_state(KEY)
+            with pytest.raises(RuntimeError, match="single-process"):
+                await second.get_state(KEY)
+        finally:
+            await first.close()
+        # Файл освобождён — теперь открывается
+        try:
+            assert await second.get_state(KEY) is None
+        finally:
+            await second.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+"""
+Кэш идентичностей sqlite_db: каждая запись в waiters/employees сбрасывает
+ровно то, что закэшировано, а попадания, промахи и размер видны в /metrics.
+"""
+
+import asyncio
+
+from app import metrics
+from app.database import sqlite_db
+
+
+def test_writes_invalidate_identity_cache(tmp_path):
+    async def scenario():
+        await sqlite_db.sql_start(str(tmp_path / "identity.db"))
+        try:
+            # Отсутствующий официант кэшируется как None — до add_waiter
+            assert await sqlite_db.get_waiter_by_tg(100) is None
+            await sqlite_db.add_waiter(100)
+            waiter_id = await sqlite_db.get_waiter_id_by_tg(100)
+            assert waiter_id is not None
+
+            await sqlite_db.set_waiter_name(100, "Аня")
+            assert tuple(await sqlite_db.get_waiter_by_tg(100)) == (waiter_id, "Аня")
+
+            assert await sqlite_db.get_employees_with_shifts() == [(f"W{waiter_id}", "Аня")]
+            employee_id = await sqlite_db.add_employee("Иванова", "Анна", "ОФИЦИАНТЫ")
+            assert await sqlite_db.get_employees_with_shifts() == [(f"W{waiter_id}", "Аня"),
+                                                                   (f"E{employee_id}", "Анна Иванова")]
+
+            assert await sqlite_db.get_employee_id_for_waiter(waiter_id) is None
+            await sqlite_db.link_waiter_employee(waiter_id, employee_id)
+            assert await sqlite_db.get_employee_id_for_waiter(waiter_id) == employee_id
+            assert await sqlite_db.get_employees_with_shifts() == [(f"W{waiter_id}", "Анна Иванова")]
+
+            # Без записей — из кэша, без промаха
+            misses = sqlite_db.identity_cache.misses
+            await sqlite_db.get_waiter_id_by_tg(100)
+            await sqlite_db.get_employee_id_for_waiter(waiter_id)
+            assert sqlite_db.identity_cache.misses == misses
+
+            await sqlite_db.link_waiter_employee(waiter_id, None)
+            assert await sqlite_db.get_employee_id_for_waiter(waiter_id) is None
+        finally:
+            await sqlite_db.sql_stop()
+
+    asyncio.run(scenario())
+
+    stats = sqlite_db.identity_cache.stats()
+    rendered = metrics.registry.render()
+    assert f'bot_cache_hits_total{{cache="identity"}} {stats["hits"]}' in rendered
+    assert f'bot_cache_misses_total{{cache="identity"}} {stats["misses"]}' in rendered
+    assert f'bot_cache_size{{cache="identity"}} {stats["size"]}' in rendered
@@ -0,0 +1,94 @@
+"""
+Сводка monthly_hours, которую ведут триггеры, совпадает с прежним пересчётом
+ведомости из сырых строк — в том числе для сотрудников с нулём часов.
+"""
+
+import asyncio
+import random
+import sqlite3
+
+import aiosqlite
+
+from app.database import migrations
+
+YM = "2025-03"
+
+# Прежний get_month_hours_with_rate: сотрудник в ведомости, если за месяц есть хоть одна строка
+RAW_MONTH = """
+    WITH wh AS (
+        SELECT employee_id, date, hours FROM work_hours WHERE date BETWEEN :first AND :last
+    ),
+    sh AS (
+        SELECT w.employee_id, s.date, s.hours
+        FROM shifts s
+        JOIN waiters w ON w.id = s.waiter_id
+        WHERE s.date BETWEEN :first AND :last
+          AND w.employee_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM wh WHERE wh.employee_id = w.employee_id AND wh.date = s.date)
+    ),
+    unioned AS (SELECT * FROM wh UNION ALL SELECT * FROM sh)
+    SELECT employee_id, ROUND(SUM(hours), 6) FROM unioned GROUP BY employee_id ORDER BY employee_id
+"""
+SUMMARY = """
+    SELECT employee_id, ROUND(hours, 6) FROM monthly_hours
+    WHERE ym = :ym AND entries > 0 ORDER BY employee_id
+"""
+
+
+async def _migrate(path: str):
+    async with aiosqlite.connect(path) as db:
+        await migrations.migrate(db)
+        await db.commit()
+
+
+def _assert_same(conn):
+    params = {"first": f"{YM}-01", "last": f"{YM}-31", "ym": YM}
+    assert conn.execute(SUMMARY, params).fetchall() == conn.execute(RAW_MONTH, params).fetchall()
+
+
+def test_summary_matches_raw_payroll(tmp_path):
+    path = str(tmp_path / "hours.db")
+    asyncio.run(_migrate(path))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO employees (last_name, first_name, role) VALUES (?, ?, 'ОФИЦИАНТЫ')",
+                     [(f"Ф{i}", f"И{i}") for i in range(6)])
+    conn.executemany("INSERT INTO waiters (tg_id, employee_id) VALUES (?, ?)",
+                     [(100 + i, i + 1 if i < 4 else None) for i in range(8)])
+    rnd = random.Random(7)
+    days = [f"{YM}-{d:02d}" for d in range(1, 6)]
+    for _ in range(600):
+        op = rnd.randrange(6)
+        day = rnd.choice(days)
+        hours = rnd.choice([0, 0, 4, 6.5, 8])
+        if op == 0:
+            conn.execute("INSERT INTO shifts (waiter_id, date, hours) VALUES (?, ?, ?) "
+                         "ON CONFLICT(waiter_id, date) DO UPDATE SET hours = excluded.hours",
+                         (rnd.randint(1, 8), day, hours))
+        elif op == 1:
+            conn.execute("INSERT INTO work_hours (employee_id, date, hours) VALUES (?, ?, ?) "
+                         "ON CONFLICT(employee_id, date) DO UPDATE SET hours = excluded.hours",
+                         (rnd.randint(1, 6), day, hours))
+        elif op == 2:
+            conn.execute("DELETE FROM shifts WHERE waiter_id = ? AND date = ?", (rnd.randint(1, 8), day))
+        elif op == 3:
+            conn.execute("DELETE FROM work_hours WHERE employee_id = ? AND date = ?", (rnd.randint(1, 6), day))
+        elif op == 4:
+            conn.execute("UPDATE waiters SET employee_id = ? WHERE id = ?",
+                         (rnd.choice([None, 1, 2, 3, 4, 5, 6]), rnd.randint(1, 8)))
+        else:
+            conn.execute("UPDATE OR IGNORE work_hours SET date = ? WHERE employee_id = ? AND date = ?",
+                         (rnd.choice(days), rnd.randint(1, 6), day))
+        _assert_same(conn)
+    conn.close()
+
+
+def test_zero_hour_rows_stay_in_payroll(tmp_path):
+    path = str(tmp_path / "zero.db")
+    asyncio.run(_migrate(path))
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO employees (last_name, first_name, role) VALUES ('Ф', 'И', 'ПОВАР')")
+    conn.execute("INSERT INTO work_hours (employee_id, date, hours) VALUES (1, ?, 0)", (f"{YM}-02",))
+    assert conn.execute(SUMMARY, {"ym": YM}).fetchall() == [(1, 0.0)]
+    conn.execute("DELETE FROM work_hours")
+    assert conn.execute(SUMMARY, {"ym": YM}).fetchall() == []
+    conn.close()
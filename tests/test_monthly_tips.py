@@ -0,0 +1,66 @@
+"""
+Итоги monthly_tips, которые ведут триггеры m007, совпадают с SUM(amount) по tips
+после любых upsert, замен, очисток месяца и переносов дня.
+"""
+
+import asyncio
+import random
+import sqlite3
+
+import aiosqlite
+
+from app.database import migrations
+
+MONTHS = ("2025-02", "2025-03")
+
+RAW = """
+    SELECT substr(date, 1, 7), waiter_id, CAST(ROUND(SUM(amount) * 100) AS INTEGER), COUNT(*)
+    FROM tips GROUP BY 1, 2 ORDER BY 1, 2
+"""
+SUMMARY = "SELECT ym, waiter_id, amount_kop, days FROM monthly_tips WHERE days > 0 ORDER BY 1, 2"
+
+
+async def _migrate(path: str):
+    async with aiosqlite.connect(path) as db:
+        await migrations.migrate(db)
+        await db.commit()
+
+
+def _assert_same(conn):
+    assert conn.execute(SUMMARY).fetchall() == conn.execute(RAW).fetchall()
+    # Месяц, где чаевых не осталось, не должен хранить остаток суммы
+    assert conn.execute("SELECT COUNT(*) FROM monthly_tips WHERE days = 0 AND amount_kop <> 0").fetchone() == (0,)
+
+
+def test_summary_matches_raw_tips(tmp_path):
+    path = str(tmp_path / "tips.db")
+    asyncio.run(_migrate(path))
+    conn = sqlite3.connect(path)
+    rnd = random.Random(23)
+    days = [f"{ym}-{d:02d}" for ym in MONTHS for d in (1, 2, 15, 28)]
+    for _ in range(800):
+        op = rnd.randrange(5)
+        waiter_id, day = rnd.randint(1, 5), rnd.choice(days)
+        amount = rnd.choice([0, 100, 250.5, 1000, 33.33, 0.1])
+        if op == 0:
+            # add_tip
+            conn.execute("INSERT INTO tips (waiter_id, date, amount) VALUES (?, ?, ?) "
+                         "ON CONFLICT(waiter_id, date) DO UPDATE SET amount = excluded.amount",
+                         (waiter_id, day, amount))
+        elif op == 1:
+            # Замена суммы дня. Не INSERT OR REPLACE: без recursive_triggers он удаляет
+            # старую строку мимо триггера на DELETE — поэтому add_tip пишет через upsert
+            conn.execute("UPDATE tips SET amount = ? WHERE waiter_id = ? AND date = ?", (amount, waiter_id, day))
+        elif op == 2:
+            # clear_month_tips
+            ym = rnd.choice(MONTHS)
+            conn.execute("DELETE FROM tips WHERE waiter_id = ? AND date BETWEEN ? AND ?",
+                         (waiter_id, f"{ym}-01", f"{ym}-31"))
+        elif op == 3:
+            conn.execute("UPDATE OR IGNORE tips SET date = ? WHERE waiter_id = ? AND date = ?",
+                         (rnd.choice(days), waiter_id, day))
+        else:
+            conn.execute("UPDATE OR IGNORE tips SET waiter_id = ? WHERE waiter_id = ? AND date = ?",
+                         (rnd.randint(1, 5), waiter_id, day))
+        _assert_same(conn)
+    conn.close()
@@ -0,0 +1,154 @@
+"""
+UpdatePipeline на фейковом getUpdates: порядок внутри чата, параллельность
+между чатами, drain по таймауту и приём при зависшем обработчике.
+"""
+
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiogram.types import Message, Update
+
+from app import pipeline as pl
+
+
+def _update(update_id: int, chat_id: int, text: str = "") -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": 0, "text": text or str(update_id),
+                    "chat": {"id": chat_id, "type": "private"}},
+    })
+
+
+async def _until(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+def _run(handler, scenario):
+    """Диспетчер с одним обработчиком сообщений; scenario(dp, bot) — сам тест."""
+
+    async def main():
+        dp = Dispatcher()
+        dp.message()(handler)
+        bot = Bot("42:TEST")
+        try:
+            await scenario(dp, bot)
+        finally:
+            await bot.session.close()
+
+    asyncio.run(main())
+
+
+class FakeTelegram:
+    """getUpdates по очереди апдейтов: отдаёт не больше limit начиная с offset."""
+
+    def __init__(self, updates: list[Update]):
+        self.updates = updates
+        self.offsets: list[int | None] = []
+
+    async def __call__(self, method: GetUpdates, request_timeout: int | None = None):
+        self.offsets.append(method.offset)
+        batch = [u for u in self.updates if u.update_id >= (method.offset or 0)][:method.limit or 100]
+        if not batch:
+            await asyncio.sleep(0.01)
+        return batch
+
+
+def test_chat_order_and_parallel_chats():
+    seen: list[tuple[int, str]] = []
+    running: dict[int, int] = {}
+    peak = {"chats": 0, "per_chat": 0}
+
+    async def handler(message: Message):
+        chat = message.chat.id
+        running[chat] = running.get(chat, 0) + 1
+        peak["per_chat"] = max(peak["per_chat"], running[chat])
+        peak["chats"] = max(peak["chats"], sum(1 for n in running.values() if n))
+        await asyncio.sleep(0.01)
+        seen.append((chat, message.text))
+        running[chat] -= 1
+
+    async def scenario(dp, bot):
+        pipeline = pl.UpdatePipeline(dp, bot, workers=4)
+        pipeline.start()
+        update_id = 1
+        for n in range(5):
+            for chat in (10, 20, 30):
+                await pipeline.submit(_update(update_id, chat, f"{chat}:{n}"))
+                update_id += 1
+        assert await pipeline.drain(timeout=5)
+        assert pipeline.confirm_offset() == update_id
+        assert pipeline.unfinished() == []
+
+    _run(handler, scenario)
+    for chat in (10, 20, 30):
+        assert [text for c, text in seen if c == chat] == [f"{chat}:{n}" for n in range(5)]
+    assert peak["per_chat"] == 1
+    assert peak["chats"] == 3
+
+
+def test_abandoned_drain_keeps_unfinished(tmp_path):
+    stuck = asyncio.Event()
+    done: list[int] = []
+
+    async def handler(message: Message):
+        if message.text == "stuck":
+            await stuck.wait()
+        done.append(message.message_id)
+
+    async def scenario(dp, bot):
+        pipeline = pl.UpdatePipeline(dp, bot, workers=2)
+        pipeline.start()
+        await pipeline.submit(_update(1, 10))
+        await pipeline.submit(_update(2, 10, "stuck"))
+        await pipeline.submit(_update(3, 10))  # за зависшим в том же чате
+        await pipeline.submit(_update(4, 20))
+        assert not await pipeline.drain(timeout=0.2)
+        assert sorted(done) == [1, 4]
+        assert pipeline.confirm_offset() == 2
+        assert [u.update_id for u in pipeline.unfinished()] == [2, 3]
+
+        path = str(tmp_path / "pending.json")
+        assert pipeline.save_unfinished(path) == 2
+        stuck.set()
+        restarted = pl.UpdatePipeline(dp, bot, workers=2)
+        restarted.start()
+        assert await restarted.load_pending(path) == 2
+        assert await restarted.drain(timeout=5)
+        assert done[2:] == [2, 3]
+        assert not (tmp_path / "pending.json").exists()
+
+    _run(handler, scenario)
+
+
+def test_stuck_handler_does_not_block_polling():
+    stuck = asyncio.Event()
+    done: set[int] = set()
+
+    async def handler(message: Message):
+        if message.text == "stuck":
+            await stuck.wait()
+        done.add(message.message_id)
+
+    async def scenario(dp, bot):
+        updates = [_update(1, 1, "stuck")] + [_update(i, i) for i in range(2, 251)]
+        telegram = FakeTelegram(updates)
+        pipeline = pl.UpdatePipeline(dp, bot, workers=4)
+        pipeline.start()
+        stop = asyncio.Event()
+        poller = asyncio.create_task(pl._poll(pipeline, telegram, GetUpdates(timeout=0), stop))
+        try:
+            await _until(lambda: len(done) == 249)
+        finally:
+            stop.set()
+            stuck.set()
+            await asyncio.wait_for(poller, 5)
+        assert pipeline.next_id == 251
+        assert max(o or 0 for o in telegram.offsets) == 251
+        assert await pipeline.drain(timeout=5)
+        assert done == set(range(1, 251))
+
+    _run(handler, scenario)
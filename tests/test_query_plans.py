@@ -0,0 +1,136 @@
+"""
+Планы горячих запросов по датам на засеянной многолетней базе (после ANALYZE):
+поиск по индексу, без SCAN по shifts/work_hours/tips. SQL не переписан сюда,
+а перехвачен у настоящих функций sqlite_db (trace callback соединений пула).
+"""
+
+import asyncio
+import re
+import sqlite3
+from datetime import date, timedelta
+
+import aiosqlite
+import pytest
+
+from app.database import migrations, sqlite_db
+from bench.query_plans import seed
+
+YEARS, WAITERS = 3, 30
+# Таблицы, которые растут с историей, и их алиасы в запросах sqlite_db
+BIG_TABLE_SCAN = re.compile(r"^SCAN (shifts|work_hours|tips|s|wh|t)\b")
+
+YM = (date.today() - timedelta(days=40)).strftime("%Y-%m")
+DAY = f"{YM}-15"
+
+# функция → (вызов, индексы, которые должны встретиться в её планах)
+CALLS = {
+    "get_shifts_for_month": (lambda: sqlite_db.get_shifts_for_month(7, *map(int, YM.split("-"))),
+                             ["ux_shifts_waiter_date"]),
+    "get_schedule_snapshot": (lambda: sqlite_db.get_schedule_snapshot(f"{YM}-01", f"{YM}-28"),
+                              ["ix_shifts_date", "ix_work_hours_date"]),
+    "get_work_hours": (lambda: sqlite_db.get_work_hours(4, DAY), ["sqlite_autoindex_work_hours_1"]),
+    "get_work_hours_range": (lambda: sqlite_db.get_work_hours_range(f"{YM}-01", DAY),
+                             ["ix_work_hours_date", "ux_shifts_waiter_date"]),
+    "get_month_tips": (lambda: sqlite_db.get_month_tips(7, YM), ["PRIMARY KEY"]),
+    "get_month_hours_with_rate": (lambda: sqlite_db.get_month_hours_with_rate(YM), ["PRIMARY KEY"]),
+    "get_all_test_results_with_username": (sqlite_db.get_all_test_results_with_username, ["ix_users_start_tg"]),
+    # удаления — последними: они меняют данные для остальных
+    "clear_month_tips": (lambda: sqlite_db.clear_month_tips(7, YM), ["sqlite_autoindex_tips_1"]),
+    "clear_month_shifts": (lambda: sqlite_db.clear_month_shifts(YM), ["ix_shifts_date"]),
+    "clear_month_hours": (lambda: sqlite_db.clear_month_hours(YM), ["ix_work_hours_date"]),
+}
+
+
+def _seed(path: str):
+    seed(path, YEARS, WAITERS)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users_start (tg_id, username, start_date) VALUES (?, ?, '2024-01-01')",
+                     [(1000 + i % 2000, f"user{i}") for i in range(5000)])
+    conn.executemany("INSERT INTO test_results (tg_id, score, total, timestamp) VALUES (?, 5, 10, '2024-01-01')",
+                     [(1000 + i,) for i in range(50)])
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def _capture(path: str) -> dict[str, list[str]]:
+    await sqlite_db.sql_start(path)
+    statements: list[str] = []
+    try:
+        for conn in sqlite_db.pool._opened:
+            await conn.set_trace_callback(statements.append)
+        captured = {}
+        for name, (call, _) in CALLS.items():
+            statements.clear()
+            await call()
+            await sqlite_db.flush_writes()
+            captured[name] = [sql for sql in statements if re.match(r"\s*(SELECT|WITH|UPDATE|DELETE)", sql, re.I)]
+    finally:
+        await sqlite_db.sql_stop()
+    return captured
+
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("plans") / "plans.db")
+    _seed(path)
+    captured = asyncio.run(_capture(path))
+
+    # read_waiter_month (мини-приложение) работает на синхронном соединении
+    conn = sqlite_db.connect_readonly(path)
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    sqlite_db.read_waiter_month(conn, 1007, YM)
+    captured["read_waiter_month"] = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    yield {name: [[row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")] for sql in sqls]
+           for name, sqls in captured.items()}
+    conn.close()
+
+
+EXPECTED = {name: indexes for name, (_, indexes) in CALLS.items()}
+EXPECTED["read_waiter_month"] = ["ux_shifts_waiter_date", "sqlite_autoindex_tips_1"]
+
+
+@pytest.mark.parametrize("name", EXPECTED)
+def test_date_lookups_use_index(plans, name):
+    assert plans[name], f"{name}: no SQL captured"
+    lines = [line for plan in plans[name] for line in plan]
+    assert not [line for line in lines if BIG_TABLE_SCAN.match(line)], lines
+    for index in EXPECTED[name]:
+        assert any(re.match(rf"SEARCH \w+ USING (COVERING )?(INDEX )?{index}\b", line) for line in lines), \
+            (index, lines)
+
+
+async def _migrate(path: str, before=None):
+    async with aiosqlite.connect(path) as db:
+        if before is not None:
+            await migrations.MIGRATIONS[0](db)
+            await before(db)
+        await migrations.migrate(db)
+        await db.commit()
+
+
+def test_m002_normalizes_legacy_dates(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    month = ("2025-03-01", "2025-03-31")
+
+    async def legacy(db):
+        await db.executemany("INSERT INTO shifts (waiter_id, date, hours) VALUES (?, ?, 8)",
+                             [(1, "2025-03-05 10:00:00"), (1, "2025-03-05")])
+        await db.executemany("INSERT INTO tips (waiter_id, date, amount) VALUES (?, ?, ?)",
+                             [(1, "2025-03-05", 100), (1, "2025-03-05 23:10:00", 200), (1, "2025-03-06T09:00", 50)])
+        await db.executemany("INSERT INTO work_hours (employee_id, date, hours) VALUES (?, ?, ?)",
+                             [(2, "2025-03-07 08:00", 6), (2, "2025-03-08", 7)])
+
+    asyncio.run(_migrate(path, legacy))
+    conn = sqlite3.connect(path)
+    for table in ("shifts", "tips", "work_hours"):
+        bad = conn.execute(f"SELECT date FROM {table} WHERE date <> date(date)").fetchall()
+        assert bad == [], (table, bad)
+    assert conn.execute("SELECT date, amount FROM tips WHERE waiter_id = 1 AND date BETWEEN ? AND ? ORDER BY date",
+                        month).fetchall() == [("2025-03-05", 200), ("2025-03-06", 50)]
+    assert conn.execute("SELECT COUNT(*) FROM work_hours WHERE date BETWEEN ? AND ?", month).fetchone() == (2,)
+    conn.close()
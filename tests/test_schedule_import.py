@@ -0,0 +1,115 @@
+"""
+Загрузка графика из таблицы: разбор CSV, неоднозначные имена, повторная загрузка
+без изменений, устаревший предпросмотр и нечитаемый файл.
+"""
+
+import asyncio
+import threading
+
+from app import schedule_import
+from app.database import sqlite_db
+
+HEADER = "Сотрудник;01.03;02.03;Ставка\n"
+
+
+def _write(path, text: str) -> str:
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+async def _seed():
+    await sqlite_db.add_waiter(100)
+    waiter_id = await sqlite_db.get_waiter_id_by_tg(100)
+    anna = await sqlite_db.add_employee("Иванова", "Анна", "ОФИЦИАНТЫ")
+    await sqlite_db.link_waiter_employee(waiter_id, anna)
+    await sqlite_db.add_employee("Сидоров", "Пётр", "ПОВАР")
+    await sqlite_db.add_employee("Смирнов", "Олег", "ПОВАР")
+    await sqlite_db.add_employee("Смирнов", "Олег", "ПОМОЩНИКИ")
+    return waiter_id
+
+
+def _run(tmp_path, scenario):
+    async def main():
+        await sqlite_db.sql_start(str(tmp_path / "import.db"))
+        try:
+            return await scenario(await _seed())
+        finally:
+            await sqlite_db.sql_stop()
+
+    return asyncio.run(main())
+
+
+def test_parse_and_idempotent_reimport(tmp_path, monkeypatch):
+    threads = []
+    parse_grid = schedule_import._parse_grid
+
+    def tracked(*args):
+        threads.append(threading.current_thread())
+        return parse_grid(*args)
+
+    monkeypatch.setattr(schedule_import, "_parse_grid", tracked)
+    path = _write(tmp_path / "march.csv", HEADER + "Анна Иванова;8;зал;180\nСидоров Петр;6,5;;\nИтого;14,5;;\n")
+
+    async def scenario(waiter_id):
+        plan = await schedule_import.prepare(path, year=2025)
+        assert plan.errors == []
+        assert plan.shift_hours == [(waiter_id, "2025-03-01", 8.0)]
+        assert plan.shift_tasks == [(waiter_id, "2025-03-02", "зал")]
+        assert [(day, hours) for _, day, hours in plan.work_hours] == [("2025-03-01", 6.5)]
+        assert plan.counts == {"new": 3}
+        assert await schedule_import.apply(plan) == 3
+
+        again = await schedule_import.prepare(path, year=2025)
+        assert again.counts == {"same": 3} and again.changes == []
+        await schedule_import.apply(again)
+        shifts, work_hours = await sqlite_db.get_schedule_snapshot("2025-03-01", "2025-03-31")
+        return shifts, work_hours
+
+    shifts, work_hours = _run(tmp_path, scenario)
+    assert sorted(shifts.values()) == [(0.0, "зал"), (8.0, "")]
+    assert list(work_hours.values()) == [6.5]
+    assert threads and all(t is not threading.main_thread() for t in threads)
+
+
+def test_ambiguous_and_unknown_names(tmp_path):
+    path = _write(tmp_path / "march.csv", HEADER + "Олег Смирнов;4;;\nНикто Неизвестный;5;;\nАнна Иванова;8;;\n")
+
+    async def scenario(_):
+        plan = await schedule_import.prepare(path, year=2025)
+        assert plan.rows == 0  # при ошибках ничего не готовится к записи
+        return plan
+
+    plan = _run(tmp_path, scenario)
+    assert plan.errors == ["строка 2: «Олег Смирнов» — несколько сотрудников с таким именем",
+                           "строка 3: «Никто Неизвестный» не найден среди официантов и сотрудников"]
+    assert plan.preview().startswith("❗️ Ошибок: 2")
+
+
+def test_stale_preview_changes_digest(tmp_path):
+    path = _write(tmp_path / "march.csv", HEADER + "Анна Иванова;8;;\n")
+
+    async def scenario(waiter_id):
+        shown = (await schedule_import.prepare(path, year=2025)).digest()
+        # Пока админ смотрел предпросмотр, смену поправили в календаре
+        await sqlite_db.bulk_upsert_schedule([(waiter_id, "2025-03-01", 6.0)], [], [])
+        plan = await schedule_import.prepare(path, year=2025)
+        assert plan.digest() != shown
+        assert plan.changes == ["~ Анна Иванова 2025-03-01: 6.0 → 8.0"]
+        # Тот же файл без новых изменений в базе — тот же отпечаток
+        assert (await schedule_import.prepare(path, year=2025)).digest() == plan.digest()
+
+    _run(tmp_path, scenario)
+
+
+def test_unreadable_file(tmp_path):
+    xlsx = tmp_path / "schedule.xlsx"
+    xlsx.write_bytes(b"not a zip at all")
+    csv_path = tmp_path / "schedule.csv"
+    csv_path.write_bytes("Сотрудник;01.03\n".encode("cp1251"))
+
+    async def scenario(_):
+        return [await schedule_import.prepare(str(path), year=2025) for path in (xlsx, csv_path)]
+
+    for plan in _run(tmp_path, scenario):
+        assert len(plan.errors) == 1 and plan.errors[0].startswith("Не удалось прочитать файл")
+        assert plan.rows == 0
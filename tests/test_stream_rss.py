@@ -0,0 +1,70 @@
+"""
+Регрессия памяти потоковой конвертации: ролик из Transcoder.stream через
+StreamInputFile не должен оседать в памяти процесса бота целиком.
+Замер — в отдельном процессе, чтобы ru_maxrss не зависел от остальных тестов.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from app.video_converter import FFMPEG
+
+pytestmark = pytest.mark.skipif(shutil.which(FFMPEG) is None, reason="ffmpeg not found")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Прирост пикового RSS за всю конвертацию; ролик на входе заметно больше
+MAX_RSS_GROWTH_MB = 16
+
+CHILD = """
+import asyncio, json, resource, sys
+from app.media import StreamInputFile
+from app.video_converter import Transcoder
+
+async def chunks(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 16):
+            yield chunk
+            await asyncio.sleep(0)
+
+async def main(path):
+    out = 0
+    upload = StreamInputFile(Transcoder(workers=1).stream(chunks(path)), "video_note.mp4")
+    async for chunk in upload.read(None):
+        out += len(chunk)
+    return out
+
+asyncio.run(asyncio.sleep(0))
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+out = asyncio.run(main(sys.argv[1]))
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"out_bytes": out, "growth_mb": (peak - base) / 1024}))
+"""
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """Синтетический 720p-ролик ~55 МБ; moov в начале, чтобы читался из пайпа."""
+    path = str(tmp_path_factory.mktemp("clip") / "input.mp4")
+    subprocess.run([
+        FFMPEG, "-v", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440",
+        "-t", "30", "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "16M",
+        "-c:a", "aac", "-movflags", "+faststart", path,
+    ], check=True)
+    return path
+
+
+def test_stream_peak_rss_is_bounded(clip):
+    proc = subprocess.run([sys.executable, "-c", CHILD, clip], cwd=ROOT, check=True,
+                          capture_output=True, text=True, timeout=300)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    input_mb = os.path.getsize(clip) / 2**20
+    assert result["out_bytes"] > 0
+    assert input_mb > 2 * MAX_RSS_GROWTH_MB, input_mb
+    assert result["growth_mb"] < MAX_RSS_GROWTH_MB, (result, input_mb)
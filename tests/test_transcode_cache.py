@@ -0,0 +1,61 @@
+"""
+TranscodeCache: ожидающий чужого ffmpeg получает файл, который не успел
+вытеснить другой, одновременно закончившийся _fill.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from app.video_converter import TranscodeCache
+
+
+class GatedTranscoder:
+    """Вместо ffmpeg: ждёт gate и пишет результат фиксированного размера."""
+
+    def __init__(self, gate: asyncio.Event, size: int):
+        self.gate = gate
+        self.size = size
+        self.calls = 0
+
+    def cmd(self, *args, **kwargs) -> list[str]:
+        return ["fake"]
+
+    async def convert(self, input_path, size=360, timeout=None, profile=None) -> str:
+        self.calls += 1
+        await self.gate.wait()
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * self.size)
+        return path
+
+
+def test_joined_waiter_entry_is_not_evicted(tmp_path):
+    sources = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.mp4"
+        path.write_bytes(name.encode() * 10)
+        sources.append(str(path))
+
+    async def scenario():
+        gate = asyncio.Event()
+        transcoder = GatedTranscoder(gate, 100)
+        # Влезает только один результат: второй готовый _fill вытесняет всё незакреплённое
+        cache = TranscodeCache(transcoder, str(tmp_path / "cache"), max_bytes=150)
+
+        async def use(src):
+            async with cache.converted(src) as path:
+                await asyncio.sleep(0)
+                return os.path.exists(path)
+
+        tasks = [asyncio.create_task(use(src)) for src in (sources[0], sources[0], sources[1])]
+        while transcoder.calls < 2:
+            await asyncio.sleep(0.01)
+        gate.set()  # оба ffmpeg заканчиваются в одной итерации цикла
+        results = await asyncio.gather(*tasks)
+        return results, cache.stats(), dict(cache._pins)
+
+    results, stats, pins = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert (stats["misses"], stats["joined"]) == (2, 1)
+    assert pins == {}